@@ -7,13 +7,13 @@ requirements = [
     "uvicorn==0.35.0",
     "langgraph==0.5.1",
     "chromadb==1.0.15",
+    "numpy==2.4.6",
     "pypdf==5.7.0",
     "textsplitter==1.0.3",
     "requests==2.32.4",
     "langgraph==0.5.1",
     "pytest==8.4.1",
-    "python-multipart==0.0.20",
-    "scikit-learn==1.7.0"
+    "python-multipart==0.0.20"
 ]
 
 setup(
@@ -1,21 +1,46 @@
 import logging
-from typing import TypedDict, List, Dict, Any, Optional
-from langgraph.graph import MessageGraph, StateGraph, END
-from langgraph.prebuilt import ToolNode
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
-from langchain_core.tools import tool
-import asyncio
+from typing import Annotated, TypedDict, List, Dict, Any, Optional, Tuple
 
+from src.agent.query_router import ROUTE_CANNED, ROUTE_DIRECT, ROUTE_RAG, QueryRouter
+from src.agent.query_splitter import split_query
+from src.config import settings
+from src.core.model_tiers import TIER_FAST, TIER_LARGE, tier_stats
 from src.core.ollama_rag import OllamaRAG
-from src.core.chromadb_manager import ChromaDBManager
+from src.core.session_store import session_store
 from src.utils.file_chunker import PDFChunker
+from src.utils.profiling import timed_stage
 
 logger = logging.getLogger(__name__)
 
 
+def merge_documents(left: List[Tuple[str, float]], right: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+    """Merge retrieval results from parallel branches, keeping each document once with its best score"""
+    best: Dict[str, float] = {}
+    for text, score in list(left or []) + list(right or []):
+        if text not in best or score > best[text]:
+            best[text] = score
+    return sorted(best.items(), key=lambda item: item[1], reverse=True)
+
+
+def merge_unique(left: List[str], right: List[str]) -> List[str]:
+    """Concatenate two lists, dropping repeated entries"""
+    merged = list(left or [])
+    merged.extend(item for item in (right or []) if item not in merged)
+    return merged
+
+
+class RetrievalTask(TypedDict):
+    """Input of one parallel retrieval branch"""
+    sub_query: str
+    query_embedding: Optional[List[float]]
+    # Written by the parallel retrieval branches; the reducers merge and dedupe
+    retrieved_docs: Annotated[List[Tuple[str, float]], merge_documents]
+    failed_sub_queries: Annotated[List[str], merge_unique]
+
+
 class AgentState(TypedDict):
     """Define the state structure for the agent"""
-    messages: List[BaseMessage]
+    messages: List[Any]  # langchain_core BaseMessage; imported lazily with langgraph
     query: str
     context: List[str]
     answer: str
@@ -24,58 +49,165 @@ class AgentState(TypedDict):
     next_action: str
     error: Optional[str]
     retry_count: int  # Add this field
+    session_id: Optional[str]
+    route: str
+    route_reason: str
+    model_tier: Optional[str]
+    query_embedding: Optional[List[float]]
+    # Written by the parallel retrieval branches; the reducers merge and dedupe
+    retrieved_docs: Annotated[List[Tuple[str, float]], merge_documents]
+    failed_sub_queries: Annotated[List[str], merge_unique]
 
 
 class RAGAgent:
     def __init__(self, 
-                 embedding_model: str = "mistral",
+                 embedding_model: Optional[str] = None,
                  chat_model: str = "mistral",
-                 base_url: str = "http://ollama:11434"):
+                 base_url: str = "http://ollama:11434",
+                 collection_name: str = settings.DEFAULT_COLLECTION):
+        self.collection_name = collection_name
         self.rag = OllamaRAG(
             embedding_model=embedding_model,
             chat_model=chat_model,
             base_url=base_url,
-            top_k=3
+            top_k=3,
+            collection_name=collection_name
+        )
+        self.chromadb = self.rag.chroma_client
+        self.router = QueryRouter(
+            embedding_client=self.rag.embedding_client if settings.ROUTER_EMBEDDING_ENABLED else None,
+            threshold=settings.ROUTER_SIMILARITY_THRESHOLD
         )
-        self.chromadb = ChromaDBManager(collection_name="resume_collection")
         self.pdf_chunker = PDFChunker()
         
         # Build the graph
         self.graph = self._build_graph()
     
-    def _build_graph(self) -> StateGraph:
+    def _build_graph(self):
         """Build the LangGraph workflow"""
+        # langgraph takes most of a second to import; only load it once an agent is needed
+        from langgraph.graph import StateGraph, END
+        
         workflow = StateGraph(AgentState)
         
         # Add nodes
-        workflow.add_node("query_analysis", self._analyze_query)
-        workflow.add_node("generate_answer", self._generate_answer)
-        workflow.add_node("handle_error", self._handle_error)
+        workflow.add_node("query_analysis", timed_stage("node.query_analysis")(self._analyze_query))
+        workflow.add_node("canned_response", timed_stage("node.canned_response")(self._canned_response))
+        workflow.add_node("direct_answer", timed_stage("node.direct_answer")(self._direct_answer))
+        workflow.add_node("retrieve", timed_stage("node.retrieve")(self._retrieve))
+        workflow.add_node("generate_answer", timed_stage("node.generate_answer")(self._generate_answer))
+        workflow.add_node("handle_error", timed_stage("node.handle_error")(self._handle_error))
         
         # Define the flow
         workflow.set_entry_point("query_analysis")
         
         # Add edges
-        workflow.add_edge("query_analysis", "generate_answer")
         workflow.add_conditional_edges(
-            "generate_answer",
-            self._is_error,
+            "query_analysis",
+            self._select_route,
             {
-                True: "handle_error",
-                False: END
+                ROUTE_CANNED: "canned_response",
+                ROUTE_DIRECT: "direct_answer",
+                "retrieve": "retrieve",
+                "error": "handle_error"
             }
         )
+        workflow.add_edge("canned_response", END)
+        # Runs once all retrieval branches have finished
+        workflow.add_edge("retrieve", "generate_answer")
+        for node in ("direct_answer", "generate_answer"):
+            workflow.add_conditional_edges(
+                node,
+                self._is_error,
+                {
+                    True: "handle_error",
+                    False: END
+                }
+            )
         workflow.add_edge("handle_error", END)
         
         return workflow.compile()
     
     def _analyze_query(self, state: AgentState) -> AgentState:
-        """Analyze the incoming query"""
+        """Route the incoming query: canned response, direct answer or retrieval"""
         query = state.get("query", "")
         
-        # Add query analysis logic here
-        # For now, just pass through
-        state["next_action"] = "generate"
+        if not settings.ROUTER_ENABLED:
+            state["route"] = ROUTE_RAG
+            state["route_reason"] = "disabled"
+            return state
+        
+        try:
+            decision = self.router.route(query)
+        except Exception as e:
+            # Routing is an optimization; fall back to retrieval
+            logger.warning(f"Query routing failed, using retrieval: {e}")
+            state["route"] = ROUTE_RAG
+            state["route_reason"] = "router_error"
+            return state
+        
+        state["route"] = decision.route
+        state["route_reason"] = decision.reason
+        state["query_embedding"] = decision.query_embedding
+        if decision.route == ROUTE_CANNED:
+            state["answer"] = decision.response
+        return state
+    
+    def _select_route(self, state: AgentState):
+        """Pick the node that answers the query, fanning retrieval out over the sub-queries"""
+        if self._is_error(state):
+            return "error"
+        route = state.get("route") or ROUTE_RAG
+        if route != ROUTE_RAG:
+            return route
+        
+        from langgraph.types import Send
+        
+        query = state["query"]
+        sub_queries = split_query(query, settings.FANOUT_MAX_SUBQUERIES) if settings.FANOUT_ENABLED else [query]
+        if len(sub_queries) > 1:
+            logger.info(f"Retrieving {len(sub_queries)} sub-queries in parallel: {sub_queries}")
+        return [
+            Send("retrieve", RetrievalTask(
+                sub_query=sub_query,
+                # The router's embedding is only valid for the full query
+                query_embedding=state.get("query_embedding") if sub_query == query else None
+            ))
+            for sub_query in sub_queries
+        ]
+    
+    def _retrieve(self, task: RetrievalTask) -> Dict[str, Any]:
+        """Embed and search one sub-query; branches run concurrently"""
+        sub_query = task["sub_query"]
+        try:
+            if task.get("query_embedding") is None:
+                docs = self.rag.retrieve_relevant_documents(sub_query)
+            else:
+                docs = self.rag.retrieve_relevant_documents(sub_query, query_embedding=task["query_embedding"])
+        except Exception as e:
+            logger.warning(f"Retrieval failed for sub-query {sub_query!r}: {e}")
+            return {"failed_sub_queries": [sub_query]}
+        return {"retrieved_docs": docs}
+    
+    def _canned_response(self, state: AgentState) -> AgentState:
+        """Answer with the router's fixed response"""
+        state["confidence"] = 1.0
+        return state
+    
+    def _direct_answer(self, state: AgentState) -> AgentState:
+        """Answer small talk with a short generation and no retrieval, on the fast model if there is one"""
+        tier = TIER_FAST if TIER_FAST in self.rag.chat_clients else TIER_LARGE
+        try:
+            with tier_stats.measure(tier):
+                state["answer"] = self.rag.chat_clients[tier].generate_reply(
+                    state["query"],
+                    max_tokens=settings.DIRECT_ANSWER_MAX_TOKENS
+                )
+            state["confidence"] = 1.0
+            state["model_tier"] = tier
+        except Exception as e:
+            state["error"] = str(e)
+            state["next_action"] = "error"
         return state
     
     
@@ -84,13 +216,26 @@ class RAGAgent:
         try:
             query = state["query"]
             context = state.get("context", [])
+            session_id = state.get("session_id")
+            session = session_store.get(session_id) if session_id else None
             
+            relevant_docs = state.get("retrieved_docs", [])[:settings.FANOUT_MAX_DOCUMENTS]
+            failed = state.get("failed_sub_queries", [])
+            if failed and not relevant_docs:
+                raise Exception(f"Retrieval failed for: {', '.join(failed)}")
+            
+            kwargs = {}
+            if session is not None:
+                kwargs["session"] = session
             result = self.rag.generate_answer(
-                user_question=query
+                user_question=query,
+                relevant_docs=relevant_docs,
+                **kwargs
             )
             
             state["answer"] = result["answer"]
             state["confidence"] = result["confidence"]
+            state["model_tier"] = result.get("model_tier")
             
         except Exception as e:
             state["error"] = str(e)
@@ -114,10 +259,20 @@ class RAGAgent:
         """Decide whether to end or regenerate"""
         return state.get("next_action", "end")
     
-    async def process_query(self, query: str) -> Dict[str, Any]:
-        """Process a query through the LangGraph workflow"""
+    async def process_query(self, query: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Process a query through the LangGraph workflow, optionally as a turn of a session"""
+        from langchain_core.messages import HumanMessage, AIMessage
+        
+        messages: List[Any] = []
+        session = session_store.get(session_id) if session_id else None
+        if session is not None:
+            for turn in session.turns:
+                message_class = HumanMessage if turn["role"] == "user" else AIMessage
+                messages.append(message_class(content=turn["content"]))
+        messages.append(HumanMessage(content=query))
+        
         initial_state = AgentState(
-            messages=[HumanMessage(content=query)],
+            messages=messages,
             query=query,
             context=[],
             answer="",
@@ -125,7 +280,14 @@ class RAGAgent:
             sources=[],
             next_action="",
             error=None,
-            retry_count=0  # Add this field
+            retry_count=0,  # Add this field
+            session_id=session_id,
+            route="",
+            route_reason="",
+            model_tier=None,
+            query_embedding=None,
+            retrieved_docs=[],
+            failed_sub_queries=[]
         )
         
         # Run the graph
@@ -137,4 +299,8 @@ class RAGAgent:
             "sources": result.get("sources", []),
             "query": query,
             "error": result.get("error", None),
+            "session_id": session_id,
+            "route": result.get("route") or None,
+            "route_reason": result.get("route_reason") or None,
+            "model_tier": result.get("model_tier"),
         }
\ No newline at end of file
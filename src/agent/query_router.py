@@ -0,0 +1,145 @@
+import re
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from src.core.ollama_embedding import OllamaEmbedding
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Routes a query can take through the agent graph
+ROUTE_CANNED = "canned"  # fixed response, no model call
+ROUTE_DIRECT = "direct"  # short generation without retrieval
+ROUTE_RAG = "rag"  # retrieval plus generation
+
+# Rules are matched against the whole normalized query, so "hi, what did
+# Vivek study?" still goes to retrieval
+CANNED_RULES: List[Tuple[str, re.Pattern, str]] = [
+    ("greeting",
+     re.compile(r"^(hi|hello|hey|hiya|good (morning|afternoon|evening))( there)?$"),
+     "Hello! Ask me anything about the documents you have uploaded."),
+    ("thanks",
+     re.compile(r"^(thanks|thank you|thx|cheers)( (so|very) much)?( for (the|your) help)?$"),
+     "You're welcome! Let me know if you have more questions."),
+    ("goodbye",
+     re.compile(r"^(bye|goodbye|see you|see ya)( later)?$"),
+     "Goodbye!"),
+    ("capabilities",
+     re.compile(r"^(who are you|what are you|what can you do|help|how do i use (this|you))$"),
+     "I am a document assistant. Upload a PDF and ask questions about it; "
+     "I answer from the most relevant passages and show the sources I used."),
+]
+
+DIRECT_RULES: List[Tuple[str, re.Pattern]] = [
+    ("chit_chat", re.compile(r"^(how are you( doing)?|how is it going|what'?s up|tell me a joke|are you (a bot|human|real))$")),
+    ("acknowledgement", re.compile(r"^(ok|okay|cool|great|nice|got it|i see|makes sense)$")),
+]
+
+# Example queries per route for embedding-centroid matching
+ROUTE_EXAMPLES: Dict[str, List[str]] = {
+    ROUTE_DIRECT: [
+        "hello, how are you today?",
+        "good morning!",
+        "thanks a lot, that was helpful",
+        "what can you help me with?",
+        "tell me something funny",
+        "nice talking to you",
+    ],
+    ROUTE_RAG: [
+        "what is the candidate's work experience?",
+        "summarize the document",
+        "which programming languages are listed?",
+        "where did he study?",
+        "what projects are mentioned in the file?",
+        "list the certifications",
+    ],
+}
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and strip punctuation and repeated whitespace"""
+    text = re.sub(r"[^\w\s']", " ", query.lower())
+    return " ".join(text.split())
+
+
+class RouteDecision:
+    """Route chosen for a query and why"""
+
+    def __init__(self, route: str, reason: str, response: Optional[str] = None,
+                 query_embedding: Optional[List[float]] = None):
+        self.route = route
+        self.reason = reason
+        # Fixed answer for the canned route
+        self.response = response
+        # Embedding computed while routing, reused by retrieval
+        self.query_embedding = query_embedding
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"route": self.route, "reason": self.reason}
+
+
+class QueryRouter:
+    """
+    Cheap classification of a query before retrieval.
+
+    Rules catch greetings, thanks and questions about the assistant itself.
+    When an embedding client is given, queries no rule matched are compared
+    with the centroid of example queries per route; a query closer to the
+    direct-answer centroid than to the retrieval centroid by at least
+    `margin`, and above `threshold`, skips retrieval. Everything else is
+    routed to retrieval.
+    """
+
+    # Centroids per embedding model, shared across routers in the process
+    _centroids: Dict[Tuple[str, str], Dict[str, "np.ndarray"]] = {}
+    _centroids_lock = threading.Lock()
+
+    def __init__(self, embedding_client: Optional[OllamaEmbedding] = None,
+                 threshold: float = 0.8, margin: float = 0.05):
+        self.embedding_client = embedding_client
+        self.threshold = threshold
+        self.margin = margin
+
+    def _get_centroids(self) -> Dict[str, "np.ndarray"]:
+        import numpy as np
+
+        key = (self.embedding_client.model_name, self.embedding_client.base_url)
+        with self._centroids_lock:
+            centroids = self._centroids.get(key)
+        if centroids is None:
+            centroids = {}
+            for route, examples in ROUTE_EXAMPLES.items():
+                vectors = np.asarray(self.embedding_client.embed_documents(examples), dtype=np.float32)
+                centroid = vectors.mean(axis=0)
+                centroids[route] = centroid / (np.linalg.norm(centroid) or 1.0)
+            with self._centroids_lock:
+                self._centroids[key] = centroids
+        return centroids
+
+    def route(self, query: str) -> RouteDecision:
+        """Pick the route for a query"""
+        text = normalize_query(query)
+        if not text:
+            return RouteDecision(ROUTE_CANNED, "empty", response="Please type a question.")
+
+        for name, pattern, response in CANNED_RULES:
+            if pattern.match(text):
+                return RouteDecision(ROUTE_CANNED, f"rule:{name}", response=response)
+        for name, pattern in DIRECT_RULES:
+            if pattern.match(text):
+                return RouteDecision(ROUTE_DIRECT, f"rule:{name}")
+
+        if self.embedding_client is None:
+            return RouteDecision(ROUTE_RAG, "default")
+
+        import numpy as np
+
+        centroids = self._get_centroids()
+        query_embedding = self.embedding_client.embed_query(query)
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        direct_score = float(vector @ centroids[ROUTE_DIRECT])
+        rag_score = float(vector @ centroids[ROUTE_RAG])
+        if direct_score >= self.threshold and direct_score - rag_score >= self.margin:
+            return RouteDecision(ROUTE_DIRECT, f"centroid:{direct_score:.2f}", query_embedding=query_embedding)
+        return RouteDecision(ROUTE_RAG, f"centroid:{rag_score:.2f}", query_embedding=query_embedding)
@@ -0,0 +1,41 @@
+import re
+from typing import List
+
+# Words that start a new question after "and", e.g. "... and where did he work?"
+QUESTION_START = r"(?:what|where|when|who|whom|which|why|how|does|do|did|is|are|was|were|can|could|has|have)\b"
+
+# Boundaries between the parts of a compound question
+SENTENCE_BOUNDARY = re.compile(r"(?<=\?)\s+")
+CONJUNCTION_BOUNDARY = re.compile(rf"\s*[,;]?\s+(?:and|also|as well as)\s+(?={QUESTION_START})", re.IGNORECASE)
+SEMICOLON_BOUNDARY = re.compile(r"\s*;\s+")
+
+# Parts shorter than this are fragments ("... and why?") that need the rest of the question
+MIN_PART_WORDS = 3
+
+
+def split_query(query: str, max_parts: int = 3) -> List[str]:
+    """
+    Split a compound question into sub-queries that can be retrieved separately.
+
+    A question is only split when every part is a question on its own;
+    otherwise the whole query is returned as the single sub-query.
+    """
+    parts = []
+    for sentence in SENTENCE_BOUNDARY.split(query.strip()):
+        for clause in SEMICOLON_BOUNDARY.split(sentence):
+            parts.extend(CONJUNCTION_BOUNDARY.split(clause))
+
+    parts = [part.strip(" ,;") for part in parts if part.strip(" ,;")]
+    if len(parts) <= 1 or any(len(part.split()) < MIN_PART_WORDS for part in parts):
+        return [query.strip()]
+
+    # Drop repeated parts, keeping order
+    unique_parts = []
+    for part in parts:
+        if part.lower() not in (p.lower() for p in unique_parts):
+            unique_parts.append(part)
+
+    if len(unique_parts) > max_parts:
+        # Keep the first parts separate and retrieve the rest together
+        unique_parts = unique_parts[:max_parts - 1] + [" ".join(unique_parts[max_parts - 1:])]
+    return unique_parts
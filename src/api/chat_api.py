@@ -1,14 +1,29 @@
+import asyncio
+import json
 import logging
 import os
-from pathlib import Path
-import shutil
-from fastapi import APIRouter, File, HTTPException, UploadFile, status, Body, Depends
+import re
+from typing import List, Optional
+from fastapi import APIRouter, File, Header, HTTPException, Query, UploadFile, status, Body, Depends
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from src.agent.langgraph_agent import RAGAgent
+from src.config import embedding_model_name, settings
+from src.core.batch_answering import answer_batch
 from src.core.chromadb_manager import ChromaDBManager
+from src.core.collection_catalog import CATALOG_COLLECTION
+from src.core.collection_registry import collection_registry
+from src.core.index_writer import get_ingestion_queue, single_writer_enabled
+from src.core.ingest_checkpoint import IngestionInProgress, ingestion_pending
+from src.core.model_tiers import tier_config, tier_stats
+from src.core.ollama_scheduler import ollama_scheduler
+from src.core.session_store import session_store
 from src.core.ollama_embedding import OllamaEmbedding
+from src.utils import memory
 from src.utils.file_chunker import PDFChunker
+from src.utils.profiling import is_admin, recent_memory_profiles
+from src.utils.uploads import UploadTooLarge, save_upload
 from src.core.ollama_rag import OllamaRAG
 
 logger = logging.getLogger(__name__)
@@ -17,62 +32,203 @@ router = APIRouter()
 
 class ChatRequest(BaseModel):
     query: str
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     answer: str
     confidence: float
     sources: list
     query: str
+    session_id: Optional[str] = None
+    route: Optional[str] = None  # "canned", "direct" or "rag"
+    route_reason: Optional[str] = None
+    model_tier: Optional[str] = None  # "fast" or "large"; None when no model generated the answer
+
+
+class BatchRequest(BaseModel):
+    queries: List[str]
+    include_sources: bool = True
+
+
+# Multipart boundaries and headers around the file in an upload request
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+# Chroma's collection name rules: 3-512 characters from [a-zA-Z0-9._-], alphanumeric at both ends
+COLLECTION_NAME_PATTERN = re.compile(r"^[a-zA-Z0-9][a-zA-Z0-9._-]{1,510}[a-zA-Z0-9]$")
+# Tenant IDs and the collection names within a tenant follow the same rules without the length limits
+NAME_PART_PATTERN = re.compile(r"^[a-zA-Z0-9](?:[a-zA-Z0-9._-]*[a-zA-Z0-9])?$")
+TENANT_SEPARATOR = "__"
+# Collections the application keeps for itself; clients may not read, write or reset them
+RESERVED_COLLECTIONS = {CATALOG_COLLECTION}
+
+
+def get_collection_name(
+    collection: Optional[str] = Query(None, description="Collection to use, defaults to the default collection"),
+    x_tenant_id: Optional[str] = Header(None, description="Tenant whose collections are used"),
+) -> str:
+    """
+    Resolve the collection for a request. A tenant's collections are
+    namespaced as "<tenant>__<collection>" so searches only cover that
+    tenant's vectors. Neither part may contain the separator, so every
+    name resolves to exactly one tenant and requests without a tenant
+    cannot name another tenant's collection.
+    """
+    name = collection or settings.DEFAULT_COLLECTION
+    for part, value in (("tenant", x_tenant_id), ("collection name", name)):
+        if value and (TENANT_SEPARATOR in value or not NAME_PART_PATTERN.match(value)):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {part}: {value}")
+    if x_tenant_id:
+        name = f"{x_tenant_id}{TENANT_SEPARATOR}{name}"
+    if not COLLECTION_NAME_PATTERN.match(name) or name in RESERVED_COLLECTIONS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid collection name: {name}")
+    return name
 
 
 @router.post("/ask")
-async def ask_question(request: ChatRequest):
+async def ask_question(request: ChatRequest, collection_name: str = Depends(get_collection_name)):
     """
     Endpoint to ask a question.
-    This is a placeholder endpoint that can be extended later.
+    Pass a session_id from /sessions to ask a follow-up within a conversation.
     """
+    if request.session_id is not None:
+        session = session_store.get(request.session_id)
+        if session is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found or expired")
+        if session.collection_name != collection_name:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Session belongs to another collection")
     try:
-        rag_agent = RAGAgent(embedding_model=os.getenv("MODEL_NAME", "mistral"),
+        rag_agent = RAGAgent(embedding_model=embedding_model_name(),
                      chat_model=os.getenv("MODEL_NAME", "mistral"),
-                     base_url=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"))
-        result = await rag_agent.process_query(request.query)
+                     base_url=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"),
+                     collection_name=collection_name)
+        result = await rag_agent.process_query(request.query, session_id=request.session_id)
         return ChatResponse(**result)
     except Exception as e:
         logger.error(f"Error in ask_question: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
+@router.post("/ask_batch")
+async def ask_batch(request: BatchRequest, collection_name: str = Depends(get_collection_name)):
+    """
+    Endpoint to answer a list of questions.
+    Results are streamed as newline-delimited JSON in completion order; each
+    line carries the question's index, and failed questions carry an "error".
+    """
+    if not request.queries:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No queries given")
+    if len(request.queries) > settings.BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"At most {settings.BATCH_MAX_QUESTIONS} queries per batch")
+    try:
+        ollama_rag = OllamaRAG(embedding_model=embedding_model_name(),
+                               chat_model=os.getenv("MODEL_NAME", "mistral"),
+                               base_url=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"),
+                               collection_name=collection_name)
+    except Exception as e:
+        logger.error(f"Error in ask_batch: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    
+    async def results():
+        async for item in answer_batch(ollama_rag, request.queries,
+                                       concurrency=settings.BATCH_CONCURRENCY,
+                                       include_sources=request.include_sources):
+            yield json.dumps(item) + "\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.post("/sessions")
+async def create_session(collection_name: str = Depends(get_collection_name)):
+    """
+    Endpoint to start a conversation session on a collection.
+    """
+    session = session_store.create(collection_name)
+    return session.to_dict()
+
+
+@router.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """
+    Endpoint to inspect a conversation session.
+    """
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found or expired")
+    return session.to_dict()
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """
+    Endpoint to end a conversation session.
+    """
+    if not session_store.delete(session_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found or expired")
+    return {"message": "Session deleted successfully"}
+    
+
 @router.post("/upload_file")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(
+    file: UploadFile = File(...),
+    collection_name: str = Depends(get_collection_name),
+    content_length: Optional[int] = Header(None),
+):
     """
-    Endpoint to upload a file to the /raw folder.
+    Endpoint to upload a PDF and add it to a collection.
+    The file is stored under its content hash; content already added to the
+    collection is detected before parsing and not processed again.
     """
+    if content_length is not None and content_length > settings.UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Upload exceeds the {settings.UPLOAD_MAX_BYTES} byte limit")
     try:
-        # Define the raw folder path
-        raw_folder = Path("/app/raw")
-        
-        # Create the raw folder if it doesn't exist
-        raw_folder.mkdir(parents=True, exist_ok=True)
+        stored = await save_upload(file, settings.UPLOAD_DIRECTORY, settings.UPLOAD_MAX_BYTES,
+                                   chunk_size=settings.UPLOAD_CHUNK_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    
+    try:
+        ollama_rag = OllamaRAG(base_url=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"),
+                               collection_name=collection_name)
+        result = {
+            "filename": file.filename,
+            "file_path": str(stored.path),
+            "content_hash": stored.sha256,
+            "size_bytes": stored.size,
+            "collection": collection_name,
+        }
         
-        # Define the file path
-        file_path = raw_folder / file.filename
+        already_added = await asyncio.to_thread(ollama_rag.chroma_client.has_documents,
+                                                {"content_hash": stored.sha256})
+        # A partly ingested file is added again, which resumes after its last stored batch
+        if already_added and not ingestion_pending(collection_name, stored.sha256):
+            return {"message": "PDF already processed", "duplicate": True, **result}
         
-        # Save the uploaded file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        if single_writer_enabled():
+            # The index writer process ingests it; poll /jobs/{job_id} for the outcome
+            job = await asyncio.to_thread(get_ingestion_queue().enqueue, "add_document", {
+                "collection": collection_name,
+                "file_path": str(stored.path),
+                "document_metadata": {"content_hash": stored.sha256, "filename": file.filename},
+            })
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+                "message": "PDF queued for processing", "duplicate": False, "job_id": job["job_id"], **result
+            })
         
-        ollama_rag = OllamaRAG(base_url=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"))
-        response = ollama_rag.add_documents(file_path=file_path)
-        return {
-            "message": "PDF processed successfully",
-            "filename": file.filename,
-            "file_path": str(file_path),
-            "chroma response": response
-        }
+        # Parsing, embedding and storing block, so they run off the event loop
+        response = await asyncio.to_thread(
+            ollama_rag.add_documents,
+            file_path=str(stored.path),
+            document_metadata={"content_hash": stored.sha256, "filename": file.filename}
+        )
+        return {"message": "PDF processed successfully", "duplicate": False, **result, "chroma response": response}
+    except IngestionInProgress as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         logger.error(f"Error in file_upload: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
-    
-    
+
+
 # @router.get("/test")
 # async def user_ask():
 #     """
@@ -109,12 +265,12 @@ async def upload_file(file: UploadFile = File(...)):
     
     
 @router.get("/collections/count")
-async def get_collection_count():
+async def get_collection_count(collection_name: str = Depends(get_collection_name)):
     """
     Endpoint to get the number of documents in a specific collection.
     """
     try:
-        chromadb = ChromaDBManager(collection_name="resume_collection")
+        chromadb = ChromaDBManager(collection_name=collection_name)
         count = chromadb.get_collection_count()
         return {"collection count": count}
     except Exception as e:
@@ -123,14 +279,223 @@ async def get_collection_count():
     
     
 @router.delete("/collections/reset")
-async def reset_collection():
+async def reset_collection(collection_name: str = Depends(get_collection_name)):
     """
     Endpoint to delete a specific collection.
     """
     try:
-        chromadb = ChromaDBManager(collection_name="resume_collection")
+        if single_writer_enabled():
+            job = await asyncio.to_thread(
+                get_ingestion_queue().enqueue, "reset_collection", {"collection": collection_name}
+            )
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+                "message": "Collection reset queued", "job_id": job["job_id"]
+            })
+        chromadb = ChromaDBManager(collection_name=collection_name)
         chromadb.reset_collection()
         return {"message": "Collection deleted successfully"}
     except Exception as e:
         logger.error(f"Error in delete_collection: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/collections/export")
+async def export_collection(collection_name: str = Depends(get_collection_name)):
+    """
+    Endpoint to download a snapshot of a collection: ids, documents, metadata
+    and embeddings, loadable with /collections/import without re-embedding.
+    """
+    # Snapshots and migrations need NumPy, which is imported on first use rather than at startup
+    from src.core.snapshot import export_snapshot
+
+    try:
+        os.makedirs(settings.SNAPSHOT_DIRECTORY, exist_ok=True)
+        path = os.path.join(settings.SNAPSHOT_DIRECTORY, f"{collection_name}.snapshot")
+        chromadb = ChromaDBManager(collection_name=collection_name)
+        await asyncio.to_thread(export_snapshot, chromadb, path, settings.SNAPSHOT_BLOCK_ROWS)
+        return FileResponse(path, media_type="application/octet-stream", filename=os.path.basename(path))
+    except Exception as e:
+        logger.error(f"Error in export_collection: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/collections/import")
+async def import_collection(
+    file: UploadFile = File(...),
+    collection_name: str = Depends(get_collection_name),
+    skip_existing: bool = Query(True, description="Skip rows and documents already in the collection"),
+):
+    """
+    Endpoint to bulk-load a snapshot produced by /collections/export.
+    """
+    from src.core.snapshot import import_snapshot
+
+    try:
+        stored = await save_upload(file, settings.SNAPSHOT_DIRECTORY, settings.SNAPSHOT_MAX_BYTES,
+                                   chunk_size=settings.UPLOAD_CHUNK_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    
+    try:
+        if single_writer_enabled():
+            job = await asyncio.to_thread(get_ingestion_queue().enqueue, "import_snapshot", {
+                "collection": collection_name, "path": str(stored.path), "skip_existing": skip_existing,
+            })
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+                "message": "Snapshot import queued", "collection": collection_name, "job_id": job["job_id"]
+            })
+        chromadb = ChromaDBManager(collection_name=collection_name)
+        result = await asyncio.to_thread(import_snapshot, chromadb, str(stored.path), skip_existing)
+        return {"message": "Snapshot imported", "collection": collection_name, **result}
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in import_collection: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/collections/migrate")
+async def migrate_collection(
+    collection_name: str = Depends(get_collection_name),
+    model: Optional[str] = Query(None, description="Embedding model to migrate to, defaults to EMBEDDING_MODEL_NAME"),
+    reduce_method: Optional[str] = Query(None, description="Reduce stored vectors with \"pca\" or \"random\""),
+    reduce_dim: Optional[int] = Query(None, description="Dimension to reduce stored vectors to"),
+):
+    """
+    Endpoint to re-embed a collection with another model, or to reduce its
+    vectors to fewer dimensions, in the background. Queries keep using the
+    current collection until the new one is complete.
+    """
+    from src.core.embedding_migration import EmbeddingMigration, start_migration
+
+    target_model = model or embedding_model_name()
+    try:
+        migration = EmbeddingMigration(collection_name, target_model,
+                                       base_url=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"),
+                                       batch_size=settings.MIGRATION_BATCH_SIZE,
+                                       pause_seconds=settings.MIGRATION_PAUSE_SECONDS,
+                                       reduce_method=reduce_method, reduce_dim=reduce_dim,
+                                       sample_size=settings.PROJECTION_SAMPLE_SIZE, seed=settings.PROJECTION_SEED)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if single_writer_enabled():
+        job = await asyncio.to_thread(get_ingestion_queue().enqueue, "migrate_embeddings", {
+            "collection": collection_name, "target_model": target_model,
+            "reduce_method": reduce_method, "reduce_dim": reduce_dim,
+        })
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+            "message": "Embedding migration queued", "job_id": job["job_id"]
+        })
+    try:
+        start_migration(migration)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+        "message": "Embedding migration started", **migration.to_dict()
+    })
+
+
+@router.get("/collections/migration")
+async def get_collection_migration(collection_name: str = Depends(get_collection_name)):
+    """
+    Endpoint to check the progress of an embedding migration started by this worker.
+    """
+    from src.core.embedding_migration import get_migration
+
+    migration = get_migration(collection_name)
+    if migration is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No migration for this collection")
+    return migration.to_dict()
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Endpoint to check a write job queued in WRITER_MODE=single.
+    """
+    job = get_ingestion_queue().get(job_id) if single_writer_enabled() else None
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.get("/collections/stats")
+async def get_collection_stats(collection_name: str = Depends(get_collection_name)):
+    """
+    Endpoint to get document count and usage stats for a specific collection.
+    """
+    try:
+        chromadb = ChromaDBManager(collection_name=collection_name)
+        return chromadb.get_stats()
+    except Exception as e:
+        logger.error(f"Error in get_collection_stats: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/collections/open")
+async def get_open_collections():
+    """
+    Endpoint to list the collection handles currently cached by this worker.
+    """
+    return {
+        "max_open": collection_registry.max_open,
+        "idle_seconds": collection_registry.idle_seconds,
+        "collections": {
+            name: collection_registry.stats(name) for name in collection_registry.open_collections()
+        }
+    }
+
+
+@router.get("/ollama/queues")
+async def get_ollama_queues():
+    """
+    Endpoint to report this worker's Ollama queues per priority class.
+    """
+    return ollama_scheduler.stats()
+
+
+@router.get("/models/tiers")
+async def get_model_tiers():
+    """
+    Endpoint to report the chat model tiers and this worker's generation latency per tier.
+    """
+    return {
+        "tiers": tier_config(os.getenv("MODEL_NAME", "mistral")),
+        "latency": tier_stats.stats(),
+    }
+
+
+@router.get("/memory")
+async def get_memory():
+    """
+    Endpoint to report this worker's resident set size and its peak.
+    """
+    return memory.gauges()
+
+
+@router.get("/admin/memory")
+async def get_memory_allocations(
+    seconds: float = Query(0, ge=0, le=300, description="Trace allocations for this long and list the sites that grew"),
+    top: int = Query(settings.MEMORY_TOP_ALLOCATIONS, ge=1, le=500),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    Admin endpoint listing the source lines holding the most traced memory in this worker, and the
+    memory profiles of recent ingestions. Without tracing enabled (MEMORY_TRACE_ON_STARTUP), pass
+    seconds to trace a window of live traffic.
+    """
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
+    if seconds > 0:
+        with memory.tracing(settings.MEMORY_TRACE_FRAMES):
+            baseline = await asyncio.to_thread(memory.take_snapshot)
+            await asyncio.sleep(seconds)
+            allocations = await asyncio.to_thread(memory.top_allocations, top, None, baseline)
+    else:
+        allocations = await asyncio.to_thread(memory.top_allocations, top)
+    return {
+        **memory.gauges(),
+        "window_seconds": seconds or None,
+        "top_allocations": allocations,
+        "ingestions": recent_memory_profiles(),
+    }
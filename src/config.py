@@ -1,4 +1,5 @@
 import os
+from typing import Dict
 from pydantic_settings import BaseSettings
 
 
@@ -8,7 +9,122 @@ class Settings(BaseSettings):
     API_PREFIX: str = "/api"
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
 
+    ADMIN_TOKEN: str = ""  # X-Admin-Token value that unlocks admin features such as profiling; empty disables it
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0  # stack sampling interval of ?profile=cpu
+    MEMORY_PROFILE_INGESTION: bool = False  # trace memory per stage of every ingestion (slows it down) and log it
+    MEMORY_TRACE_ON_STARTUP: bool = False  # trace allocations for the process lifetime, for the admin memory endpoint
+    MEMORY_TRACE_FRAMES: int = 1  # stack frames kept per traced allocation
+    MEMORY_TOP_ALLOCATIONS: int = 20  # allocation sites listed in memory profiles
+
     # CORS settings
     CORS_ORIGINS: list = ["*"]
 
+    # Ollama settings
+    OLLAMA_KEEP_ALIVE: str = "15m"
+    OLLAMA_MAX_CONCURRENCY: int = 4  # Ollama calls in flight per worker process; 0 disables scheduling
+    OLLAMA_INGESTION_MIN_SHARE: float = 0.2  # share of freed slots ingestion gets while queries are waiting
+    OLLAMA_RESERVED_INTERACTIVE_SLOTS: int = 1  # slots ingestion never takes
+
+    # Collection settings
+    DEFAULT_COLLECTION: str = "resume_collection"
+    COLLECTION_CACHE_SIZE: int = 32  # open collection handles kept per process
+    COLLECTION_IDLE_SECONDS: int = 900  # idle handles are closed after this long
+
+    # Conversation session settings
+    SESSION_MAX_SESSIONS: int = 1000
+    SESSION_TTL_SECONDS: int = 1800
+    SESSION_TOKEN_BUDGET: int = 3000  # context tokens before the history is compacted into a summary
+    SESSION_SUMMARY_TOKENS: int = 200
+
+    # Query router settings
+    ROUTER_ENABLED: bool = True
+    ROUTER_EMBEDDING_ENABLED: bool = False  # also match queries against example centroids (one embedding call)
+    ROUTER_SIMILARITY_THRESHOLD: float = 0.8
+    DIRECT_ANSWER_MAX_TOKENS: int = 150
+
+    # Chat model tiers; MODEL_NAME is the large tier
+    FAST_MODEL_NAME: str = ""  # small model for short lookups; empty sends every question to MODEL_NAME
+    FAST_MODEL_MAX_TOKENS: int = 256  # response-length budget of the fast tier
+    LARGE_MODEL_MAX_TOKENS: int = 1000  # response-length budget of the large tier
+    TIER_MAX_QUERY_WORDS: int = 12  # longer questions go to the large tier
+    TIER_MIN_CONFIDENCE: float = 0.6  # best retrieved similarity the fast tier needs to answer
+
+    # Retrieval settings
+    MIN_SIMILARITY: float = 0.0  # best retrieved similarity below this skips generation; 0 disables
+    MIN_SIMILARITY_BY_COLLECTION: Dict[str, float] = {}  # per-collection overrides, JSON in the environment
+    RETRIEVAL_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # cached search results per process; 0 disables
+
+    # Fan-out retrieval for compound questions
+    FANOUT_ENABLED: bool = True
+    FANOUT_MAX_SUBQUERIES: int = 3
+    FANOUT_MAX_DOCUMENTS: int = 8  # merged documents passed to generation
+
+    # Batch question answering
+    BATCH_MAX_QUESTIONS: int = 500
+    BATCH_CONCURRENCY: int = 4  # generations running at once per batch
+
+    # Chunking settings (approximate tokens)
+    CHUNK_SIZE: int = 500
+    CHUNK_OVERLAP: int = 50
+    BOILERPLATE_REMOVAL: bool = True  # drop lines repeated across pages (headers, footers, page numbers) before chunking
+    BOILERPLATE_MIN_PAGE_FRACTION: float = 0.5  # share of pages a line has to repeat on to be removed
+    BOILERPLATE_MIN_PAGES: int = 3  # documents with fewer pages are left as they are
+
+    # Upload settings
+    UPLOAD_DIRECTORY: str = "/app/raw"  # uploads are stored as <sha256><suffix>
+    UPLOAD_MAX_BYTES: int = 50 * 1024 * 1024
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+
+    # Resumable ingestion
+    INGEST_CHECKPOINT_DIRECTORY: str = "./ingest_checkpoints"  # progress of unfinished ingestions, shared by all workers
+    INGEST_BATCH_CHUNKS: int = 64  # chunks embedded and stored between checkpoints
+    INGEST_BATCH_ATTEMPTS: int = 3  # tries per batch before the ingestion is left to a later retry
+    INGEST_RETRY_BACKOFF_SECONDS: float = 2.0  # wait before the second try, doubled for each further one
+    INGEST_RESUME_ON_STARTUP: bool = True  # finish interrupted ingestions when the application starts
+
+    # Collection snapshots (export/import without re-embedding)
+    SNAPSHOT_DIRECTORY: str = "./snapshots"
+    SNAPSHOT_BLOCK_ROWS: int = 4096  # rows per embedding block
+    SNAPSHOT_MAX_BYTES: int = 4 * 1024 * 1024 * 1024  # largest snapshot accepted by /collections/import
+
+    # HNSW index settings (Chroma backend); per-collection overrides live in the collection catalog
+    HNSW_SPACE: str = "cosine"  # "cosine", "l2" or "ip"
+    HNSW_M: int = 16  # links per node; more improves recall at the cost of memory and build time
+    HNSW_CONSTRUCTION_EF: int = 100  # candidate list size while building
+    HNSW_SEARCH_EF: int = 100  # candidate list size while searching; an existing index picks up changes when reloaded
+
+    # Vector store settings
+    VECTOR_STORE_BACKEND: str = "chroma"  # "chroma" or "numpy" (memory-mapped exact search)
+    VECTOR_STORE_DIRECTORY: str = "./vector_store"
+    VECTOR_QUANTIZATION: str = "none"  # "none", "float16" or "int8" (numpy backend only)
+    QUANTIZATION_RESCORE_FACTOR: int = 4  # candidates rescored in full precision = factor * n_results
+
+    # Embedding migration (re-embedding a collection with another model)
+    MIGRATION_BATCH_SIZE: int = 64
+    MIGRATION_PAUSE_SECONDS: float = 0.5  # pause between batches, leaves Ollama capacity for queries
+    PROJECTION_SAMPLE_SIZE: int = 2000  # rows PCA is fitted on when reducing a collection
+    PROJECTION_SEED: int = 0  # seed of random projections
+
+    # Write settings for multi-worker deployments
+    WRITER_MODE: str = "local"  # "local" (every process writes) or "single" (one process owns writes)
+    INGEST_SPOOL_DIRECTORY: str = "./ingest_spool"  # write jobs and the writer lock, shared by all workers
+    WRITER_POLL_SECONDS: float = 2.0
+
+    # ChromaDB settings
+    CHROMA_MODE: str = "embedded"  # "embedded" (local PersistentClient) or "http" (Chroma server)
+    CHROMA_PERSIST_DIRECTORY: str = "./chroma_db"
+    CHROMA_HOST: str = "chromadb"
+    CHROMA_PORT: int = 8000
+    CHROMA_SSL: bool = False
+    CATALOG_REFRESH_SECONDS: float = 2.0  # http mode: how soon aliases and tags set by other replicas are seen
+
+    # Warm-up settings
+    WARMUP_ENABLED: bool = True
+    KEEP_ALIVE_REFRESH_SECONDS: int = 600  # 0 disables the keep-alive refresher
+
 settings = Settings()
+
+
+def embedding_model_name() -> str:
+    """Model used to embed new collections; defaults to the chat model (MODEL_NAME)"""
+    return os.getenv("EMBEDDING_MODEL_NAME") or os.getenv("MODEL_NAME", "mistral")
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from src.core.ollama_rag import OllamaRAG
+
+logger = logging.getLogger(__name__)
+
+
+def dedupe_documents(docs: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+    """Keep the first (best ranked) copy of each retrieved document"""
+    seen = set()
+    unique_docs = []
+    for text, score in docs:
+        if text not in seen:
+            seen.add(text)
+            unique_docs.append((text, score))
+    return unique_docs
+
+
+async def answer_batch(
+    rag: OllamaRAG,
+    queries: List[str],
+    concurrency: int = 4,
+    include_sources: bool = True
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Answer a batch of questions, yielding each result as soon as it is ready.
+
+    Repeated questions are answered once. All questions are embedded in one
+    request and searched in one vector store query; generations then run
+    with at most `concurrency` in flight, ordered so questions with the same
+    context run back to back and share the prompt prefix Ollama has cached.
+    A failing question yields an item with an "error" instead of an answer.
+
+    Yields:
+        {"index", "query", "answer", "confidence", "sources"} or {"index", "query", "error"}
+    """
+    # Answer each distinct question once
+    positions: Dict[str, List[int]] = {}
+    for index, query in enumerate(queries):
+        positions.setdefault(query.strip(), []).append(index)
+    unique_queries = list(positions)
+
+    try:
+        retrieved: List[Optional[List[Tuple[str, float]]]] = await asyncio.to_thread(rag.retrieve_batch, unique_queries)
+        retrieved = [dedupe_documents(docs) for docs in retrieved]
+    except Exception as e:
+        # Fall back to retrieving per question so one bad input cannot fail the batch
+        logger.warning(f"Batch retrieval failed, retrieving per question: {e}")
+        retrieved = [None] * len(unique_queries)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer(query: str, docs: Optional[List[Tuple[str, float]]]) -> Tuple[str, Dict[str, Any]]:
+        async with semaphore:
+            try:
+                if docs is None:
+                    docs = await asyncio.to_thread(rag.retrieve_relevant_documents, query)
+                result = await asyncio.to_thread(
+                    rag.generate_answer,
+                    query,
+                    include_sources=include_sources,
+                    relevant_docs=docs
+                )
+            except Exception as e:
+                logger.error(f"Error answering batch question {query!r}: {e}")
+                return query, {"error": str(e)}
+            return query, result
+
+    # Group questions with identical context; the semaphore admits waiters in this order
+    order = sorted(range(len(unique_queries)),
+                   key=lambda i: tuple(text for text, _ in retrieved[i] or []))
+    tasks = [asyncio.create_task(answer(unique_queries[i], retrieved[i])) for i in order]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            query, result = await next_done
+            for index in positions[query]:
+                yield {"index": index, "query": queries[index], **result}
+    finally:
+        # The client went away or the caller stopped iterating
+        for task in tasks:
+            task.cancel()
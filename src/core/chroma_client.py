@@ -0,0 +1,90 @@
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from src.config import settings
+
+if TYPE_CHECKING:
+    from chromadb.api import AsyncClientAPI, ClientAPI
+
+# chromadb is imported on first use: it takes about half a second to import
+# and is not needed to start serving requests.
+
+# One client per backend configuration, shared by every ChromaDBManager in the
+# process so HTTP mode reuses a single keep-alive connection pool instead of
+# opening a new client per request.
+_clients: Dict[Tuple, "ClientAPI"] = {}
+_async_clients: Dict[Tuple, "AsyncClientAPI"] = {}
+_lock = threading.Lock()
+
+
+def _client_key(mode: str, persist_directory: Optional[str]) -> Tuple:
+    if mode == "http":
+        return (mode, settings.CHROMA_HOST, settings.CHROMA_PORT, settings.CHROMA_SSL)
+    return (mode, persist_directory or settings.CHROMA_PERSIST_DIRECTORY)
+
+
+def get_chroma_client(mode: Optional[str] = None, persist_directory: Optional[str] = None) -> "ClientAPI":
+    """
+    Get the shared Chroma client for the configured backend.
+
+    Args:
+        mode: "embedded" for a local PersistentClient or "http" for a remote
+            Chroma server. Defaults to settings.CHROMA_MODE.
+        persist_directory: Directory used by the embedded client
+
+    Returns:
+        A Chroma client that is reused for the lifetime of the process
+    """
+    import chromadb
+    from chromadb.config import Settings
+
+    mode = mode or settings.CHROMA_MODE
+    key = _client_key(mode, persist_directory)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            if mode == "http":
+                client = chromadb.HttpClient(
+                    host=settings.CHROMA_HOST,
+                    port=settings.CHROMA_PORT,
+                    ssl=settings.CHROMA_SSL,
+                    settings=Settings(allow_reset=True, anonymized_telemetry=False)
+                )
+            elif mode == "embedded":
+                client = chromadb.PersistentClient(
+                    path=key[1],
+                    settings=Settings(allow_reset=True)
+                )
+            else:
+                raise ValueError(f"Unknown CHROMA_MODE: {mode}")
+            _clients[key] = client
+    return client
+
+
+async def get_async_chroma_client() -> "AsyncClientAPI":
+    """
+    Get the shared async HTTP client. Only available when CHROMA_MODE is "http".
+    """
+    import chromadb
+    from chromadb.config import Settings
+
+    if settings.CHROMA_MODE != "http":
+        raise ValueError("The async Chroma client requires CHROMA_MODE=http")
+    key = _client_key("http", None)
+    client = _async_clients.get(key)
+    if client is None:
+        client = await chromadb.AsyncHttpClient(
+            host=settings.CHROMA_HOST,
+            port=settings.CHROMA_PORT,
+            ssl=settings.CHROMA_SSL,
+            settings=Settings(allow_reset=True, anonymized_telemetry=False)
+        )
+        _async_clients[key] = client
+    return client
+
+
+def clear_chroma_clients() -> None:
+    """Drop the cached clients, e.g. after the backend settings changed"""
+    with _lock:
+        _clients.clear()
+        _async_clients.clear()
@@ -1,44 +1,120 @@
+import asyncio
 import os
-import chromadb
-from chromadb.config import Settings
+import time
 from typing import List, Dict, Any, Optional
+from src.config import embedding_model_name, settings
+from src.core.collection_catalog import get_collection_catalog, get_server_collection_catalog
+from src.core.collection_registry import collection_registry
+from src.core.index_writer import can_write
 from src.core.ollama_embedding import OllamaEmbedding
+from src.core.retrieval_cache import cache_key, merge_rows, retrieval_cache, split_rows
+from src.core.vector_store import HNSW_BUILD_PARAMS, HNSW_PARAMS, VectorStore, default_index_params
+from src.utils.profiling import timed, timed_stage
 
 
 class ChromaDBManager:
-    def __init__(self, collection_name: str, persist_directory: str = "./chroma_db"):
+    def __init__(self, collection_name: str, persist_directory: Optional[str] = None,
+                 embedding_model: Optional[str] = None):
+        """
+        Args:
+            collection_name: Name clients use for the collection; an alias set by
+                an embedding migration may point it at another collection
+            persist_directory: Directory used by the embedded Chroma client
+            embedding_model: Model for a collection that is not tagged with one yet.
+                Defaults to EMBEDDING_MODEL_NAME.
+        """
         self.collection_name = collection_name
-        self.persist_directory = persist_directory
-        self.model_name = os.getenv("MODEL_NAME", "mistral")
-        self.embedding_function = OllamaEmbedding(model_name=self.model_name, base_url=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"))
-        
-        # Initialize ChromaDB client with persistence
-        self.client = chromadb.PersistentClient(
-            path=persist_directory,
-            settings=Settings(allow_reset=True)
-        )
+        self.persist_directory = persist_directory or settings.CHROMA_PERSIST_DIRECTORY
+        if settings.VECTOR_STORE_BACKEND == "numpy":
+            self.catalog = get_collection_catalog(settings.VECTOR_STORE_DIRECTORY)
+        elif settings.CHROMA_MODE == "http":
+            # Kept on the server, so replicas on other hosts share aliases, tags and versions
+            self.catalog = get_server_collection_catalog()
+        else:
+            self.catalog = get_collection_catalog(self.persist_directory)
+        # Resolved once, so a migration switching the alias never splits a request across collections
+        self.physical_name = self.catalog.resolve(collection_name)
+        self.index_params = {**default_index_params(), **self.catalog.index_params(self.physical_name)}
+        self.model_name = self._embedding_model(embedding_model or embedding_model_name())
+        # Reduces stored and query embeddings of this collection, see src/core/projection.py
+        self.projection = self.catalog.load_projection(self.physical_name)
+        self.embedding_function = OllamaEmbedding(model_name=self.model_name,
+                                                  base_url=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"),
+                                                  keep_alive=settings.OLLAMA_KEEP_ALIVE)
         
-        # Create or get collection
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}  # Use cosine similarity
-        )
+        # Open the collection now so a bad backend configuration fails early
+        collection_registry.get_store(self.physical_name, persist_directory=self.persist_directory,
+                                      index_params=self.index_params)
+    
+    def _embedding_model(self, configured: str) -> str:
+        """Model the collection's vectors come from; queries must be embedded with it"""
+        tag = self.catalog.tag(self.physical_name)
+        if tag:
+            return tag["embedding_model"]
+        legacy = os.getenv("MODEL_NAME", "mistral")
+        # Collections created before models were tagged were embedded with the chat model
+        if configured != legacy and self.store.count() > 0:
+            return legacy
+        return configured
+    
+    def _project(self, embeddings: List[List[float]]) -> List[List[float]]:
+        """Map full-size embeddings into the space the collection stores"""
+        if self.projection is None:
+            return embeddings
+        return self.projection.apply(embeddings).tolist()
+    
+    def _check_dimension(self, dim: int) -> None:
+        """Tag the collection on its first write and refuse vectors of another model or size"""
+        tag = self.catalog.tag(self.physical_name)
+        if tag is None:
+            self.catalog.set_tag(self.physical_name, self.model_name, dim)
+        elif tag["dim"] != dim or tag["embedding_model"] != self.model_name:
+            raise ValueError(f"Collection {self.physical_name} holds {tag['dim']}-dim vectors from "
+                             f"{tag['embedding_model']}, got {dim}-dim vectors from {self.model_name}")
+    
+    @property
+    def store(self) -> VectorStore:
+        """
+        Vector store handle (Chroma or memory-mapped NumPy, see VECTOR_STORE_BACKEND),
+        served from the shared registry so repeated managers reuse one open handle.
+        """
+        return collection_registry.get_store(self.physical_name, persist_directory=self.persist_directory,
+                                             index_params=self.index_params)
+    
+    @staticmethod
+    def _check_writable() -> None:
+        """In WRITER_MODE=single only the index writer may change the store"""
+        if not can_write():
+            raise RuntimeError("This process is not the index writer; submit writes through the ingestion queue")
     
+    @timed_stage("store")
     def add_documents(self,
                       documents: List[str],
                       embeddings: List[List[float]],
                       metadatas: Optional[List[Dict[str, Any]]] = None,
-                      ids: Optional[List[str]] = None) -> None:
+                      ids: Optional[List[str]] = None,
+                      projected: bool = False) -> None:
         """
         Add documents to the ChromaDB collection with embeddings.
         
         Args:
             documents: List of text documents to add
+            embeddings: Embeddings from the collection's model
             metadatas: Optional list of metadata dictionaries for each document
             ids: Optional list of unique IDs for each document
+            projected: True if the embeddings are already reduced by the collection's
+                projection, e.g. rows copied from a snapshot
         """
-        if not embeddings:
+        if len(embeddings) == 0:
             return
+        self._check_writable()
+        if projected:
+            expected = self.projection.dim if self.projection else self.catalog.tag(self.physical_name)["dim"]
+            if len(embeddings[0]) != expected:
+                raise ValueError(f"Expected {expected}-dim stored vectors, got {len(embeddings[0])}")
+        else:
+            self._check_dimension(len(embeddings[0]))
+            embeddings = self._project(embeddings)
         
         # Generate IDs if not provided
         if ids is None:
@@ -49,12 +125,24 @@ class ChromaDBManager:
             metadatas = [{"source": "unknown"} for _ in documents]
         
         # Add to collection
-        self.collection.add(
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+        try:
+            self.store.add(
+                ids=ids,
+                embeddings=embeddings,
+                documents=documents,
+                metadatas=metadatas
+            )
+        finally:
+            self._bump_version()
+        collection_registry.record_add(self.physical_name, len(ids))
+    
+    def _bump_version(self) -> None:
+        """
+        Invalidate cached search results of the collection. Called after the
+        write, also when it failed part way, so a search that starts before
+        the bump and caches under the old version only ever adds newer rows.
+        """
+        self.catalog.bump_version(self.physical_name)
     
     def query(self, 
               query_text: str, 
@@ -74,13 +162,109 @@ class ChromaDBManager:
         # Generate embedding for query
         query_embedding = self.embedding_function.embed_query(query_text)
         
-        # Query the collection
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
+        return self.query_by_embedding(query_embedding, n_results=n_results, where=where)
+    
+    def query_by_embedding(self,
+                           query_embedding: List[float],
+                           n_results: int = 5,
+                           where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Query the collection with an already computed embedding.
+        
+        Args:
+            query_embedding: Normalized query embedding
+            n_results: Number of results to return
+            where: Optional metadata filter
+            
+        Returns:
+            Dictionary containing query results
+        """
+        return self.query_by_embeddings([query_embedding], n_results=n_results, where=where)
+    
+    @timed_stage("search")
+    def query_by_embeddings(self,
+                            query_embeddings: List[List[float]],
+                            n_results: int = 5,
+                            where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Query the collection for several embeddings in one search.
+        
+        Args:
+            query_embeddings: Normalized query embeddings
+            n_results: Number of results to return per query
+            where: Optional metadata filter
+            
+        Returns:
+            Dictionary containing query results, one inner list per embedding
+        """
+        keys = self._cache_keys(query_embeddings, n_results, where)
+        rows = [retrieval_cache.get(key) for key in keys] if keys else [None] * len(query_embeddings)
+        missing = [index for index, row in enumerate(rows) if row is None]
+        if len(missing) < len(rows):
+            collection_registry.record_cache_hits(self.physical_name, len(rows) - len(missing))
+        if not missing:
+            return merge_rows(rows)
+        
+        start = time.perf_counter()
+        results = self.store.query(
+            query_embeddings=self._project([query_embeddings[index] for index in missing]),
             n_results=n_results,
             where=where
         )
+        collection_registry.record_query(self.physical_name, time.perf_counter() - start)
+        if not keys:
+            return results
         
+        for index, row in zip(missing, split_rows(results, len(missing))):
+            retrieval_cache.put(keys[index], row)
+            rows[index] = row
+        return merge_rows(rows, results)
+    
+    def _cache_keys(self, query_embeddings: List[List[float]], n_results: int,
+                    where: Optional[Dict[str, Any]]) -> Optional[List[Any]]:
+        """Retrieval cache keys of a search, read before searching; None with the cache disabled"""
+        if not retrieval_cache.enabled:
+            return None
+        version = self.catalog.version(self.physical_name)
+        # Qualified by the catalog's store: equal names in other stores are other collections
+        name = f"{self.catalog.location}/{self.physical_name}"
+        return [cache_key(name, version, embedding, n_results, where) for embedding in query_embeddings]
+    
+    async def aquery_by_embedding(self,
+                                  query_embedding: List[float],
+                                  n_results: int = 5,
+                                  where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Async variant of query_by_embedding. Uses the async HTTP client for
+        the Chroma backend in "http" mode and a worker thread otherwise.
+        
+        Args:
+            query_embedding: Normalized query embedding
+            n_results: Number of results to return
+            where: Optional metadata filter
+            
+        Returns:
+            Dictionary containing query results
+        """
+        if settings.VECTOR_STORE_BACKEND != "chroma" or settings.CHROMA_MODE != "http":
+            return await asyncio.to_thread(self.query_by_embedding, query_embedding, n_results, where)
+        
+        keys = self._cache_keys([query_embedding], n_results, where)
+        cached = retrieval_cache.get(keys[0]) if keys else None
+        if cached is not None:
+            collection_registry.record_cache_hits(self.physical_name, 1)
+            return merge_rows([cached])
+        
+        start = time.perf_counter()
+        with timed("search"):
+            results = await self.store.aquery(
+                query_embeddings=self._project([query_embedding]),
+                n_results=n_results,
+                where=where
+            )
+        collection_registry.record_query(self.physical_name, time.perf_counter() - start)
+        if keys:
+            retrieval_cache.put(keys[0], split_rows(results, 1)[0])
         return results
     
     def add_single_document(self, 
@@ -101,6 +285,18 @@ class ChromaDBManager:
             ids=[doc_id] if doc_id else None
         )
     
+    def has_documents(self, where: Dict[str, Any]) -> bool:
+        """
+        Check whether any document matches a metadata filter.
+        
+        Args:
+            where: Metadata filter, e.g. {"content_hash": "..."}
+            
+        Returns:
+            True if at least one document matches
+        """
+        return len(self.store.get_ids(where=where, limit=1)) > 0
+    
     def delete_documents(self, ids: List[str]) -> None:
         """
         Delete documents from the collection by IDs.
@@ -108,7 +304,12 @@ class ChromaDBManager:
         Args:
             ids: List of document IDs to delete
         """
-        self.collection.delete(ids=ids)
+        self._check_writable()
+        try:
+            self.store.delete(ids)
+        finally:
+            self._bump_version()
+        collection_registry.record_delete(self.physical_name, len(ids))
     
     def get_collection_count(self) -> int:
         """
@@ -117,15 +318,55 @@ class ChromaDBManager:
         Returns:
             Number of documents in the collection
         """
-        return self.collection.count()
+        return self.store.count()
     
     def reset_collection(self) -> None:
         """
         Delete all documents from the collection.
         """
-        self.client.delete_collection(name=self.collection_name)
-        self.collection = self.client.get_or_create_collection(
-            name=self.collection_name,
-            embedding_function=None
-        )
-
+        self._check_writable()
+        try:
+            self.store.reset()
+        finally:
+            self._bump_version()
+        # An empty collection may be rebuilt with another embedding model
+        if self.catalog.tag(self.physical_name) is not None:
+            self.catalog.clear_tag(self.physical_name)
+        collection_registry.record_reset(self.physical_name)
+    
+    def set_index_params(self, params: Dict[str, Any]) -> List[str]:
+        """
+        Set HNSW parameters of the collection. They are kept across resets;
+        search_ef applies when Chroma next loads the index, the others when
+        the collection is rebuilt.
+        
+        Args:
+            params: Any of "space", "M", "construction_ef" and "search_ef"
+            
+        Returns:
+            Parameters that only take effect once the collection is rebuilt
+        """
+        unknown = set(params) - set(HNSW_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown HNSW parameters: {sorted(unknown)}")
+        self.catalog.set_index_params(self.physical_name, params)
+        self.index_params.update(params)
+        self.store.set_index_params(self.index_params)
+        current = self.store.index_params()
+        return [name for name in HNSW_BUILD_PARAMS if name in params and current and current[name] != params[name]]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get usage stats for the collection.
+        
+        Returns:
+            Document count plus query/ingestion counters for this process
+        """
+        stats = collection_registry.stats(self.physical_name)
+        stats["collection"] = self.collection_name
+        stats["serving_collection"] = self.physical_name
+        stats["embedding_model"] = self.model_name
+        stats["index"] = self.store.index_params()
+        stats["version"] = self.catalog.version(self.physical_name)
+        stats["count"] = self.get_collection_count()
+        return stats
@@ -0,0 +1,312 @@
+import base64
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from src.config import settings
+from src.core.chroma_client import get_chroma_client
+
+if TYPE_CHECKING:
+    # Imported on first use: projections need NumPy, which startup does not load
+    from src.core.projection import Projection
+
+CATALOG_FILENAME = "collection_catalog.json"
+# Chroma collection holding the catalog of a Chroma server, see ServerCollectionCatalog. Names
+# with a tenant or a model suffix contain "__", so only this exact name has to be reserved.
+CATALOG_COLLECTION = "pdf-chatbot-catalog"
+CATALOG_SECTIONS = ("aliases", "collections", "versions", "indexes")
+
+
+def physical_collection_name(collection_name: str, embedding_model: str) -> str:
+    """Name of the collection holding `collection_name` embedded with `embedding_model`"""
+    slug = re.sub(r"[^a-zA-Z0-9._-]+", "-", embedding_model).strip("-._")
+    return f"{collection_name}__{slug}"
+
+
+class CollectionCatalog:
+    """
+    Aliases and embedding tags of the collections in one store directory,
+    kept in a JSON file shared by the worker processes of one host (see
+    ServerCollectionCatalog for a Chroma server shared between hosts).
+
+    An alias maps the collection name clients use to the collection that
+    currently serves it; a migration builds a new collection and repoints
+    the alias with one atomic file replace, so a request sees either the
+    old or the new collection. A tag records the embedding model and
+    dimension a collection was built with, and the projection its vectors
+    are reduced with, if any; projection parameters are stored next to the
+    catalog in projections/<collection>.npz. Index parameters chosen for a
+    collection and its version counter are kept apart from its tag, so they
+    survive a reset.
+    """
+
+    def __init__(self, directory: str):
+        self.path = Path(directory) / CATALOG_FILENAME
+        # Identifies the store the catalog describes, e.g. in retrieval cache keys
+        self.location = str(Path(directory).resolve())
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._data: Dict[str, Any] = {"aliases": {}, "collections": {}}
+        self._projections: Dict[str, "Projection"] = {}
+
+    def _file_stamp(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        # The size tells apart two replacements within one timestamp tick that reuse an inode
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _read(self) -> Dict[str, Any]:
+        """Current catalog, re-read only when another process replaced the file"""
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp != self._stamp:
+                if stamp is None:
+                    self._data = {"aliases": {}, "collections": {}}
+                else:
+                    with open(self.path, "r") as f:
+                        self._data = json.load(f)
+                self._stamp = stamp
+            return self._data
+
+    def _update(self, change: Callable[[Dict[str, Any]], None]) -> None:
+        """Apply a change under an exclusive file lock and publish it atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                self._stamp = None
+                data = json.loads(json.dumps(self._read()))
+                change(data)
+                tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def resolve(self, collection_name: str) -> str:
+        """Collection currently serving `collection_name`"""
+        return self._read()["aliases"].get(collection_name, collection_name)
+
+    def tag(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """{"embedding_model", "dim"[, "projection"]} of a collection, or None if it is untagged"""
+        return self._read()["collections"].get(collection_name)
+
+    def set_tag(self, collection_name: str, embedding_model: str, dim: int) -> None:
+        def change(data):
+            data["collections"][collection_name] = {"embedding_model": embedding_model, "dim": dim}
+        self._update(change)
+
+    def clear_tag(self, collection_name: str) -> None:
+        def change(data):
+            data["collections"].pop(collection_name, None)
+        self._update(change)
+        self._delete_projection(collection_name)
+
+    def _projection_path(self, collection_name: str) -> Path:
+        return self.path.parent / "projections" / f"{collection_name}.npz"
+
+    def _write_projection(self, collection_name: str, payload: bytes) -> None:
+        path = self._projection_path(collection_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _read_projection(self, collection_name: str) -> bytes:
+        with open(self._projection_path(collection_name), "rb") as f:
+            return f.read()
+
+    def _delete_projection(self, collection_name: str) -> None:
+        self._projection_path(collection_name).unlink(missing_ok=True)
+
+    def set_projection(self, collection_name: str, embedding_model: str, projection: "Projection") -> None:
+        """Store projection parameters and tag the collection with them"""
+        self._write_projection(collection_name, projection.to_bytes())
+
+        def change(data):
+            data["collections"][collection_name] = {
+                "embedding_model": embedding_model,
+                "dim": projection.source_dim,
+                "projection": {"method": projection.method, "dim": projection.dim, "id": projection.id},
+            }
+        self._update(change)
+
+    def load_projection(self, collection_name: str) -> Optional["Projection"]:
+        """Projection applied to a collection's vectors, or None if they are stored at full size"""
+        tag = self.tag(collection_name)
+        info = tag.get("projection") if tag else None
+        if not info:
+            return None
+        projection = self._projections.get(collection_name)
+        if projection is None or projection.id != info["id"]:
+            from src.core.projection import Projection
+
+            projection = Projection.from_bytes(self._read_projection(collection_name))
+            self._projections[collection_name] = projection
+        return projection
+
+    def version(self, collection_name: str) -> int:
+        """Counter bumped after every write to a collection, see src/core/retrieval_cache.py"""
+        return self._read().get("versions", {}).get(collection_name, 0)
+
+    def _next_version(self, current: int) -> int:
+        return current + 1
+
+    def bump_version(self, collection_name: str) -> None:
+        def change(data):
+            versions = data.setdefault("versions", {})
+            versions[collection_name] = self._next_version(versions.get(collection_name, 0))
+        self._update(change)
+
+    def index_params(self, collection_name: str) -> Dict[str, Any]:
+        """HNSW parameters set for a collection, overriding the HNSW_* settings"""
+        return dict(self._read().get("indexes", {}).get(collection_name, {}))
+
+    def set_index_params(self, collection_name: str, params: Dict[str, Any]) -> None:
+        def change(data):
+            data.setdefault("indexes", {}).setdefault(collection_name, {}).update(params)
+        self._update(change)
+
+    def set_alias(self, collection_name: str, target: str) -> None:
+        """Serve `collection_name` from `target`; an alias to itself is removed"""
+        def change(data):
+            if target == collection_name:
+                data["aliases"].pop(collection_name, None)
+            else:
+                data["aliases"][collection_name] = target
+        self._update(change)
+
+
+class ServerCollectionCatalog(CollectionCatalog):
+    """
+    Catalog of the collections on a Chroma server (CHROMA_MODE=http), kept
+    in a collection on that server so every replica, on any host, sees the
+    same aliases, tags and versions.
+
+    Each alias, tag, version and set of index parameters is one record,
+    and projection parameters are another, so replicas changing different
+    entries never overwrite each other. Aliases, tags and index
+    parameters are served from a copy refreshed at most every
+    `refresh_seconds`: an alias switch by another replica is seen within
+    that interval, changes made through this handle at once. Versions are
+    read from the server on every call instead, one lookup by ID, so the
+    retrieval cache never serves a result from before another replica's
+    write. The server offers no cross-host lock, so versions are made
+    unique by folding in the clock instead of counting up from a value
+    another replica may be bumping at the same time.
+    """
+
+    def __init__(self, get_client: Callable[[], Any], location: str, refresh_seconds: float = 2.0):
+        self._get_client = get_client
+        self.location = location
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = {section: {} for section in CATALOG_SECTIONS}
+        self._read_at: Optional[float] = None
+        self._projections: Dict[str, "Projection"] = {}
+        self._handle = None
+
+    def _collection(self):
+        if self._handle is None:
+            # The records only need to be looked up by ID; the one-dimensional vector is a placeholder
+            self._handle = self._get_client().get_or_create_collection(name=CATALOG_COLLECTION,
+                                                                       embedding_function=None)
+        return self._handle
+
+    def _fetch(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {section: {} for section in CATALOG_SECTIONS}
+        records = self._collection().get(where={"kind": "entry"}, include=["documents"])
+        for record_id, document in zip(records["ids"], records["documents"]):
+            section, name = record_id.split(":", 1)
+            data.setdefault(section, {})[name] = json.loads(document)
+        return data
+
+    def _read(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            if self._read_at is None or now - self._read_at >= self.refresh_seconds:
+                self._data = self._fetch()
+                self._read_at = now
+            return self._data
+
+    def _update(self, change: Callable[[Dict[str, Any]], None]) -> None:
+        """Apply a change to fresh entries and write back only the entries it changed"""
+        with self._lock:
+            before = self._fetch()
+            data = json.loads(json.dumps(before))
+            change(data)
+            upserts, deletes = {}, []
+            for section in set(before) | set(data):
+                old, new = before.get(section, {}), data.get(section, {})
+                upserts.update({f"{section}:{name}": value for name, value in new.items() if old.get(name) != value})
+                deletes.extend(f"{section}:{name}" for name in old if name not in new)
+            collection = self._collection()
+            if upserts:
+                collection.upsert(ids=list(upserts), embeddings=[[0.0]] * len(upserts),
+                                  documents=[json.dumps(value) for value in upserts.values()],
+                                  metadatas=[{"kind": "entry"}] * len(upserts))
+            if deletes:
+                collection.delete(ids=deletes)
+            self._data = data
+            self._read_at = time.monotonic()
+
+    def _write_projection(self, collection_name: str, payload: bytes) -> None:
+        self._collection().upsert(ids=[f"projection:{collection_name}"], embeddings=[[0.0]],
+                                  documents=[base64.b64encode(payload).decode("ascii")],
+                                  metadatas=[{"kind": "projection"}])
+
+    def _read_projection(self, collection_name: str) -> bytes:
+        records = self._collection().get(ids=[f"projection:{collection_name}"], include=["documents"])
+        if not records["ids"]:
+            raise FileNotFoundError(f"No projection stored for {collection_name}")
+        return base64.b64decode(records["documents"][0])
+
+    def _delete_projection(self, collection_name: str) -> None:
+        self._collection().delete(ids=[f"projection:{collection_name}"])
+
+    def version(self, collection_name: str) -> int:
+        records = self._collection().get(ids=[f"versions:{collection_name}"], include=["documents"])
+        return json.loads(records["documents"][0]) if records["ids"] else 0
+
+    def _next_version(self, current: int) -> int:
+        return max(current + 1, time.time_ns())
+
+
+_catalogs: Dict[str, CollectionCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_collection_catalog(directory: str) -> CollectionCatalog:
+    """Shared catalog of a store directory"""
+    key = os.path.abspath(directory)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = CollectionCatalog(directory)
+        return catalog
+
+
+def get_server_collection_catalog() -> ServerCollectionCatalog:
+    """Shared catalog of the configured Chroma server"""
+    scheme = "https" if settings.CHROMA_SSL else "http"
+    location = f"{scheme}://{settings.CHROMA_HOST}:{settings.CHROMA_PORT}"
+    with _catalogs_lock:
+        catalog = _catalogs.get(location)
+        if catalog is None:
+            catalog = _catalogs[location] = ServerCollectionCatalog(
+                lambda: get_chroma_client("http"), location, settings.CATALOG_REFRESH_SECONDS
+            )
+        return catalog
@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import settings
+from src.core.vector_store import VectorStore, create_vector_store
+
+
+class CollectionStats:
+    """Usage counters for one collection"""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.cache_hits = 0
+        self.documents_added = 0
+        self.documents_deleted = 0
+        self.resets = 0
+        self.opened = 0
+        self.last_used: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "queries": self.queries,
+            "avg_query_ms": round(1000 * self.query_seconds / self.queries, 2) if self.queries else 0.0,
+            "cache_hits": self.cache_hits,
+            "documents_added": self.documents_added,
+            "documents_deleted": self.documents_deleted,
+            "resets": self.resets,
+            "times_opened": self.opened,
+            "last_used": self.last_used,
+        }
+
+
+class CollectionRegistry:
+    """
+    Bounded cache of open vector store handles, keyed by collection.
+
+    Handles are evicted least-recently-used once more than `max_open` are
+    open, and after `idle_seconds` without use, so idle tenants do not keep
+    memory-mapped vectors or client handles alive. Stats outlive eviction.
+    """
+
+    def __init__(self, max_open: int = 32, idle_seconds: float = 900):
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self._handles: "OrderedDict[Tuple, Tuple[VectorStore, float]]" = OrderedDict()
+        self._stats: Dict[str, CollectionStats] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(collection_name: str, persist_directory: Optional[str]) -> Tuple:
+        # Backend settings are part of the key so a changed configuration never reuses a stale handle
+        return (collection_name, settings.VECTOR_STORE_BACKEND, settings.CHROMA_MODE,
+                persist_directory or settings.CHROMA_PERSIST_DIRECTORY, settings.VECTOR_STORE_DIRECTORY)
+
+    def get_store(self, collection_name: str, persist_directory: Optional[str] = None,
+                  index_params: Optional[Dict[str, Any]] = None) -> VectorStore:
+        """
+        Get the open handle for a collection, opening it if needed.
+
+        Args:
+            collection_name: Name of the collection
+            persist_directory: Directory used by the embedded Chroma client
+            index_params: HNSW parameters used when the collection is opened
+
+        Returns:
+            The cached VectorStore for the collection
+        """
+        key = self._key(collection_name, persist_directory)
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._handles.get(key)
+            if entry is not None:
+                self._handles.move_to_end(key)
+                self._handles[key] = (entry[0], now)
+                return entry[0]
+
+        store = create_vector_store(collection_name, persist_directory=persist_directory, index_params=index_params)
+        with self._lock:
+            entry = self._handles.get(key)
+            if entry is not None:
+                # Another thread opened it first
+                store.close()
+                store = entry[0]
+            else:
+                self._stats_for(collection_name).opened += 1
+            self._handles[key] = (store, now)
+            self._handles.move_to_end(key)
+            while len(self._handles) > self.max_open:
+                _, (evicted, _) = self._handles.popitem(last=False)
+                evicted.close()
+        return store
+
+    def _evict_idle(self, now: float) -> None:
+        for key, (store, last_used) in list(self._handles.items()):
+            if now - last_used > self.idle_seconds:
+                del self._handles[key]
+                store.close()
+
+    def evict_idle(self) -> None:
+        """Close handles that have been idle for longer than idle_seconds"""
+        with self._lock:
+            self._evict_idle(time.time())
+
+    def _stats_for(self, collection_name: str) -> CollectionStats:
+        stats = self._stats.get(collection_name)
+        if stats is None:
+            stats = self._stats[collection_name] = CollectionStats()
+        return stats
+
+    def record_query(self, collection_name: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._stats_for(collection_name)
+            stats.queries += 1
+            stats.query_seconds += seconds
+            stats.last_used = time.time()
+
+    def record_cache_hits(self, collection_name: str, count: int) -> None:
+        with self._lock:
+            stats = self._stats_for(collection_name)
+            stats.cache_hits += count
+            stats.last_used = time.time()
+
+    def record_add(self, collection_name: str, count: int) -> None:
+        with self._lock:
+            stats = self._stats_for(collection_name)
+            stats.documents_added += count
+            stats.last_used = time.time()
+
+    def record_delete(self, collection_name: str, count: int) -> None:
+        with self._lock:
+            stats = self._stats_for(collection_name)
+            stats.documents_deleted += count
+            stats.last_used = time.time()
+
+    def record_reset(self, collection_name: str) -> None:
+        with self._lock:
+            stats = self._stats_for(collection_name)
+            stats.resets += 1
+            stats.last_used = time.time()
+
+    def is_open(self, collection_name: str) -> bool:
+        with self._lock:
+            return any(key[0] == collection_name for key in self._handles)
+
+    def stats(self, collection_name: str) -> Dict[str, Any]:
+        """Stats for one collection"""
+        with self._lock:
+            result = self._stats_for(collection_name).to_dict()
+        result["open"] = self.is_open(collection_name)
+        return result
+
+    def open_collections(self) -> List[str]:
+        with self._lock:
+            return [key[0] for key in self._handles]
+
+    def clear(self) -> None:
+        """Close every handle and drop all stats"""
+        with self._lock:
+            for store, _ in self._handles.values():
+                store.close()
+            self._handles.clear()
+            self._stats.clear()
+
+
+collection_registry = CollectionRegistry(
+    max_open=settings.COLLECTION_CACHE_SIZE,
+    idle_seconds=settings.COLLECTION_IDLE_SECONDS,
+)
@@ -0,0 +1,229 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.config import settings
+from src.core.chromadb_manager import ChromaDBManager
+from src.core.collection_catalog import physical_collection_name
+from src.core.ollama_embedding import OllamaEmbedding
+from src.core.ollama_scheduler import INGESTION, ollama_priority
+from src.core.projection import PROJECTION_METHODS, Projection
+
+logger = logging.getLogger(__name__)
+
+# Passes over the source after the first one, to pick up rows written during the migration
+MAX_CATCH_UP_PASSES = 3
+
+
+class MigrationStopped(Exception):
+    """Raised inside a migration when it is stopped"""
+
+
+class EmbeddingMigration:
+    """
+    Re-embeds a collection with another model, or reduces its vectors with
+    a projection (see src/core/projection.py), into a new collection.
+
+    The copy is built in batches, with a pause between batches, while
+    queries keep using the current collection. Rows added or deleted in the
+    meantime are caught up in further passes, then the collection's alias
+    is repointed so traffic switches over in one atomic step (with
+    CHROMA_MODE=http, replicas on other hosts follow within
+    CATALOG_REFRESH_SECONDS). The previous
+    collection is kept, so the switch can be reverted. A stopped or failed
+    migration resumes where it left off when run again.
+
+    Vectors stored at full size are reduced without calling the embedding
+    model; PCA is fitted on the first `sample_size` rows.
+    """
+
+    def __init__(self,
+                 collection_name: str,
+                 target_model: str,
+                 base_url: str = "http://ollama:11434",
+                 batch_size: int = 64,
+                 pause_seconds: float = 0.5,
+                 persist_directory: Optional[str] = None,
+                 reduce_method: Optional[str] = None,
+                 reduce_dim: Optional[int] = None,
+                 sample_size: int = 2000,
+                 seed: int = 0):
+        if reduce_method is not None and (reduce_method not in PROJECTION_METHODS or not reduce_dim):
+            raise ValueError(f"Reduction needs a method out of {PROJECTION_METHODS} and a dimension")
+        self.collection_name = collection_name
+        self.target_model = target_model
+        self.reduce_method = reduce_method
+        self.reduce_dim = reduce_dim
+        self.sample_size = sample_size
+        self.seed = seed
+        self.base_url = base_url
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.persist_directory = persist_directory
+        self.status = "pending"
+        self._reuse_vectors = False
+        self.rows_total = 0
+        self.rows_copied = 0
+        self.source_collection: Optional[str] = None
+        self.target_collection: Optional[str] = None
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._stop = threading.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "collection": self.collection_name,
+            "target_model": self.target_model,
+            "reduce_method": self.reduce_method,
+            "reduce_dim": self.reduce_dim,
+            "status": self.status,
+            "rows_total": self.rows_total,
+            "rows_copied": self.rows_copied,
+            "source_collection": self.source_collection,
+            "target_collection": self.target_collection,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _full_vectors(self, batch: Dict[str, Any], rows: List[int], embedder: OllamaEmbedding) -> List[List[float]]:
+        """Full-size target-model embeddings of some rows of a source batch"""
+        if self._reuse_vectors:
+            return batch["embeddings"][rows].tolist()
+        return embedder.embed_batch([batch["documents"][row] for row in rows])
+
+    def _fit_projection(self, source: ChromaDBManager, embedder: OllamaEmbedding) -> Projection:
+        sample = []
+        for batch in source.store.iter_rows(batch_size=self.batch_size):
+            with ollama_priority(INGESTION):
+                sample.extend(self._full_vectors(batch, list(range(len(batch["ids"]))), embedder))
+            # A random projection only needs the input dimension
+            if len(sample) >= self.sample_size or self.reduce_method == "random":
+                break
+        if not sample:
+            raise ValueError(f"{self.collection_name} is empty; there is nothing to fit a projection on")
+        vectors = np.asarray(sample[:self.sample_size], dtype=np.float32)
+        if self.reduce_method == "random":
+            return Projection.random(vectors.shape[1], self.reduce_dim, seed=self.seed)
+        return Projection.fit_pca(vectors, self.reduce_dim)
+
+    def _copy_missing(self, source: ChromaDBManager, target: ChromaDBManager, embedder: OllamaEmbedding) -> int:
+        """Embed source rows the target lacks and drop rows deleted from the source; returns rows changed"""
+        target_ids = set(target.store.get_ids())
+        source_ids = set()
+        changed = 0
+        for batch in source.store.iter_rows(batch_size=self.batch_size):
+            source_ids.update(batch["ids"])
+            rows = [row for row, doc_id in enumerate(batch["ids"]) if doc_id not in target_ids]
+            if not rows:
+                continue
+            if self._stop.is_set():
+                raise MigrationStopped()
+            with ollama_priority(INGESTION):
+                embeddings = self._full_vectors(batch, rows, embedder)
+            target.add_documents(
+                documents=[batch["documents"][row] for row in rows],
+                embeddings=embeddings,
+                metadatas=[batch["metadatas"][row] for row in rows],
+                ids=[batch["ids"][row] for row in rows],
+            )
+            self.rows_copied += len(rows)
+            changed += len(rows)
+            # Throttle, so the migration does not starve queries of embedding capacity
+            self._stop.wait(self.pause_seconds)
+
+        deleted = [doc_id for doc_id in target_ids if doc_id not in source_ids]
+        if deleted:
+            target.delete_documents(deleted)
+        return changed + len(deleted)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run the migration to completion in the calling thread.
+
+        Returns:
+            Final progress, see to_dict()
+        """
+        self.status = "running"
+        self.started_at = time.time()
+        try:
+            source = ChromaDBManager(collection_name=self.collection_name, persist_directory=self.persist_directory)
+            same_model = source.model_name == self.target_model
+            if same_model and source.projection is None and self.reduce_method is None:
+                raise ValueError(f"{self.collection_name} is already embedded with {self.target_model}")
+            self._reuse_vectors = same_model and source.projection is None
+            self.source_collection = source.physical_name
+            suffix = f"-{self.reduce_method}{self.reduce_dim}" if self.reduce_method else ""
+            self.target_collection = physical_collection_name(self.collection_name, self.target_model + suffix)
+            if self.target_collection == self.source_collection:
+                raise ValueError(f"{self.collection_name} is already served from {self.target_collection}")
+            # The new collection is built with the index parameters tuned for the current one
+            index_params = source.catalog.index_params(self.source_collection)
+            if index_params and not source.catalog.index_params(self.target_collection):
+                source.catalog.set_index_params(self.target_collection, index_params)
+            target = ChromaDBManager(collection_name=self.target_collection, persist_directory=self.persist_directory,
+                                     embedding_model=self.target_model)
+            if target.model_name != self.target_model:
+                raise ValueError(f"{self.target_collection} already holds vectors from {target.model_name}")
+            embedder = OllamaEmbedding(self.target_model, self.base_url, keep_alive=settings.OLLAMA_KEEP_ALIVE)
+            if self.reduce_method and target.projection is None:
+                projection = self._fit_projection(source, embedder)
+                target.catalog.set_projection(self.target_collection, self.target_model, projection)
+                target.projection = projection
+
+            self.rows_total = source.get_collection_count()
+            self._copy_missing(source, target, embedder)
+            for _ in range(MAX_CATCH_UP_PASSES):
+                if self._copy_missing(source, target, embedder) == 0:
+                    break
+            else:
+                logger.warning(f"{self.collection_name} kept changing during the migration; switching anyway")
+
+            source.catalog.set_alias(self.collection_name, self.target_collection)
+            self.status = "done"
+            logger.info(f"{self.collection_name} now served from {self.target_collection} ({self.target_model})")
+        except MigrationStopped:
+            self.status = "stopped"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            raise
+        finally:
+            self.finished_at = time.time()
+        return self.to_dict()
+
+
+_migrations: Dict[str, EmbeddingMigration] = {}
+_migrations_lock = threading.Lock()
+
+
+def _run_in_background(migration: EmbeddingMigration) -> None:
+    try:
+        migration.run()
+    except Exception as e:
+        logger.error(f"Embedding migration of {migration.collection_name} failed: {e}")
+
+
+def start_migration(migration: EmbeddingMigration) -> EmbeddingMigration:
+    """Run a migration in a background thread of this process; one per collection at a time"""
+    with _migrations_lock:
+        current = _migrations.get(migration.collection_name)
+        if current is not None and current.status in ("pending", "running"):
+            raise ValueError(f"A migration of {migration.collection_name} is already running")
+        _migrations[migration.collection_name] = migration
+    threading.Thread(target=_run_in_background, args=(migration,), daemon=True,
+                     name=f"migration-{migration.collection_name}").start()
+    return migration
+
+
+def get_migration(collection_name: str) -> Optional[EmbeddingMigration]:
+    """Latest migration of a collection started in this process"""
+    with _migrations_lock:
+        return _migrations.get(collection_name)
@@ -0,0 +1,264 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ("pending", "running", "done", "failed")
+JOB_ID_PATTERN = re.compile(r"^\d{20}-[0-9a-f]{8}$")
+
+
+class WriterLock:
+    """
+    Exclusive, non-blocking flock on a file shared by all workers.
+
+    The operating system releases the lock when the holding process exits,
+    so another worker can take over writes after a crash.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        """Try to take the lock; returns True if this process holds it"""
+        if self._file is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.path, "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self) -> None:
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class IngestionQueue:
+    """
+    Write jobs spooled as JSON files, one directory per state.
+
+    Any worker can enqueue; only the process holding the writer lock
+    claims jobs. Files are written to a temporary name and renamed, so a
+    job is never seen half-written.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        for state in JOB_STATES:
+            (self.directory / state).mkdir(parents=True, exist_ok=True)
+
+    def _path(self, state: str, job_id: str) -> Path:
+        return self.directory / state / f"{job_id}.json"
+
+    def _write(self, path: Path, job: Dict[str, Any]) -> None:
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Add a job and return it"""
+        # Time-ordered IDs so pending jobs run in submission order
+        job_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        job = {"job_id": job_id, "type": job_type, "payload": payload, "status": "pending",
+               "created_at": time.time()}
+        self._write(self._path("pending", job_id), job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a job, or None if it does not exist"""
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        for state in JOB_STATES:
+            path = self._path(state, job_id)
+            try:
+                with open(path, "r") as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                continue
+        return None
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Move the oldest pending job to running and return it"""
+        for path in sorted((self.directory / "pending").glob("*.json")):
+            with open(path, "r") as f:
+                job = json.load(f)
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            self._write(self._path("running", job["job_id"]), job)
+            path.unlink()
+            return job
+        return None
+
+    def finish(self, job: Dict[str, Any], error: Optional[str] = None, result: Any = None) -> None:
+        state = "failed" if error else "done"
+        job.update(status=state, finished_at=time.time(), error=error, result=result)
+        self._write(self._path(state, job["job_id"]), job)
+        self._path("running", job["job_id"]).unlink(missing_ok=True)
+
+    def requeue_running(self) -> int:
+        """Return jobs left running by a writer that died to the pending queue"""
+        count = 0
+        for path in (self.directory / "running").glob("*.json"):
+            os.replace(path, self.directory / "pending" / path.name)
+            count += 1
+        return count
+
+    def pending_count(self) -> int:
+        return len(list((self.directory / "pending").glob("*.json")))
+
+
+class IndexWriter:
+    """
+    Applies spooled write jobs while this process holds the writer lock.
+
+    Every worker runs `run()`; the lock makes exactly one of them the
+    writer at a time. Readers in other workers see new rows on their next
+    query, once the writer commits them.
+    """
+
+    def __init__(self, queue: IngestionQueue, lock: WriterLock, handlers: Dict[str, Callable[[Dict[str, Any]], Any]]):
+        self.queue = queue
+        self.lock = lock
+        self.handlers = handlers
+
+    def process_pending(self) -> int:
+        """Run every pending job; returns how many ran"""
+        processed = 0
+        while True:
+            job = self.queue.claim_next()
+            if job is None:
+                return processed
+            handler = self.handlers.get(job["type"])
+            try:
+                if handler is None:
+                    raise ValueError(f"Unknown job type: {job['type']}")
+                result = handler(job["payload"])
+                self.queue.finish(job, result=result)
+            except Exception as e:
+                logger.error(f"Write job {job['job_id']} ({job['type']}) failed: {e}")
+                self.queue.finish(job, error=str(e))
+            processed += 1
+
+    def try_become_writer(self) -> bool:
+        if self.lock.held:
+            return True
+        if not self.lock.acquire():
+            return False
+        requeued = self.queue.requeue_running()
+        logger.info(f"Process {os.getpid()} is now the index writer"
+                    + (f", requeued {requeued} interrupted jobs" if requeued else ""))
+        return True
+
+    async def run(self, poll_seconds: float) -> None:
+        """Poll for the writer lock and, while holding it, for pending jobs"""
+        try:
+            while True:
+                if await asyncio.to_thread(self.try_become_writer):
+                    await asyncio.to_thread(self.process_pending)
+                await asyncio.sleep(poll_seconds)
+        finally:
+            self.lock.release()
+
+
+def add_document_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Ingest an uploaded file into a collection"""
+    from src.core.ingest_checkpoint import ingestion_pending
+    from src.core.ollama_rag import OllamaRAG
+
+    rag = OllamaRAG(base_url=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"),
+                    collection_name=payload["collection"])
+    content_hash = payload["document_metadata"].get("content_hash")
+    # The same file may have been queued twice before either job ran
+    if (content_hash and rag.chroma_client.has_documents({"content_hash": content_hash})
+            and not ingestion_pending(payload["collection"], content_hash)):
+        return {"duplicate": True}
+    rag.add_documents(file_path=payload["file_path"], document_metadata=payload["document_metadata"])
+    return {"duplicate": False, "count": rag.chroma_client.get_collection_count()}
+
+
+def reset_collection_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Delete every document of a collection"""
+    from src.core.chromadb_manager import ChromaDBManager
+
+    ChromaDBManager(collection_name=payload["collection"]).reset_collection()
+    return {}
+
+
+def import_snapshot_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Bulk-load an uploaded collection snapshot"""
+    from src.core.chromadb_manager import ChromaDBManager
+    from src.core.snapshot import import_snapshot
+
+    return import_snapshot(ChromaDBManager(collection_name=payload["collection"]), payload["path"],
+                           skip_existing=payload.get("skip_existing", True))
+
+
+def migrate_embeddings_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Re-embed a collection with another model; other write jobs wait until it finishes"""
+    from src.core.embedding_migration import EmbeddingMigration
+
+    return EmbeddingMigration(payload["collection"], payload["target_model"],
+                              base_url=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"),
+                              batch_size=settings.MIGRATION_BATCH_SIZE,
+                              pause_seconds=settings.MIGRATION_PAUSE_SECONDS,
+                              reduce_method=payload.get("reduce_method"), reduce_dim=payload.get("reduce_dim"),
+                              sample_size=settings.PROJECTION_SAMPLE_SIZE, seed=settings.PROJECTION_SEED).run()
+
+
+JOB_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "add_document": add_document_job,
+    "reset_collection": reset_collection_job,
+    "import_snapshot": import_snapshot_job,
+    "migrate_embeddings": migrate_embeddings_job,
+}
+
+
+def single_writer_enabled() -> bool:
+    return settings.WRITER_MODE == "single"
+
+
+def check_writer_mode() -> None:
+    """Reject configurations where several processes would write the same embedded store"""
+    if settings.WRITER_MODE not in ("local", "single"):
+        raise ValueError(f"Unknown WRITER_MODE: {settings.WRITER_MODE}")
+    if single_writer_enabled() and settings.VECTOR_STORE_BACKEND != "numpy":
+        raise ValueError("WRITER_MODE=single requires VECTOR_STORE_BACKEND=numpy; "
+                         "use CHROMA_MODE=http to share a Chroma index between workers")
+
+
+writer_lock = WriterLock(os.path.join(settings.INGEST_SPOOL_DIRECTORY, "writer.lock"))
+
+
+def get_ingestion_queue() -> IngestionQueue:
+    return IngestionQueue(settings.INGEST_SPOOL_DIRECTORY)
+
+
+def can_write() -> bool:
+    """Whether this process may write to the vector store"""
+    return not single_writer_enabled() or writer_lock.held
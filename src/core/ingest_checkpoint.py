@@ -0,0 +1,141 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class IngestionInProgress(Exception):
+    """The file is already being ingested into the collection by another thread or worker"""
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestCheckpoints:
+    """
+    Progress of unfinished ingestions, one JSON file per collection and
+    file hash, shared by all workers.
+
+    OllamaRAG.add_documents marks each batch of chunks in flight before
+    storing it and committed afterwards, so a retry or a restart continues
+    after the last committed chunk instead of embedding the whole file
+    again. Checkpoints are flushed to disk under a temporary name and
+    renamed, and deleted once the file is completely ingested.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def _path(self, collection_name: str, content_hash: str, suffix: str = ".json") -> Path:
+        return self.directory / collection_name / f"{content_hash}{suffix}"
+
+    def load(self, collection_name: str, content_hash: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(collection_name, content_hash), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, checkpoint: Dict[str, Any]) -> None:
+        path = self._path(checkpoint["collection"], checkpoint["content_hash"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        checkpoint["updated_at"] = time.time()
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def delete(self, collection_name: str, content_hash: str) -> None:
+        self._path(collection_name, content_hash).unlink(missing_ok=True)
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Checkpoints of every unfinished ingestion, oldest first"""
+        checkpoints = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                with open(path, "r") as f:
+                    checkpoints.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable ingestion checkpoint {path}: {e}")
+        return sorted(checkpoints, key=lambda checkpoint: checkpoint.get("started_at", 0))
+
+    @contextmanager
+    def claim(self, collection_name: str, content_hash: str) -> Iterator[None]:
+        """
+        Hold an exclusive flock for ingesting one file into one collection.
+        Raises IngestionInProgress if another thread or process holds it.
+        """
+        path = self._path(collection_name, content_hash, ".lock")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            lock_file = open(path, "a+")
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise IngestionInProgress(f"{content_hash} is already being ingested into {collection_name}")
+            # The previous holder removes the lock file when it finishes; lock the new one instead
+            try:
+                if os.stat(path).st_ino == os.fstat(lock_file.fileno()).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+        try:
+            yield
+        finally:
+            if self.load(collection_name, content_hash) is None:
+                path.unlink(missing_ok=True)
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            lock_file.close()
+
+
+def get_ingest_checkpoints() -> IngestCheckpoints:
+    return IngestCheckpoints(settings.INGEST_CHECKPOINT_DIRECTORY)
+
+
+def ingestion_pending(collection_name: str, content_hash: str) -> bool:
+    """Whether an ingestion of the file into the collection was started and has not finished"""
+    return get_ingest_checkpoints().load(collection_name, content_hash) is not None
+
+
+def resume_interrupted_ingestions(base_url: str) -> int:
+    """Finish the ingestions a stopped process left behind; returns how many completed"""
+    from src.core.ollama_rag import OllamaRAG
+
+    completed = 0
+    for checkpoint in get_ingest_checkpoints().pending():
+        if checkpoint.get("custom_metadata"):
+            # Per-chunk metadata is not checkpointed; the caller has to retry these
+            continue
+        if not os.path.exists(checkpoint["file_path"]):
+            logger.warning(f"Cannot resume ingestion of {checkpoint['file_path']}: file no longer exists")
+            continue
+        try:
+            rag = OllamaRAG(base_url=base_url, collection_name=checkpoint["collection"])
+            rag.add_documents(file_path=checkpoint["file_path"], document_metadata=checkpoint["document_metadata"])
+            completed += 1
+        except IngestionInProgress:
+            continue
+        except Exception as e:
+            logger.error(f"Resuming ingestion of {checkpoint['file_path']} into {checkpoint['collection']} failed: {e}")
+    return completed
@@ -0,0 +1,140 @@
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from src.config import settings
+
+TIER_FAST = "fast"  # small model for short lookups
+TIER_LARGE = "large"  # MODEL_NAME, for everything else
+
+# Generations kept per tier for the percentile in stats()
+RECENT_LATENCIES = 1000
+
+# Questions asking for reasoning or a long answer rather than a lookup
+COMPLEX_CUES = re.compile(
+    r"\b(why|how (do|does|did|can|could|would|should)|explain\w*|compar\w*|contrast|differen\w*|summar\w*|"
+    r"analy[sz]\w*|describe|discuss|evaluat\w*|assess|pros and cons|advantages|disadvantages|"
+    r"step by step|in detail|overview|relationship)\b",
+    re.IGNORECASE,
+)
+
+
+def tier_max_tokens(tier: str) -> int:
+    """Response-length budget of a tier"""
+    return settings.FAST_MODEL_MAX_TOKENS if tier == TIER_FAST else settings.LARGE_MODEL_MAX_TOKENS
+
+
+class TierDecision:
+    """Model tier chosen for a question and why"""
+
+    def __init__(self, tier: str, reason: str):
+        self.tier = tier
+        self.reason = reason
+
+    @property
+    def max_tokens(self) -> int:
+        return tier_max_tokens(self.tier)
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"tier": self.tier, "reason": self.reason}
+
+
+class TierRouter:
+    """
+    Chooses the chat model that answers a question.
+
+    A question goes to the fast tier only when it looks like a lookup: at
+    most `max_query_words` words, a single question, no words asking for an
+    explanation, comparison or summary, and retrieval found a passage with
+    at least `min_confidence` similarity to answer from. Anything else, and
+    everything when no fast model is configured, goes to the large tier.
+    """
+
+    def __init__(self, fast_available: bool, max_query_words: int = 12, min_confidence: float = 0.6):
+        self.fast_available = fast_available
+        self.max_query_words = max_query_words
+        self.min_confidence = min_confidence
+
+    def choose(self, query: str, relevant_docs: List[Tuple[str, float]]) -> TierDecision:
+        if not self.fast_available:
+            return TierDecision(TIER_LARGE, "single_tier")
+
+        words = len(re.findall(r"\w+", query))
+        if words > self.max_query_words:
+            return TierDecision(TIER_LARGE, f"long_query:{words}")
+        if query.count("?") > 1:
+            return TierDecision(TIER_LARGE, "compound")
+        cue = COMPLEX_CUES.search(query)
+        if cue:
+            return TierDecision(TIER_LARGE, f"cue:{cue.group(0).lower()}")
+
+        best_similarity = max((score for _, score in relevant_docs), default=0.0)
+        if best_similarity < self.min_confidence:
+            return TierDecision(TIER_LARGE, f"low_confidence:{best_similarity:.2f}")
+        return TierDecision(TIER_FAST, f"lookup:{best_similarity:.2f}")
+
+
+class TierStats:
+    """Generation latency per tier"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers: Dict[str, Dict[str, Any]] = {}
+
+    def _tier(self, tier: str) -> Dict[str, Any]:
+        return self._tiers.setdefault(tier, {"requests": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0,
+                                             "recent": deque(maxlen=RECENT_LATENCIES)})
+
+    def record(self, tier: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            stats = self._tier(tier)
+            stats["requests"] += 1
+            stats["errors"] += int(error)
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["recent"].append(seconds)
+
+    @contextmanager
+    def measure(self, tier: str) -> Iterator[None]:
+        """Record how long the generation inside the block takes"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.record(tier, time.perf_counter() - start, error=True)
+            raise
+        self.record(tier, time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for tier, stats in self._tiers.items():
+                recent: Deque[float] = stats["recent"]
+                latencies = sorted(recent)
+                result[tier] = {
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "mean_ms": round(1000 * stats["seconds"] / stats["requests"], 2),
+                    "p95_ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 2),
+                    "max_ms": round(1000 * stats["max_seconds"], 2),
+                }
+            return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tiers.clear()
+
+
+def tier_config(large_model: str) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Model and response-length budget of each configured tier"""
+    return {
+        TIER_FAST: {"model": settings.FAST_MODEL_NAME, "max_tokens": tier_max_tokens(TIER_FAST)}
+        if settings.FAST_MODEL_NAME else None,
+        TIER_LARGE: {"model": large_model, "max_tokens": tier_max_tokens(TIER_LARGE)},
+    }
+
+
+tier_stats = TierStats()
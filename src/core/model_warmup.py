@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from src.core.chromadb_manager import ChromaDBManager
+from src.core.ollama_chat import OllamaChat
+from src.core.ollama_embedding import OllamaEmbedding
+
+logger = logging.getLogger(__name__)
+
+# Warm-up states reported by /ready; only a ready worker receives traffic
+STATE_WARMING = "warming"
+STATE_READY = "ready"
+STATE_DEGRADED = "degraded"  # a step failed; retried on the next keep-alive refresh
+
+
+class ModelWarmup:
+    """
+    Preloads the Ollama models and the Chroma index so the first request is
+    not cold. The worker is ready only once every step has succeeded.
+    """
+
+    def __init__(self,
+                 chat_model: str = "mistral",
+                 embedding_model: str = "mistral",
+                 base_url: str = "http://ollama:11434",
+                 collection_name: str = "resume_collection",
+                 keep_alive: str = "15m",
+                 fast_chat_model: Optional[str] = None):
+        self.collection_name = collection_name
+        self.chat_client = OllamaChat(chat_model, base_url, keep_alive=keep_alive)
+        self.fast_chat_client = OllamaChat(fast_chat_model, base_url, keep_alive=keep_alive) if fast_chat_model else None
+        self.embedding_client = OllamaEmbedding(embedding_model, base_url, keep_alive=keep_alive)
+        self.state = STATE_WARMING
+        self.durations: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.last_refresh: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == STATE_READY
+
+    def _run_step(self, name: str, func) -> Any:
+        """Run a single warm-up step, recording its duration and any error"""
+        start = time.perf_counter()
+        try:
+            return func()
+        except Exception as e:
+            logger.warning(f"Warm-up step '{name}' failed: {e}")
+            self.errors[name] = str(e)
+            return None
+        finally:
+            self.durations[name] = round(time.perf_counter() - start, 4)
+
+    def _warm_index(self) -> None:
+        """
+        Run one search so the HNSW index is loaded into memory. The query is
+        embedded with the collection's own model, which differs from the
+        configured one for legacy and migrated collections.
+        """
+        chromadb = ChromaDBManager(collection_name=self.collection_name)
+        if chromadb.get_collection_count() == 0:
+            return
+        query_embedding = chromadb.embedding_function.embed_query("warm-up")
+        chromadb.query_by_embedding(query_embedding, n_results=1)
+
+    def warm_up(self) -> None:
+        """
+        Run the blocking warm-up sequence: load the chat models, run a dummy
+        embedding and generation, then touch the vector index.
+        """
+        self.errors = {}
+        self._run_step("chat_model", self.chat_client.preload)
+        if self.fast_chat_client is not None:
+            self._run_step("fast_chat_model", self.fast_chat_client.preload)
+        self._run_step("embedding", lambda: self.embedding_client.embed_query("warm-up"))
+        self._run_step(
+            "generation",
+            lambda: self.chat_client.generate_answer("warm-up", context=[], max_tokens=1)
+        )
+        self._run_step("index", self._warm_index)
+        self.state = STATE_DEGRADED if self.errors else STATE_READY
+        logger.info(f"Warm-up finished ({self.state}) in {sum(self.durations.values()):.2f}s: {self.durations}")
+
+    def refresh_keep_alive(self) -> None:
+        """Ping the models so Ollama does not unload them while idle; a degraded worker warms up again"""
+        if self.state == STATE_DEGRADED:
+            self.warm_up()
+            self.last_refresh = time.time()
+            return
+        clients = [("chat_model", self.chat_client), ("embedding_model", self.embedding_client)]
+        if self.fast_chat_client is not None:
+            clients.append(("fast_chat_model", self.fast_chat_client))
+        for name, client in clients:
+            try:
+                client.preload()
+            except Exception as e:
+                logger.warning(f"Keep-alive refresh for {name} failed: {e}")
+        self.last_refresh = time.time()
+
+    async def run(self) -> None:
+        """Run the warm-up without blocking the event loop"""
+        await asyncio.to_thread(self.warm_up)
+
+    async def keep_alive_loop(self, interval_seconds: int) -> None:
+        """Refresh the models' keep_alive every interval until cancelled"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await asyncio.to_thread(self.refresh_keep_alive)
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness details for the /ready endpoint"""
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "durations": self.durations,
+            "errors": self.errors,
+            "last_keep_alive_refresh": self.last_refresh,
+        }
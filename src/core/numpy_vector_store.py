@@ -0,0 +1,416 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from src.core.quantization import ScalarQuantizer
+from src.core.vector_store import VectorStore
+
+# Rows scored per matrix product, bounds the temporary score buffer
+SEARCH_BLOCK_ROWS = 65536
+
+# The int8 range is refitted on all rows until the collection reaches this size
+QUANTIZER_FIT_ROWS = 2048
+
+
+def matches_where(metadata: Optional[Dict[str, Any]], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate a Chroma-style metadata filter against one metadata dict.
+    Supports field equality plus $eq, $ne, $gt, $gte, $lt, $lte, $in, $nin,
+    $and and $or.
+    """
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_where(metadata, sub) for sub in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, expected in condition.items():
+            if op == "$eq" and value != expected:
+                return False
+            if op == "$ne" and value == expected:
+                return False
+            if op == "$in" and value not in expected:
+                return False
+            if op == "$nin" and value in expected:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > expected:
+                    return False
+                if op == "$gte" and not value >= expected:
+                    return False
+                if op == "$lt" and not value < expected:
+                    return False
+                if op == "$lte" and not value <= expected:
+                    return False
+    return True
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact-search vector store for small and medium collections.
+
+    Embeddings are appended to a raw float32 file that is memory-mapped
+    read-only for search, so worker processes on the same node share the
+    page cache instead of each holding a copy. Documents and metadata are
+    appended to a JSON lines file; only IDs, metadata and byte offsets are
+    kept in memory and document text is read for the returned hits only.
+
+    meta.json holds the number of committed rows and is replaced atomically
+    after every write, so readers never see a half-written batch. Deletes
+    are tombstones; reset() drops the files.
+
+    With quantization set to "int8" or "float16", a second file of
+    quantized codes is what search scans, and the float32 rows of the top
+    `rescore_factor * n_results` candidates are read back to rescore them
+    exactly. Only the codes need to stay resident; the float32 file is
+    touched for a handful of rows per query. The quantization setting is
+    stored in meta.json and the int8 parameters in quantizer.npz.
+    """
+
+    def __init__(self,
+                 collection_name: str,
+                 directory: str = "./vector_store",
+                 quantization: str = "none",
+                 rescore_factor: int = 4):
+        self.collection_name = collection_name
+        self.default_quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.path = Path(directory) / collection_name
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.path / "vectors.f32"
+        self.codes_path = self.path / "vectors.codes"
+        self.quantizer_path = self.path / "quantizer.npz"
+        self.records_path = self.path / "records.jsonl"
+        self.meta_path = self.path / "meta.json"
+        self._lock = threading.RLock()
+        self._meta_stamp = None
+        self._load()
+
+    # -- state -------------------------------------------------------------
+
+    def _read_meta(self) -> Dict[str, Any]:
+        if not self.meta_path.exists():
+            return {"dim": None, "rows": 0, "records_bytes": 0, "deleted": [], "version": 0, "epoch": 0,
+                    "quantization": self.default_quantization}
+        with open(self.meta_path, "r") as f:
+            return json.load(f)
+
+    def _commit(self, meta: Dict[str, Any]) -> None:
+        """Atomically publish a new meta.json and load the rows it commits"""
+        tmp_path = self.meta_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.meta_path)
+        self._load()
+
+    def _load(self) -> None:
+        """
+        Load committed rows (ids, metadata, document offsets) and map the
+        vectors. Rows already loaded from the same epoch are kept, so only
+        newly committed records are parsed.
+        """
+        previous = getattr(self, "meta", None)
+        self.meta = self._read_meta()
+        self._meta_stamp = self._stamp()
+        rows = self.meta["rows"]
+
+        if previous is None or previous.get("epoch") != self.meta.get("epoch") or previous["rows"] > rows:
+            self.ids: List[str] = []
+            self.metadatas: List[Dict[str, Any]] = []
+            self.offsets = np.zeros(0, dtype=np.int64)
+            start_byte = 0
+        else:
+            start_byte = previous["records_bytes"]
+
+        loaded = len(self.ids)
+        if rows > loaded:
+            new_offsets = np.zeros(rows - loaded, dtype=np.int64)
+            with open(self.records_path, "rb") as f:
+                f.seek(start_byte)
+                for i in range(rows - loaded):
+                    new_offsets[i] = f.tell()
+                    record = json.loads(f.readline())
+                    self.ids.append(record["id"])
+                    self.metadatas.append(record["metadata"])
+            self.offsets = np.concatenate([self.offsets, new_offsets])
+
+        self.deleted = np.zeros(rows, dtype=bool)
+        self.deleted[self.meta["deleted"]] = True
+        self.id_to_row = {doc_id: row for row, doc_id in enumerate(self.ids) if not self.deleted[row]}
+        self._map_vectors()
+
+    @property
+    def quantization(self) -> str:
+        return self.meta.get("quantization", "none")
+
+    def _map_vectors(self) -> None:
+        rows, dim = self.meta["rows"], self.meta["dim"]
+        self.codes, self.quantizer = None, None
+        if rows:
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, dim))
+        else:
+            self.vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        if self.quantization != "none" and rows:
+            self.quantizer = ScalarQuantizer.load(self.quantizer_path)
+            self.codes = np.memmap(self.codes_path, dtype=self.quantizer.code_dtype, mode="r", shape=(rows, dim))
+
+    def _stamp(self):
+        """Identity of the current meta.json; it is replaced (new inode) on every commit"""
+        if not self.meta_path.exists():
+            return None
+        stat = self.meta_path.stat()
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _refresh(self) -> None:
+        """Pick up rows committed by another process"""
+        if self._stamp() != self._meta_stamp:
+            self._load()
+
+    def _truncate_uncommitted(self) -> None:
+        """Drop bytes of a batch that was appended but never committed"""
+        if self.vectors_path.exists() and self.meta["dim"]:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(self.meta["rows"] * self.meta["dim"] * 4)
+        if self.codes_path.exists() and self.meta["dim"] and self.quantization != "none":
+            itemsize = np.dtype(ScalarQuantizer(self.quantization).code_dtype).itemsize
+            with open(self.codes_path, "r+b") as f:
+                f.truncate(self.meta["rows"] * self.meta["dim"] * itemsize)
+        if self.records_path.exists():
+            with open(self.records_path, "r+b") as f:
+                f.truncate(self.meta["records_bytes"])
+
+    def _write_codes(self, vectors: np.ndarray, total_rows: int) -> None:
+        """
+        Append codes for new rows. While the collection is small, and on the
+        first write whatever its size, the int8 range is refitted on every
+        row and the codes file is rewritten into a new file, so readers
+        holding the old mapping are unaffected.
+        """
+        quantizer = self.quantizer or ScalarQuantizer(self.quantization)
+        if self.quantization == "int8" and (self.quantizer is None or total_rows <= QUANTIZER_FIT_ROWS):
+            committed = np.asarray(self.vectors, dtype=np.float32)
+            all_vectors = np.concatenate([committed, vectors]) if len(committed) else vectors
+            quantizer = ScalarQuantizer("int8").fit(all_vectors)
+            tmp_path = self.codes_path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(quantizer.encode(all_vectors).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.codes_path)
+        else:
+            with open(self.codes_path, "ab") as f:
+                f.write(quantizer.encode(vectors).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        quantizer.save(self.quantizer_path)
+
+    def _read_documents(self, offsets: np.ndarray) -> List[str]:
+        documents = []
+        with open(self.records_path, "rb") as f:
+            for offset in offsets:
+                f.seek(int(offset))
+                documents.append(json.loads(f.readline())["document"])
+        return documents
+
+    # -- VectorStore -------------------------------------------------------
+
+    def add(self, ids, embeddings, documents, metadatas) -> None:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2:
+            raise ValueError("Embeddings must be a list of vectors")
+
+        with self._lock:
+            self._refresh()
+            meta = dict(self.meta)
+            dim = meta["dim"]
+            if dim is None:
+                dim = meta["dim"] = int(vectors.shape[1])
+            elif vectors.shape[1] != dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {dim}")
+            self._truncate_uncommitted()
+
+            # Re-adding an existing ID replaces the previous row
+            replaced = [self.id_to_row[doc_id] for doc_id in ids if doc_id in self.id_to_row]
+
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            if self.quantization != "none":
+                self._write_codes(vectors, meta["rows"] + len(ids))
+            with open(self.records_path, "ab") as f:
+                for doc_id, document, metadata in zip(ids, documents, metadatas):
+                    f.write(json.dumps({"id": doc_id, "metadata": metadata, "document": document}).encode("utf-8") + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+                records_bytes = f.tell()
+
+            meta["rows"] += len(ids)
+            meta["records_bytes"] = records_bytes
+            meta["deleted"] = sorted(set(meta["deleted"]) | set(replaced))
+            meta["version"] += 1
+            self._commit(meta)
+
+    @staticmethod
+    def _blocked_top_k(score_block, queries: np.ndarray, allowed: np.ndarray, k: int):
+        """
+        Blocked top-k over all rows. `score_block(start, end)` returns the
+        scores of rows [start, end) for every query. Only the per-block
+        candidates are kept, so memory stays bounded by the block size
+        regardless of the collection size.
+
+        Returns:
+            (rows, scores), both of shape (len(queries), k), best first
+        """
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+        rows = len(allowed)
+        for start in range(0, rows, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, rows)
+            block_allowed = allowed[start:end]
+            if not block_allowed.any():
+                continue
+            block_scores = score_block(start, end)
+            block_scores[:, ~block_allowed] = -np.inf
+            block_k = min(k, end - start)
+            top = np.argpartition(-block_scores, block_k - 1, axis=1)[:, :block_k]
+            best_rows = np.concatenate([best_rows, top + start], axis=1)
+            best_scores = np.concatenate([best_scores, np.take_along_axis(block_scores, top, axis=1)], axis=1)
+            if best_rows.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def _search(self, vectors: np.ndarray, codes, quantizer, queries: np.ndarray, allowed: np.ndarray, k: int):
+        """
+        Top-k by dot product (cosine on normalized vectors). Exact on the
+        float32 rows, or approximate on the codes followed by an exact
+        rescoring of the best candidates.
+        """
+        if quantizer is None:
+            return self._blocked_top_k(lambda start, end: queries @ vectors[start:end].T, queries, allowed, k)
+
+        candidates = min(k * self.rescore_factor, int(allowed.sum()))
+        candidate_rows, _ = self._blocked_top_k(
+            lambda start, end: quantizer.scores(queries, codes[start:end]), queries, allowed, candidates
+        )
+        # Full-precision rescoring reads only the candidate rows from the float32 file
+        exact = np.einsum("qd,qcd->qc", queries, vectors[candidate_rows])
+        top = np.argsort(-exact, axis=1)[:, :k]
+        return np.take_along_axis(candidate_rows, top, axis=1), np.take_along_axis(exact, top, axis=1)
+
+    def query(self, query_embeddings, n_results=5, where=None) -> Dict[str, Any]:
+        # Snapshot the committed state; the search itself runs without the lock
+        with self._lock:
+            self._refresh()
+            vectors, codes, quantizer = self.vectors, self.codes, self.quantizer
+            deleted, offsets = self.deleted, self.offsets
+            ids, metadatas = self.ids, self.metadatas
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        allowed = ~deleted
+        if where:
+            allowed &= np.fromiter((matches_where(metadatas[row], where) for row in range(len(deleted))),
+                                   dtype=bool, count=len(deleted))
+        k = min(n_results, int(allowed.sum()))
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if k == 0:
+            for _ in queries:
+                for key in results:
+                    results[key].append([])
+            return results
+
+        top_rows, top_scores = self._search(vectors, codes, quantizer, queries, allowed, k)
+        for rows, scores in zip(top_rows, top_scores):
+            results["ids"].append([ids[row] for row in rows])
+            results["documents"].append(self._read_documents(offsets[rows]))
+            results["metadatas"].append([metadatas[row] for row in rows])
+            # Cosine distance, matching Chroma's "cosine" space
+            results["distances"].append([float(1.0 - score) for score in scores])
+        return results
+
+    def get_ids(self, where=None, limit=None) -> List[str]:
+        with self._lock:
+            self._refresh()
+            ids, metadatas, deleted = self.ids, self.metadatas, self.deleted
+        matched = []
+        for row, doc_id in enumerate(ids):
+            if limit is not None and len(matched) >= limit:
+                break
+            if not deleted[row] and matches_where(metadatas[row], where):
+                matched.append(doc_id)
+        return matched
+
+    def iter_rows(self, batch_size=1000) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            vectors, deleted, offsets = self.vectors, self.deleted, self.offsets
+            ids, metadatas = self.ids, self.metadatas
+        live_rows = np.flatnonzero(~deleted)
+        for start in range(0, len(live_rows), batch_size):
+            rows = live_rows[start:start + batch_size]
+            yield {
+                "ids": [ids[row] for row in rows],
+                "embeddings": np.asarray(vectors[rows], dtype=np.float32),
+                "documents": self._read_documents(offsets[rows]),
+                "metadatas": [metadatas[row] for row in rows],
+            }
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            self._refresh()
+            rows = [self.id_to_row[doc_id] for doc_id in ids if doc_id in self.id_to_row]
+            if not rows:
+                return
+            meta = dict(self.meta)
+            meta["deleted"] = sorted(set(meta["deleted"]) | set(rows))
+            meta["version"] += 1
+            self._commit(meta)
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self.id_to_row)
+
+    def reset(self) -> None:
+        with self._lock:
+            meta = self._read_meta()
+            for path in (self.vectors_path, self.codes_path, self.quantizer_path, self.records_path):
+                if path.exists():
+                    path.unlink()
+            self._commit({"dim": None, "rows": 0, "records_bytes": 0, "deleted": [],
+                          "version": meta["version"] + 1, "epoch": meta.get("epoch", 0) + 1,
+                          "quantization": meta.get("quantization", self.default_quantization)})
+
+    def close(self) -> None:
+        """Drop the memory maps and in-memory rows; the files stay on disk"""
+        with self._lock:
+            self.vectors = np.zeros((0, 0), dtype=np.float32)
+            self.codes, self.quantizer = None, None
+            self.ids, self.metadatas = [], []
+            self.offsets = np.zeros(0, dtype=np.int64)
+            self.deleted = np.zeros(0, dtype=bool)
+            self.id_to_row = {}
+            # Force a full reload if the handle is used again
+            self.meta = None
+            self._meta_stamp = "closed"
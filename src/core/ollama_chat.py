@@ -1,24 +1,42 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import requests
 import json
 
+from src.core.ollama_scheduler import ollama_scheduler
+from src.utils.profiling import timed_stage
+
 
 class OllamaChat:
-    def __init__(self, model_name: str = "mistral", base_url: str = "http://ollama:11434"):
+    def __init__(self, model_name: str = "mistral", base_url: str = "http://ollama:11434", keep_alive: str = "15m"):
         self.model_name = model_name
         self.base_url = base_url
+        self.keep_alive = keep_alive
         self.chat_url = f"{self.base_url}/api/generate"
         self.chat_stream_url = f"{self.base_url}/api/chat"
     
-    def generate_answer(
-        self, 
-        user_question: str, 
-        context: List[str], 
+    def preload(self) -> None:
+        """Load the chat model into memory (or refresh its keep_alive) without generating"""
+        payload = {
+            "model": self.model_name,
+            "keep_alive": self.keep_alive
+        }
+        try:
+            with ollama_scheduler.slot():
+                response = requests.post(self.chat_url, json=payload)
+            if response.status_code != 200:
+                raise Exception(f"Failed to preload model: {response.status_code} - {response.text}")
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"Request failed: {str(e)}")
+    
+    def _build_prompt(
+        self,
+        user_question: str,
+        context: List[str],
         system_prompt: Optional[str] = None,
-        temperature: float = 0.7,
-        max_tokens: int = 1000
+        include_system: bool = True,
+        conversation_summary: Optional[str] = None
     ) -> str:
-        """Generate an answer based on user question and context"""
+        """Build the RAG prompt for one question"""
         
         # Default system prompt for RAG
         if system_prompt is None:
@@ -28,39 +46,122 @@ class OllamaChat:
         context_text = "\n\n".join([f"Context {i+1}: {ctx}" for i, ctx in enumerate(context)])
         
         # Create the full prompt
-        full_prompt = f"""System: {system_prompt}
-
-Context:
+        prompt = ""
+        if include_system:
+            prompt += f"System: {system_prompt}\n\n"
+        if conversation_summary:
+            prompt += f"Conversation so far: {conversation_summary}\n\n"
+        prompt += f"""Context:
 {context_text}
 
 User Question: {user_question}
 
 Answer:"""
-        
+        return prompt
+    
+    @timed_stage("generate")
+    def _generate(self, prompt: str, temperature: float, max_tokens: int,
+                  conversation_context: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Call /api/generate and return the raw response body"""
         payload = {
             "model": self.model_name,
-            "prompt": full_prompt,
+            "prompt": prompt,
             "stream": False,
             "options": {
                 "temperature": temperature,
                 "num_predict": max_tokens
             },
-            "keep_alive": "15m"  # Keep model loaded for 10 minutes after last use
+            "keep_alive": self.keep_alive  # Keep model loaded after last use
         }
+        if conversation_context:
+            # Tokens of the earlier turns; Ollama reuses its KV cache for this prefix
+            payload["context"] = conversation_context
         
         try:
-            response = requests.post(
-                self.chat_url,
-                json=payload,
-                headers={"Content-Type": "application/json"}
-            )
+            with ollama_scheduler.slot():
+                response = requests.post(
+                    self.chat_url,
+                    json=payload,
+                    headers={"Content-Type": "application/json"}
+                )
             
             if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "").strip()
+                return response.json()
             else:
                 raise Exception(f"Failed to generate answer: {response.status_code} - {response.text}")
                 
         except requests.exceptions.RequestException as e:
             raise Exception(f"Request failed: {str(e)}")
-    
\ No newline at end of file
+    
+    def generate_answer(
+        self, 
+        user_question: str, 
+        context: List[str], 
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000
+    ) -> str:
+        """Generate an answer based on user question and context"""
+        full_prompt = self._build_prompt(user_question, context, system_prompt)
+        result = self._generate(full_prompt, temperature, max_tokens)
+        return result.get("response", "").strip()
+    
+    def generate_turn(
+        self,
+        user_question: str,
+        context: List[str],
+        conversation_context: Optional[List[int]] = None,
+        conversation_summary: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000
+    ) -> Tuple[str, List[int]]:
+        """
+        Generate the answer for one turn of a conversation.
+        
+        Only the new turn is sent as the prompt; earlier turns are passed as
+        the context tokens Ollama returned for the previous turn, so they are
+        not prefilled again. The system prompt (and the summary of compacted
+        turns) is only sent when a new context starts.
+        
+        Returns:
+            The answer and the context tokens to pass on the next turn
+        """
+        starts_context = not conversation_context
+        prompt = self._build_prompt(
+            user_question,
+            context,
+            system_prompt,
+            include_system=starts_context,
+            conversation_summary=conversation_summary if starts_context else None
+        )
+        result = self._generate(prompt, temperature, max_tokens, conversation_context)
+        return result.get("response", "").strip(), result.get("context", [])
+    
+    def generate_reply(
+        self,
+        user_question: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 150
+    ) -> str:
+        """Generate a short reply without retrieved context, for small talk"""
+        if system_prompt is None:
+            system_prompt = """You are a friendly document assistant. Reply briefly to the user's message. If they ask about documents, tell them to ask a specific question."""
+        prompt = f"""System: {system_prompt}
+
+User: {user_question}
+
+Answer:"""
+        result = self._generate(prompt, temperature, max_tokens)
+        return result.get("response", "").strip()
+    
+    def summarize(self, text: str, max_tokens: int = 200) -> str:
+        """Summarize a conversation transcript into a short paragraph"""
+        prompt = f"""Summarize the following conversation in a short paragraph. Keep names, facts and open questions.
+
+{text}
+
+Summary:"""
+        result = self._generate(prompt, temperature=0.0, max_tokens=max_tokens)
+        return result.get("response", "").strip()
@@ -1,31 +1,64 @@
-from typing import List
-import numpy as np
+from typing import TYPE_CHECKING, List, Optional
 import requests
-from sklearn.preprocessing import normalize
+
+from src.core.ollama_scheduler import ollama_scheduler
+from src.utils.profiling import timed_stage
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def normalize(vectors, norm: str = 'l2') -> "np.ndarray":
+    """L2-normalize each row; a drop-in for sklearn.preprocessing.normalize, which takes ~0.7s to import"""
+    if norm != 'l2':
+        raise ValueError(f"Unsupported norm: {norm}")
+    import numpy as np
+
+    vectors = np.asarray(vectors, dtype=np.float64)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
 
 
 class OllamaEmbedding:
-    def __init__(self, model_name: str = "mistral", base_url: str = "http://ollama:11434"):
+    def __init__(self, model_name: str = "mistral", base_url: str = "http://ollama:11434", keep_alive: Optional[str] = None):
         self.model_name = model_name
         self.base_url = base_url
+        self.keep_alive = keep_alive
         self.embed_url = f"{self.base_url}/api/embeddings"
+        self.embed_batch_url = f"{self.base_url}/api/embed"
+    
+    def _build_payload(self, text: str) -> dict:
+        """Build the request payload, only sending keep_alive when configured"""
+        payload = {
+            "model": self.model_name,
+            "prompt": text
+        }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+    
+    def preload(self) -> None:
+        """Load the embedding model into memory (or refresh its keep_alive)"""
+        with ollama_scheduler.slot():
+            response = requests.post(self.embed_url, json=self._build_payload(""))
+        if response.status_code != 200:
+            raise Exception(f"Failed to preload embedding model: {response.text}")
     
+    @timed_stage("embed")
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed multiple documents"""
         embeddings = []
         for text in texts:
-            response = requests.post(
-                self.embed_url,
-                json={
-                    "model": self.model_name,
-                    "prompt": text
-                }
-            )
+            with ollama_scheduler.slot():
+                response = requests.post(
+                    self.embed_url,
+                    json=self._build_payload(text)
+                )
             if response.status_code == 200:
                 embedding = response.json()["embedding"]
                 
                 # Normalize the embedding vector
-                embedding = np.array(embedding)
                 normalized_embedding = normalize([embedding], norm='l2')[0]
                 
                 embeddings.append(normalized_embedding.tolist())
@@ -33,20 +66,40 @@ class OllamaEmbedding:
                 raise Exception(f"Failed to get embedding: {response.text}")
         return embeddings
     
+    @timed_stage("embed")
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed multiple texts in one request to /api/embed"""
+        if not texts:
+            return []
+        payload = {
+            "model": self.model_name,
+            "input": texts
+        }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        with ollama_scheduler.slot():
+            response = requests.post(self.embed_batch_url, json=payload)
+        if response.status_code == 404:
+            # Ollama before 0.3 has no batch endpoint
+            return self.embed_documents(texts)
+        if response.status_code != 200:
+            raise Exception(f"Failed to get embeddings: {response.text}")
+        
+        # Normalize the embedding vectors
+        return normalize(response.json()["embeddings"], norm='l2').tolist()
+    
+    @timed_stage("embed")
     def embed_query(self, text: str) -> List[float]:
         """Embed a single query"""
-        response = requests.post(
-            self.embed_url,
-            json={
-                "model": self.model_name,
-                "prompt": text
-            }
-        )
+        with ollama_scheduler.slot():
+            response = requests.post(
+                self.embed_url,
+                json=self._build_payload(text)
+            )
         if response.status_code == 200:
             embedding = response.json()["embedding"]
             
             # Normalize the embedding vector
-            embedding = np.array(embedding)
             normalized_embedding = normalize([embedding], norm='l2')[0]
             
             return normalized_embedding.tolist()
@@ -1,78 +1,218 @@
+import logging
 import os
+import threading
+import time
+from itertools import islice
 from typing import List, Dict, Any, Optional, Tuple
-import chromadb
-from chromadb.config import Settings
-import uuid
-from datetime import datetime
 
+from src.config import embedding_model_name, settings
 from src.core.chromadb_manager import ChromaDBManager
+from src.core.ingest_checkpoint import CONTENT_HASH_PATTERN, file_sha256, get_ingest_checkpoints
+from src.core.model_tiers import TIER_FAST, TIER_LARGE, TierDecision, TierRouter, tier_stats
 from src.core.ollama_embedding import OllamaEmbedding
 from src.core.ollama_chat import OllamaChat
+from src.core.ollama_scheduler import INGESTION, ollama_priority
+from src.core.session_store import ConversationSession
+from src.utils.boilerplate import BoilerplateFilter
 from src.utils.file_chunker import PDFChunker
+from src.utils.profiling import memory_profile, timed
+from src.utils.text_chunker import Chunk
+
+logger = logging.getLogger(__name__)
+
+NO_RELEVANT_INFORMATION = "I don't have relevant information to answer your question."
 
 
 class OllamaRAG:
     def __init__(
         self, 
-        embedding_model: str = os.getenv("MODEL_NAME", "mistral"),
+        embedding_model: Optional[str] = None,
         chat_model: str = os.getenv("MODEL_NAME", "mistral"),
         base_url: str = "http://ollama:11434",
         top_k: int = 5,
-        collection_name: str = "documents",
-        chroma_db_path: str = "./chroma_db"
+        collection_name: str = settings.DEFAULT_COLLECTION,
+        chroma_db_path: Optional[str] = None
     ):
-        # Keep OllamaEmbedding for generating embeddings
-        self.embedding_client = OllamaEmbedding(embedding_model, base_url)
-        self.chat_client = OllamaChat(chat_model, base_url)
-        self.top_k = top_k
-        
         # Initialize ChromaDB for vector storage
-        self.chroma_client = ChromaDBManager(collection_name = "resume_collection")
+        self.collection_name = collection_name
+        self.chroma_client = ChromaDBManager(collection_name=collection_name, persist_directory=chroma_db_path,
+                                             embedding_model=embedding_model or embedding_model_name())
         
-        # Create or get collection
-        # self.collection = self.chroma_client.get_or_create_collection(
-        #     name=collection_name,
-        #     metadata={"hnsw:space": "cosine"}
-        # )
+        # Queries and new chunks are embedded with the model the collection was built with
+        self.embedding_client = OllamaEmbedding(self.chroma_client.model_name, base_url,
+                                                keep_alive=settings.OLLAMA_KEEP_ALIVE)
+        self.chat_client = OllamaChat(chat_model, base_url, keep_alive=settings.OLLAMA_KEEP_ALIVE)
+        self.chat_clients = {TIER_LARGE: self.chat_client}
+        if settings.FAST_MODEL_NAME:
+            self.chat_clients[TIER_FAST] = OllamaChat(settings.FAST_MODEL_NAME, base_url,
+                                                      keep_alive=settings.OLLAMA_KEEP_ALIVE)
+        self.tier_router = TierRouter(fast_available=TIER_FAST in self.chat_clients,
+                                      max_query_words=settings.TIER_MAX_QUERY_WORDS,
+                                      min_confidence=settings.TIER_MIN_CONFIDENCE)
+        self.top_k = top_k
     
-    def add_documents(self, file_path: str, metadata: Optional[List[Dict]] = None) -> None:
-        """Add documents to the knowledge base"""
-        pdfchunker = PDFChunker(chunk_size=500)
-        chunks = pdfchunker.process_pdf(file_path)
-        
-        # Generate embeddings using Ollama
-        embeddings = self.embedding_client.embed_documents(chunks)
+    @property
+    def min_similarity(self) -> float:
+        """Similarity the best retrieved document needs for an answer to be generated"""
+        return settings.MIN_SIMILARITY_BY_COLLECTION.get(self.collection_name, settings.MIN_SIMILARITY)
+    
+    def add_documents(self, file_path: str, metadata: Optional[List[Dict]] = None,
+                      document_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Add documents to the knowledge base. document_metadata is added to the metadata of every chunk.
+        Chunks are embedded and stored in batches with a checkpoint after each, so adding a file whose
+        ingestion was interrupted continues after the last stored batch. Returns the number of chunks
+        and what boilerplate removal took out of the text.
+        """
+        if settings.MEMORY_PROFILE_INGESTION:
+            with memory_profile(f"ingestion of {file_path} into {self.collection_name}"):
+                return self._add_documents(file_path, metadata, document_metadata)
+        return self._add_documents(file_path, metadata, document_metadata)
+    
+    def _add_documents(self, file_path: str, metadata: Optional[List[Dict]],
+                       document_metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        content_hash = (document_metadata or {}).get("content_hash")
+        if not isinstance(content_hash, str) or not CONTENT_HASH_PATTERN.match(content_hash):
+            content_hash = file_sha256(file_path)
+        checkpoints = get_ingest_checkpoints()
         
-        # Generate unique IDs using UUID or timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        ids = [f"doc_{i}_{str(uuid.uuid4())}" for i in range(len(chunks))]
+        with checkpoints.claim(self.collection_name, content_hash):
+            checkpoint = checkpoints.load(self.collection_name, content_hash)
+            if checkpoint is None:
+                # Chunking settings are kept so a resumed ingestion splits the file the same way
+                checkpoint = {
+                    "collection": self.collection_name,
+                    "content_hash": content_hash,
+                    "file_path": file_path,
+                    "document_metadata": document_metadata or {},
+                    "custom_metadata": metadata is not None,
+                    "chunk_size": settings.CHUNK_SIZE,
+                    "chunk_overlap": settings.CHUNK_OVERLAP,
+                    "boilerplate": {
+                        "min_page_fraction": settings.BOILERPLATE_MIN_PAGE_FRACTION,
+                        "min_pages": settings.BOILERPLATE_MIN_PAGES,
+                    } if settings.BOILERPLATE_REMOVAL else None,
+                    "committed": 0,
+                    "in_flight": 0,
+                    "attempts": 0,
+                    "started_at": time.time(),
+                }
+            else:
+                logger.info(f"Resuming ingestion of {file_path} into {self.collection_name} "
+                            f"after {checkpoint['committed']} chunks")
+            checkpoint["attempts"] += 1
+            
+            # The batch being stored when the last attempt stopped may be partly stored
+            if checkpoint["in_flight"] > checkpoint["committed"]:
+                self.chroma_client.delete_documents(
+                    [self._chunk_id(i, content_hash) for i in range(checkpoint["committed"], checkpoint["in_flight"])]
+                )
+                checkpoint["in_flight"] = checkpoint["committed"]
+            checkpoints.save(checkpoint)
+            
+            boilerplate = checkpoint.get("boilerplate")
+            pdfchunker = PDFChunker(
+                chunk_size=checkpoint["chunk_size"],
+                chunk_overlap=checkpoint["chunk_overlap"],
+                remove_boilerplate=boilerplate is not None,
+                boilerplate_filter=BoilerplateFilter(**boilerplate) if boilerplate else None
+            )
+            remaining = islice(pdfchunker.iter_chunks(file_path), checkpoint["committed"], None)
+            while True:
+                with timed("chunk"):
+                    batch = list(islice(remaining, max(1, settings.INGEST_BATCH_CHUNKS)))
+                if not batch:
+                    break
+                start = checkpoint["committed"]
+                checkpoint["in_flight"] = start + len(batch)
+                checkpoints.save(checkpoint)
+                self._add_batch(batch, start, content_hash, metadata, document_metadata)
+                checkpoint["committed"] = checkpoint["in_flight"]
+                checkpoints.save(checkpoint)
+            
+            checkpoints.delete(self.collection_name, content_hash)
+            if checkpoint["attempts"] > 1:
+                logger.info(f"Finished ingestion of {file_path} into {self.collection_name} "
+                            f"({checkpoint['committed']} chunks, {checkpoint['attempts']} attempts)")
         
-        metadatas = metadata if metadata else [{"source": f"doc_{i}"} for i in range(len(chunks))]
+        report = pdfchunker.boilerplate_report
+        if report is not None and report.chars_removed:
+            logger.info(f"Removed {report.chars_removed} of {report.chars_total} characters of boilerplate "
+                        f"({report.lines_removed} lines) from {file_path}")
+        return {
+            "chunks": checkpoint["committed"],
+            "attempts": checkpoint["attempts"],
+            "boilerplate": report.to_dict() if report is not None else None,
+        }
+    
+    @staticmethod
+    def _chunk_id(index: int, content_hash: str) -> str:
+        """Stable ID of a chunk, so storing a batch again replaces it"""
+        return f"doc_{index}_{content_hash[:16]}"
     
-        # Store in ChromaDB
-        self.chroma_client.add_documents(
-            documents=chunks,
-            embeddings=embeddings,
-            metadatas=metadatas,
-            ids=ids
-        )
+    def _add_batch(self, chunk_records: List[Chunk], start: int, content_hash: str,
+                   metadata: Optional[List[Dict]], document_metadata: Optional[Dict[str, Any]]) -> None:
+        """Embed and store chunks start, start + 1, ... of a file, retrying with backoff"""
+        chunks = [chunk.text for chunk in chunk_records]
+        ids = [self._chunk_id(start + i, content_hash) for i in range(len(chunks))]
+        metadatas = metadata[start:start + len(chunks)] if metadata else [
+            {"source": f"doc_{start + i}", **chunk.to_metadata()} for i, chunk in enumerate(chunk_records)
+        ]
+        if document_metadata:
+            metadatas = [{**chunk_metadata, **document_metadata} for chunk_metadata in metadatas]
+        
+        attempts = max(1, settings.INGEST_BATCH_ATTEMPTS)
+        for attempt in range(attempts):
+            try:
+                # Generate embeddings using Ollama, behind interactive queries
+                with ollama_priority(INGESTION):
+                    embeddings = self.embedding_client.embed_documents(chunks)
+                self.chroma_client.add_documents(
+                    documents=chunks,
+                    embeddings=embeddings,
+                    metadatas=metadatas,
+                    ids=ids
+                )
+                return
+            except Exception as e:
+                if attempt + 1 == attempts:
+                    raise
+                delay = settings.INGEST_RETRY_BACKOFF_SECONDS * 2 ** attempt
+                logger.warning(f"Storing chunks {start}-{start + len(chunks) - 1} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
     
     def retrieve_relevant_documents(
         self, 
         query: str, 
-        top_k: Optional[int] = None
+        top_k: Optional[int] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Tuple[str, float]]:
-        """Retrieve most relevant documents for a query"""
+        """Retrieve most relevant documents for a query, reusing its embedding if already computed"""
         k = top_k if top_k is not None else self.top_k
         
-        results = self.chroma_client.query(
-            query_text=query,
-        )
+        if query_embedding is None:
+            results = self.chroma_client.query(
+                query_text=query,
+            )
+        else:
+            results = self.chroma_client.query_by_embedding(query_embedding)
         
-        # Format results
+        return self._format_results(results, 0)
+    
+    def retrieve_batch(self, queries: List[str]) -> List[List[Tuple[str, float]]]:
+        """Retrieve documents for several queries with one embedding request and one search"""
+        if not queries:
+            return []
+        query_embeddings = self.embedding_client.embed_batch(queries)
+        results = self.chroma_client.query_by_embeddings(query_embeddings)
+        return [self._format_results(results, i) for i in range(len(queries))]
+    
+    @staticmethod
+    def _format_results(results: Dict[str, Any], index: int) -> List[Tuple[str, float]]:
+        """(document, similarity) pairs for the index-th query of a search"""
         relevant_docs = []
         if results['documents'] and results['distances']:
-            for doc, distance in zip(results['documents'][0], results['distances'][0]):
+            for doc, distance in zip(results['documents'][index], results['distances'][index]):
                 # Convert distance to similarity (ChromaDB returns distances, not similarities)
                 similarity = 1 - distance
                 relevant_docs.append((doc, similarity))
@@ -84,36 +224,71 @@ class OllamaRAG:
         user_question: str,
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: int = 1000,
-        include_sources: bool = True
+        max_tokens: Optional[int] = None,
+        include_sources: bool = True,
+        session: Optional[ConversationSession] = None,
+        query_embedding: Optional[List[float]] = None,
+        relevant_docs: Optional[List[Tuple[str, float]]] = None
     ) -> Dict[str, Any]:
-        """Generate answer using RAG approach"""
+        """
+        Generate answer using RAG approach. With a session, earlier turns are reused from Ollama's context.
+        Pass relevant_docs to answer from documents that were already retrieved.
+        Without a session, the tier router picks the chat model; max_tokens defaults to that tier's budget.
+        """
         
         # Retrieve relevant documents from ChromaDB
-        relevant_docs = self.retrieve_relevant_documents(user_question)
+        if relevant_docs is None:
+            if query_embedding is None:
+                relevant_docs = self.retrieve_relevant_documents(user_question)
+            else:
+                relevant_docs = self.retrieve_relevant_documents(user_question, query_embedding=query_embedding)
         
         if not relevant_docs:
             return {
-                "answer": "I don't have relevant information to answer your question.",
+                "answer": NO_RELEVANT_INFORMATION,
                 "sources": [],
                 "confidence": 0.0
             }
         
+        # Skip generation when even the best match is too weak to answer from
+        best_similarity = max(score for _, score in relevant_docs)
+        if best_similarity < self.min_similarity:
+            logger.info(f"Best similarity {best_similarity:.3f} below {self.min_similarity} "
+                        f"for collection {self.collection_name}, skipping generation")
+            return {
+                "answer": NO_RELEVANT_INFORMATION,
+                "sources": [],
+                "confidence": best_similarity
+            }
+        
         # Extract context texts
         context_texts = [doc[0] for doc in relevant_docs]
         
+        # Sessions stay on the large model; Ollama's context tokens are specific to the model that made them
+        if session is None:
+            decision = self.tier_router.choose(user_question, relevant_docs)
+        else:
+            decision = TierDecision(TIER_LARGE, "session")
+        
         # Generate answer using Ollama
-        answer = self.chat_client.generate_answer(
-            user_question=user_question,
-            context=context_texts,
-            system_prompt=system_prompt,
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
+        with tier_stats.measure(decision.tier):
+            if session is None:
+                answer = self.chat_clients[decision.tier].generate_answer(
+                    user_question=user_question,
+                    context=context_texts,
+                    system_prompt=system_prompt,
+                    temperature=temperature,
+                    max_tokens=max_tokens or decision.max_tokens
+                )
+            else:
+                answer = self._generate_session_turn(session, user_question, context_texts,
+                                                     system_prompt, temperature, max_tokens or decision.max_tokens)
         
         result = {
             "answer": answer,
-            "confidence": max(score for _, score in relevant_docs) if relevant_docs else 0.0
+            "confidence": max(score for _, score in relevant_docs) if relevant_docs else 0.0,
+            "model_tier": decision.tier,
+            "tier_reason": decision.reason
         }
         
         if include_sources:
@@ -127,6 +302,47 @@ class OllamaRAG:
         
         return result
     
+    def _generate_session_turn(
+        self,
+        session: ConversationSession,
+        user_question: str,
+        context_texts: List[str],
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """Answer one turn of a session, compacting the history once it passes the token budget"""
+        with session.lock:
+            answer, conversation_context = self.chat_client.generate_turn(
+                user_question=user_question,
+                context=context_texts,
+                conversation_context=session.context,
+                conversation_summary=session.summary,
+                system_prompt=system_prompt,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            session.add_turn(user_question, answer, conversation_context)
+            over_budget = session.context_tokens > settings.SESSION_TOKEN_BUDGET
+        
+        if over_budget:
+            # Summarize off the request path; the next turn waits on the session lock if needed
+            threading.Thread(target=self.compact_session, args=(session,), daemon=True).start()
+        return answer
+    
+    def compact_session(self, session: ConversationSession) -> None:
+        """Replace a session's history with a bounded summary and drop its Ollama context"""
+        with session.lock:
+            if session.context_tokens <= settings.SESSION_TOKEN_BUDGET:
+                return
+            try:
+                summary = self.chat_client.summarize(session.transcript(), max_tokens=settings.SESSION_SUMMARY_TOKENS)
+            except Exception as e:
+                logger.warning(f"Failed to summarize session {session.session_id}: {e}")
+                # Keep the session usable by truncating to the previous summary
+                summary = session.summary or ""
+            session.compact(summary)
+    
     # def clear_documents(self) -> None:
     #     """Clear all documents from the knowledge base"""
     #     self.chroma_client.delete_collection(self.collection.name)
@@ -0,0 +1,185 @@
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, Optional
+
+from src.config import settings
+from src.utils.profiling import timed
+
+INTERACTIVE = "interactive"
+INGESTION = "ingestion"
+PRIORITY_CLASSES = (INTERACTIVE, INGESTION)
+
+# Waits kept per class for the percentile in stats()
+RECENT_WAITS = 1000
+
+_priority: ContextVar[str] = ContextVar("ollama_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def ollama_priority(priority_class: str) -> Iterator[None]:
+    """Run the Ollama calls made inside the block (in this thread or task) in `priority_class`"""
+    if priority_class not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {priority_class}")
+    token = _priority.set(priority_class)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _Waiter:
+    __slots__ = ("priority_class", "enqueued", "granted")
+
+    def __init__(self, priority_class: str):
+        self.priority_class = priority_class
+        self.enqueued = time.perf_counter()
+        self.granted = threading.Event()
+
+
+class QueueStats:
+    """Counters for one priority class"""
+
+    def __init__(self):
+        self.waiting = 0
+        self.in_flight = 0
+        self.granted = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=RECENT_WAITS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        waits = sorted(self.recent_waits)
+        return {
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "requests": self.granted,
+            "mean_wait_ms": round(1000 * self.wait_seconds / self.granted, 2) if self.granted else 0.0,
+            "p95_wait_ms": round(1000 * waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+            "max_wait_ms": round(1000 * self.max_wait_seconds, 2),
+        }
+
+
+class OllamaScheduler:
+    """
+    Admission control in front of the Ollama server, shared by every call
+    this process makes to it.
+
+    At most `max_concurrency` calls run at once; the rest wait in one FIFO
+    queue per priority class. Interactive calls (query embedding and
+    generation) go first, but while both classes are waiting, ingestion
+    gets at least `ingestion_min_share` of the freed slots so a steady
+    stream of questions cannot starve an upload. `reserved_interactive_slots`
+    are never given to ingestion, so a question arriving during a bulk
+    upload does not wait behind it.
+
+    The limit applies per worker process; set it to Ollama's
+    OLLAMA_NUM_PARALLEL divided by the number of workers.
+    """
+
+    def __init__(self, max_concurrency: int = 4, ingestion_min_share: float = 0.2,
+                 reserved_interactive_slots: int = 1):
+        self.max_concurrency = max_concurrency
+        self.ingestion_min_share = ingestion_min_share
+        self.reserved_interactive_slots = max(0, min(reserved_interactive_slots, max_concurrency - 1))
+        # Interactive grants allowed in a row while ingestion waits
+        if ingestion_min_share <= 0:
+            self._interactive_burst = math.inf
+        else:
+            self._interactive_burst = math.floor((1 - ingestion_min_share) / ingestion_min_share + 1e-9)
+        self._interactive_streak = 0
+        self._queues: Dict[str, Deque[_Waiter]] = {name: deque() for name in PRIORITY_CLASSES}
+        self._stats: Dict[str, QueueStats] = {name: QueueStats() for name in PRIORITY_CLASSES}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    def _can_run(self, priority_class: str) -> bool:
+        if priority_class == INGESTION:
+            limit = self.max_concurrency - self.reserved_interactive_slots
+            return self._stats[INGESTION].in_flight < limit
+        return True
+
+    def _next_class(self) -> Optional[str]:
+        interactive = bool(self._queues[INTERACTIVE])
+        ingestion = bool(self._queues[INGESTION]) and self._can_run(INGESTION)
+        if interactive and ingestion:
+            if self._interactive_streak >= self._interactive_burst:
+                return INGESTION
+            return INTERACTIVE
+        if interactive:
+            return INTERACTIVE
+        if ingestion:
+            return INGESTION
+        return None
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiters; called with the lock held"""
+        while self._in_flight < self.max_concurrency:
+            priority_class = self._next_class()
+            if priority_class is None:
+                return
+            if priority_class == INTERACTIVE and self._queues[INGESTION]:
+                self._interactive_streak += 1
+            else:
+                self._interactive_streak = 0
+            waiter = self._queues[priority_class].popleft()
+            stats = self._stats[priority_class]
+            wait = time.perf_counter() - waiter.enqueued
+            stats.waiting -= 1
+            stats.in_flight += 1
+            stats.granted += 1
+            stats.wait_seconds += wait
+            stats.max_wait_seconds = max(stats.max_wait_seconds, wait)
+            stats.recent_waits.append(wait)
+            self._in_flight += 1
+            waiter.granted.set()
+
+    def _release(self, priority_class: str) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._stats[priority_class].in_flight -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority_class: Optional[str] = None) -> Iterator[None]:
+        """Hold one of the Ollama slots for the duration of a call"""
+        if not self.enabled:
+            yield
+            return
+        priority_class = priority_class or _priority.get()
+        waiter = _Waiter(priority_class)
+        with self._lock:
+            self._queues[priority_class].append(waiter)
+            self._stats[priority_class].waiting += 1
+            self._dispatch()
+        if not waiter.granted.is_set():
+            with timed("ollama_queue"):
+                waiter.granted.wait()
+        try:
+            yield
+        finally:
+            self._release(priority_class)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "ingestion_min_share": self.ingestion_min_share,
+                "reserved_interactive_slots": self.reserved_interactive_slots,
+                "in_flight": self._in_flight,
+                "classes": {name: stats.to_dict() for name, stats in self._stats.items()},
+            }
+
+
+ollama_scheduler = OllamaScheduler(
+    max_concurrency=settings.OLLAMA_MAX_CONCURRENCY,
+    ingestion_min_share=settings.OLLAMA_INGESTION_MIN_SHARE,
+    reserved_interactive_slots=settings.OLLAMA_RESERVED_INTERACTIVE_SLOTS,
+)
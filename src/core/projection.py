@@ -0,0 +1,75 @@
+import hashlib
+import io
+from typing import Optional
+
+import numpy as np
+
+PROJECTION_METHODS = ("pca", "random")
+
+
+class Projection:
+    """
+    Linear map of embeddings onto fewer dimensions, `(x - mean) @ components.T`,
+    followed by L2 normalization so cosine distances stay meaningful.
+
+    "pca" keeps the principal directions of a sample of the collection;
+    "random" is a seeded Gaussian projection that needs no sample and
+    roughly preserves distances (Johnson-Lindenstrauss).
+    """
+
+    def __init__(self, method: str, components: np.ndarray, mean: Optional[np.ndarray] = None):
+        if method not in PROJECTION_METHODS:
+            raise ValueError(f"Unknown projection method: {method}")
+        self.method = method
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+        self.mean = np.zeros(self.source_dim, dtype=np.float32) if mean is None else np.asarray(mean, dtype=np.float32)
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    @property
+    def source_dim(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def id(self) -> str:
+        """Fingerprint of the parameters; vectors are only comparable under the same projection"""
+        digest = hashlib.sha256(self.components.tobytes())
+        digest.update(self.mean.tobytes())
+        return digest.hexdigest()[:16]
+
+    @classmethod
+    def fit_pca(cls, vectors: np.ndarray, dim: int) -> "Projection":
+        """Fit on a sample of at least `dim` embeddings"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) < dim:
+            raise ValueError(f"PCA to {dim} dimensions needs at least {dim} sample vectors, got {len(vectors)}")
+        # Uncentered: the top right singular vectors span the directions that carry most of
+        # the inner products, and retrieval ranks by inner product rather than by variance
+        _, _, vt = np.linalg.svd(vectors, full_matrices=False)
+        return cls("pca", vt[:dim])
+
+    @classmethod
+    def random(cls, source_dim: int, dim: int, seed: int = 0) -> "Projection":
+        rng = np.random.default_rng(seed)
+        return cls("random", rng.standard_normal((dim, source_dim)) / np.sqrt(dim))
+
+    def apply(self, vectors) -> np.ndarray:
+        """Project a batch of embeddings, shape (n, source_dim) -> (n, dim)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[-1] != self.source_dim:
+            raise ValueError(f"Expected {self.source_dim}-dim embeddings, got {vectors.shape[-1]}")
+        projected = (vectors - self.mean) @ self.components.T
+        norms = np.linalg.norm(projected, axis=-1, keepdims=True)
+        return projected / np.where(norms == 0, 1, norms)
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez(buffer, method=np.array(self.method), components=self.components, mean=self.mean)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Projection":
+        with np.load(io.BytesIO(data)) as arrays:
+            return cls(str(arrays["method"]), arrays["components"], arrays["mean"])
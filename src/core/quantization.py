@@ -0,0 +1,91 @@
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+QUANTIZATION_DTYPES = {
+    "float16": np.float16,
+    "int8": np.int8,
+}
+
+
+class ScalarQuantizer:
+    """
+    Per-dimension scalar quantization of embeddings.
+
+    int8 maps each dimension's [min, max] range onto the 256 code values:
+        x ~= (code + 128) * scale + offset
+    float16 is a plain cast and has no parameters.
+
+    Scores are computed directly on the codes: for a query q,
+        q . x ~= (q * scale) . code + 128 * sum(q * scale) + q . offset
+    so the codes are never decoded into a full float32 copy.
+    """
+
+    def __init__(self, dtype: str, offset: Optional[np.ndarray] = None, scale: Optional[np.ndarray] = None):
+        if dtype not in QUANTIZATION_DTYPES:
+            raise ValueError(f"Unsupported quantization dtype: {dtype}")
+        self.dtype = dtype
+        self.offset = offset
+        self.scale = scale
+
+    @property
+    def code_dtype(self):
+        return QUANTIZATION_DTYPES[self.dtype]
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.dtype == "float16" or self.scale is not None
+
+    def fit(self, vectors: np.ndarray, margin: float = 0.05) -> "ScalarQuantizer":
+        """
+        Fit the int8 range on a sample of vectors. The range is widened by
+        `margin` so later vectors slightly outside the sample are not clipped.
+        """
+        if self.dtype != "int8":
+            return self
+        low = vectors.min(axis=0)
+        high = vectors.max(axis=0)
+        padding = (high - low) * margin
+        low, high = low - padding, high + padding
+        self.offset = low.astype(np.float32)
+        self.scale = np.maximum((high - low) / 255.0, 1e-12).astype(np.float32)
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Quantize float32 vectors into codes"""
+        if self.dtype == "float16":
+            return vectors.astype(np.float16)
+        codes = np.rint((vectors - self.offset) / self.scale) - 128
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Approximate float32 vectors from codes"""
+        if self.dtype == "float16":
+            return codes.astype(np.float32)
+        return (codes.astype(np.float32) + 128) * self.scale + self.offset
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate dot products between queries and quantized vectors"""
+        if self.dtype == "float16":
+            return queries @ codes.astype(np.float32).T
+        scaled = queries * self.scale
+        bias = 128 * scaled.sum(axis=1) + queries @ self.offset
+        return scaled @ codes.astype(np.float32).T + bias[:, None]
+
+    def save(self, path: Path) -> None:
+        """Save the quantization parameters next to the codes"""
+        tmp_path = Path(f"{path}.tmp.npz")
+        if self.dtype == "int8":
+            np.savez(tmp_path, dtype=self.dtype, offset=self.offset, scale=self.scale)
+        else:
+            np.savez(tmp_path, dtype=self.dtype)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "ScalarQuantizer":
+        data = np.load(path)
+        dtype = str(data["dtype"])
+        if dtype == "int8":
+            return cls(dtype, offset=data["offset"], scale=data["scale"])
+        return cls(dtype)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import settings
+
+# Bookkeeping per cached row on top of the text it holds
+ROW_OVERHEAD_BYTES = 200
+
+CacheKey = Tuple[str, int, bytes, int, str]
+
+# Fields of a search result holding one inner list per query embedding
+PER_QUERY_KEYS = ("ids", "documents", "metadatas", "distances", "embeddings")
+DEFAULT_KEYS = ("ids", "documents", "metadatas", "distances")
+
+
+def cache_key(collection_name: str, version: int, query_embedding: List[float], n_results: int,
+              where: Optional[Dict[str, Any]]) -> CacheKey:
+    """Key of one search; a new collection version makes every older key unreachable"""
+    # float32 bytes, hashed without loading NumPy
+    digest = hashlib.blake2b(array("f", query_embedding).tobytes(), digest_size=16).digest()
+    return (collection_name, version, digest, n_results, json.dumps(where, sort_keys=True, default=str))
+
+
+def split_rows(results: Dict[str, Any], count: int) -> List[Dict[str, Any]]:
+    """Per-query rows of a search result in Chroma's layout (one inner list per query embedding)"""
+    per_query = [key for key in PER_QUERY_KEYS if isinstance(results.get(key), list) and len(results[key]) == count]
+    return [{key: results[key][index] for key in per_query} for index in range(count)]
+
+
+def merge_rows(rows: List[Dict[str, Any]], results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Inverse of split_rows; lists are copied so callers cannot change cached
+    rows. Fields that are not per query, such as "included", are copied
+    from `results`, the search that produced the uncached rows.
+    """
+    keys = [key for key in PER_QUERY_KEYS if all(key in row for row in rows)] if rows else DEFAULT_KEYS
+    merged = {key: [list(row[key]) if isinstance(row[key], list) else row[key] for row in rows] for key in keys}
+    if results:
+        merged.update({key: value for key, value in results.items() if key not in PER_QUERY_KEYS})
+    return merged
+
+
+def _row_bytes(row: Dict[str, Any]) -> int:
+    size = ROW_OVERHEAD_BYTES
+    for document in row.get("documents") or []:
+        size += len(document or "")
+    for doc_id in row.get("ids") or []:
+        size += len(doc_id) + 16
+    for metadata in row.get("metadatas") or []:
+        size += sum(len(str(key)) + len(str(value)) for key, value in (metadata or {}).items())
+    return size
+
+
+class RetrievalCache:
+    """
+    Search results of recent queries, keyed by collection version.
+
+    ChromaDBManager bumps a collection's version in the collection catalog
+    after every write and reads it before every lookup, so a cached result
+    is never served once the collection has changed and entries need no
+    expiry. With a local store the catalog is a file shared by the worker
+    processes of the host; with CHROMA_MODE=http it is kept on the Chroma
+    server, which costs one lookup by ID per search. Entries are
+    evicted least-recently-used beyond `max_bytes` of result text, and the
+    entries of a collection are dropped as soon as a newer version of it
+    is seen.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _drop_older_versions(self, collection_name: str, version: int) -> None:
+        """Forget entries of earlier versions; called with the lock held"""
+        if self._versions.get(collection_name, -1) >= version:
+            return
+        self._versions[collection_name] = version
+        for key in [key for key in self._entries if key[0] == collection_name and key[1] < version]:
+            self.bytes -= self._entries.pop(key)[1]
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._drop_older_versions(key[0], key[1])
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: CacheKey, row: Dict[str, Any]) -> None:
+        size = _row_bytes(row)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop_older_versions(key[0], key[1])
+            if self._versions[key[0]] > key[1]:
+                return  # computed against a version that has been replaced meanwhile
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (row, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+retrieval_cache = RetrievalCache(max_bytes=settings.RETRIEVAL_CACHE_MAX_BYTES)
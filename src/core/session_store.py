@@ -0,0 +1,115 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from src.config import settings
+
+
+class ConversationSession:
+    """State of one conversation: Ollama context tokens, recent turns and a summary"""
+
+    def __init__(self, session_id: str, collection_name: str):
+        self.session_id = session_id
+        self.collection_name = collection_name
+        # Context tokens returned by Ollama for the last turn
+        self.context: List[int] = []
+        # Turns since the last compaction, as {"role": ..., "content": ...}
+        self.turns: List[Dict[str, str]] = []
+        # Summary of the turns that were compacted away
+        self.summary: Optional[str] = None
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        # Serializes turns of the same session
+        self.lock = threading.Lock()
+
+    @property
+    def context_tokens(self) -> int:
+        return len(self.context)
+
+    def add_turn(self, question: str, answer: str, context: List[int]) -> None:
+        self.turns.append({"role": "user", "content": question})
+        self.turns.append({"role": "assistant", "content": answer})
+        self.context = context
+        self.last_used = time.time()
+
+    def transcript(self) -> str:
+        """Summary plus the turns since the last compaction, as plain text"""
+        lines = []
+        if self.summary:
+            lines.append(f"Earlier: {self.summary}")
+        for turn in self.turns:
+            lines.append(f"{turn['role'].capitalize()}: {turn['content']}")
+        return "\n".join(lines)
+
+    def compact(self, summary: str) -> None:
+        """Replace the history with its summary and start a fresh Ollama context"""
+        self.summary = summary
+        self.turns = []
+        self.context = []
+
+    def to_dict(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "collection": self.collection_name,
+            "turns": len(self.turns) // 2,
+            "context_tokens": self.context_tokens,
+            "summary": self.summary,
+            "created_at": self.created_at,
+            "last_used": self.last_used,
+        }
+
+
+class SessionStore:
+    """
+    In-memory conversation sessions with LRU and TTL eviction.
+
+    Sessions live in the worker that created them, so multi-worker
+    deployments need sticky routing on the session ID.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 1800):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict_expired(self, now: float) -> None:
+        for session_id, session in list(self._sessions.items()):
+            if now - session.last_used > self.ttl_seconds:
+                del self._sessions[session_id]
+
+    def create(self, collection_name: str) -> ConversationSession:
+        """Start a new session for a collection"""
+        session = ConversationSession(uuid.uuid4().hex, collection_name)
+        with self._lock:
+            self._evict_expired(time.time())
+            self._sessions[session.session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id: str) -> Optional[ConversationSession]:
+        """Get a live session, or None if it does not exist or has expired"""
+        now = time.time()
+        with self._lock:
+            self._evict_expired(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = now
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+session_store = SessionStore(
+    max_sessions=settings.SESSION_MAX_SESSIONS,
+    ttl_seconds=settings.SESSION_TTL_SECONDS,
+)
@@ -0,0 +1,208 @@
+"""
+Compact binary snapshots of a collection.
+
+A snapshot holds the ids, documents, metadata and embeddings of every row,
+so a new replica can load a collection without re-embedding its PDFs.
+Layout (little-endian):
+
+    b"PDFSNAP1", uint32 header length, header JSON
+        {"format", "collection", "dim", "embedding_model", "created_at", "projection_bytes"}
+    the collection's projection parameters (npz), if its vectors are reduced
+    one block per batch of rows:
+        b"BLK1", uint32 rows, uint32 column bytes
+        rows * dim float32 embeddings, contiguous
+        zlib-compressed JSON columns {"ids", "documents", "metadata": {key: [values]}}
+    b"END1", uint64 total rows
+
+Embedding blocks are read straight into arrays, so an import runs at disk
+speed plus the cost of writing the target store.
+"""
+import json
+import os
+import struct
+import time
+import uuid
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.chromadb_manager import ChromaDBManager
+from src.core.projection import Projection
+
+SNAPSHOT_MAGIC = b"PDFSNAP1"
+SNAPSHOT_FORMAT = 1
+BLOCK_MAGIC = b"BLK1"
+END_MAGIC = b"END1"
+BLOCK_HEADER = struct.Struct("<4sII")
+END_RECORD = struct.Struct("<4sQ")
+
+
+def _encode_columns(ids: List[str], documents: List[str], metadatas: List[Optional[Dict[str, Any]]]) -> bytes:
+    """Metadata is stored per key, with None where a row lacks the key"""
+    keys = sorted({key for metadata in metadatas if metadata for key in metadata})
+    columns = {key: [(metadata or {}).get(key) for metadata in metadatas] for key in keys}
+    payload = json.dumps({"ids": ids, "documents": documents, "metadata": columns}, separators=(",", ":"))
+    return zlib.compress(payload.encode("utf-8"))
+
+
+def _decode_columns(data: bytes) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+    columns = json.loads(zlib.decompress(data))
+    metadatas: List[Dict[str, Any]] = [{} for _ in columns["ids"]]
+    for key, values in columns["metadata"].items():
+        for metadata, value in zip(metadatas, values):
+            if value is not None:
+                metadata[key] = value
+    return columns["ids"], columns["documents"], metadatas
+
+
+def _read_exact(f, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Snapshot is truncated")
+    return data
+
+
+def export_snapshot(manager: ChromaDBManager, path: str, block_rows: int = 4096) -> Dict[str, Any]:
+    """
+    Write every row of a collection to a snapshot file.
+
+    Args:
+        manager: Manager of the collection to export
+        path: Snapshot file to write; replaced atomically when complete
+        block_rows: Rows per block
+
+    Returns:
+        Number of rows and bytes written
+    """
+    batches = manager.store.iter_rows(batch_size=block_rows)
+    first = next(batches, None)
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "collection": manager.collection_name,
+        "dim": int(first["embeddings"].shape[1]) if first else None,
+        "embedding_model": manager.model_name,
+        "created_at": time.time(),
+    }
+    projection_bytes = manager.projection.to_bytes() if manager.projection else b""
+    header["projection_bytes"] = len(projection_bytes)
+
+    rows = 0
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, "wb") as f:
+        header_bytes = json.dumps(header).encode("utf-8")
+        f.write(SNAPSHOT_MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+        f.write(projection_bytes)
+        batch = first
+        while batch is not None:
+            columns = _encode_columns(batch["ids"], batch["documents"], batch["metadatas"])
+            f.write(BLOCK_HEADER.pack(BLOCK_MAGIC, len(batch["ids"]), len(columns)))
+            f.write(np.ascontiguousarray(batch["embeddings"], dtype="<f4").tobytes())
+            f.write(columns)
+            rows += len(batch["ids"])
+            batch = next(batches, None)
+        f.write(END_RECORD.pack(END_MAGIC, rows))
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    os.replace(tmp_path, path)
+    return {"rows": rows, "bytes": size}
+
+
+def read_snapshot_header(f) -> Dict[str, Any]:
+    if _read_exact(f, len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+        raise ValueError("Not a collection snapshot")
+    (length,) = struct.unpack("<I", _read_exact(f, 4))
+    header = json.loads(_read_exact(f, length))
+    if header.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format: {header.get('format')}")
+    return header
+
+
+def iter_snapshot_blocks(f, dim: Optional[int]) -> Iterator[Dict[str, Any]]:
+    """Blocks after the header, in the layout of VectorStore.iter_rows"""
+    rows = 0
+    while True:
+        magic = _read_exact(f, 4)
+        if magic == END_MAGIC:
+            (total,) = struct.unpack("<Q", _read_exact(f, END_RECORD.size - 4))
+            if total != rows:
+                raise ValueError(f"Snapshot ends after {rows} rows but records {total}")
+            return
+        if magic != BLOCK_MAGIC:
+            raise ValueError("Snapshot is corrupt")
+        block_rows, column_bytes = struct.unpack("<II", _read_exact(f, BLOCK_HEADER.size - 4))
+        embeddings = np.frombuffer(_read_exact(f, block_rows * dim * 4), dtype="<f4").reshape(block_rows, dim)
+        ids, documents, metadatas = _decode_columns(_read_exact(f, column_bytes))
+        rows += block_rows
+        yield {"ids": ids, "embeddings": embeddings, "documents": documents, "metadatas": metadatas}
+
+
+def _adopt_projection(manager: ChromaDBManager, projection: Projection) -> None:
+    """Reduced vectors can only be loaded into a collection using the same projection"""
+    if manager.projection is not None and manager.projection.id == projection.id:
+        return
+    if manager.catalog.tag(manager.physical_name) is not None or manager.get_collection_count() > 0:
+        raise ValueError(f"Snapshot vectors are reduced to {projection.dim} dimensions by a projection "
+                         f"{manager.physical_name} does not use")
+    manager.catalog.set_projection(manager.physical_name, manager.model_name, projection)
+    manager.projection = projection
+
+
+def import_snapshot(manager: ChromaDBManager, path: str, skip_existing: bool = True) -> Dict[str, Any]:
+    """
+    Bulk-load a snapshot into a collection without re-embedding.
+
+    Args:
+        manager: Manager of the target collection
+        path: Snapshot file to read
+        skip_existing: Skip rows whose ID is already stored, and every row of a
+            document whose content_hash is already in the collection
+
+    Returns:
+        Number of rows in the snapshot, imported and skipped
+    """
+    imported = skipped = 0
+    with open(path, "rb") as f:
+        header = read_snapshot_header(f)
+        if header["embedding_model"] != manager.model_name:
+            raise ValueError(f"Snapshot embeddings come from {header['embedding_model']}, "
+                             f"the collection uses {manager.model_name}")
+        projection = None
+        if header.get("projection_bytes"):
+            projection = Projection.from_bytes(_read_exact(f, header["projection_bytes"]))
+            _adopt_projection(manager, projection)
+
+        existing_ids = set(manager.store.get_ids()) if skip_existing else set()
+        # Decided before any row of the document is imported, so its later blocks are kept too
+        hash_present: Dict[str, bool] = {}
+
+        for block in iter_snapshot_blocks(f, header["dim"]):
+            if skip_existing:
+                new_hashes = sorted({metadata["content_hash"] for metadata in block["metadatas"]
+                                     if "content_hash" in metadata} - hash_present.keys())
+                # One filtered lookup per block; hashes are checked one by one only if any is present
+                any_present = bool(new_hashes) and manager.has_documents({"content_hash": {"$in": new_hashes}})
+                for content_hash in new_hashes:
+                    hash_present[content_hash] = any_present and manager.has_documents({"content_hash": content_hash})
+
+            keep = []
+            for row, (doc_id, metadata) in enumerate(zip(block["ids"], block["metadatas"])):
+                content_hash = metadata.get("content_hash")
+                if skip_existing and (doc_id in existing_ids or hash_present.get(content_hash, False)):
+                    skipped += 1
+                else:
+                    keep.append(row)
+            if not keep:
+                continue
+            manager.add_documents(
+                documents=[block["documents"][row] for row in keep],
+                embeddings=block["embeddings"][keep],
+                metadatas=[block["metadatas"][row] for row in keep],
+                ids=[block["ids"][row] for row in keep],
+                projected=projection is not None,
+            )
+            imported += len(keep)
+
+    return {"rows": imported + skipped, "imported": imported, "skipped": skipped,
+            "source_collection": header["collection"]}
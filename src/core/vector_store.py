@@ -0,0 +1,211 @@
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.config import settings
+from src.core.chroma_client import get_async_chroma_client, get_chroma_client
+
+logger = logging.getLogger(__name__)
+
+# HNSW parameters set when a Chroma collection is built; search_ef can also change later,
+# although Chroma only reads the new value when it loads the index again
+HNSW_BUILD_PARAMS = ("space", "M", "construction_ef")
+HNSW_PARAMS = HNSW_BUILD_PARAMS + ("search_ef",)
+# Keys of the same parameters in Chroma's collection configuration
+_HNSW_CONFIGURATION_KEYS = {"space": "space", "M": "max_neighbors",
+                            "construction_ef": "ef_construction", "search_ef": "ef_search"}
+
+
+def default_index_params() -> Dict[str, Any]:
+    """HNSW parameters of new collections, from the HNSW_* settings"""
+    return {"space": settings.HNSW_SPACE, "M": settings.HNSW_M,
+            "construction_ef": settings.HNSW_CONSTRUCTION_EF, "search_ef": settings.HNSW_SEARCH_EF}
+
+
+class VectorStore(ABC):
+    """
+    Storage backend behind ChromaDBManager. Query results use Chroma's
+    result layout (one inner list per query embedding) so callers do not
+    depend on the backend in use.
+    """
+
+    @abstractmethod
+    def add(self,
+            ids: List[str],
+            embeddings: List[List[float]],
+            documents: List[str],
+            metadatas: List[Dict[str, Any]]) -> None:
+        """Add embeddings with their documents and metadata"""
+
+    @abstractmethod
+    def query(self,
+              query_embeddings: List[List[float]],
+              n_results: int = 5,
+              where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Return the nearest documents for each query embedding"""
+
+    @abstractmethod
+    def get_ids(self, where: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> List[str]:
+        """IDs of the documents whose metadata matches `where`"""
+
+    @abstractmethod
+    def iter_rows(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        All stored rows in batches of "ids", "embeddings" (float32 array of
+        shape (rows, dim)), "documents" and "metadatas"
+        """
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        """Delete documents by ID"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of documents in the store"""
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Delete all documents"""
+
+    def index_params(self) -> Dict[str, Any]:
+        """Parameters of the approximate index, empty for exact search"""
+        return {}
+
+    def set_index_params(self, params: Dict[str, Any]) -> None:
+        """Parameters to build the index with from now on; ignored by exact search"""
+
+    def close(self) -> None:
+        """Release resources held by this handle"""
+
+
+class ChromaVectorStore(VectorStore):
+    """
+    Vector store backed by a Chroma collection (embedded or HTTP client).
+
+    `index_params` (see HNSW_PARAMS) are used when the collection is
+    created and whenever a reset rebuilds it. An existing collection keeps
+    the parameters it was built with until then, except search_ef which is
+    updated on open; Chroma reads it when it next loads the index.
+    """
+
+    def __init__(self, collection_name: str, persist_directory: Optional[str] = None,
+                 index_params: Optional[Dict[str, Any]] = None):
+        self.collection_name = collection_name
+        self.client = get_chroma_client(persist_directory=persist_directory)
+        self.requested_params = dict(index_params or default_index_params())
+        self.collection = self._create()
+        # Handle of the same collection on the async HTTP client, opened by the first aquery
+        self._async_collection = None
+        self.set_index_params(self.requested_params)
+
+    def _create(self):
+        """Open the collection, creating it with the requested parameters if it does not exist"""
+        return self.client.get_or_create_collection(
+            name=self.collection_name,
+            metadata={f"hnsw:{name}": self.requested_params[name] for name in HNSW_PARAMS},
+            embedding_function=None
+        )
+
+    def add(self, ids, embeddings, documents, metadatas) -> None:
+        self.collection.add(
+            embeddings=embeddings,
+            documents=documents,
+            metadatas=metadatas,
+            ids=ids
+        )
+
+    def query(self, query_embeddings, n_results=5, where=None) -> Dict[str, Any]:
+        return self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where
+        )
+
+    async def aquery(self, query_embeddings, n_results=5, where=None) -> Dict[str, Any]:
+        """Query through the async HTTP client, only available with CHROMA_MODE=http"""
+        collection = self._async_collection
+        # A reset recreates the collection under a new ID
+        if collection is None or collection.id != self.collection.id:
+            client = await get_async_chroma_client()
+            collection = self._async_collection = await client.get_collection(name=self.collection_name)
+        return await collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where
+        )
+
+    def get_ids(self, where=None, limit=None) -> List[str]:
+        return self.collection.get(where=where, limit=limit, include=[])["ids"]
+
+    def iter_rows(self, batch_size=1000) -> Iterator[Dict[str, Any]]:
+        import numpy as np
+
+        offset = 0
+        while True:
+            batch = self.collection.get(limit=batch_size, offset=offset,
+                                        include=["embeddings", "documents", "metadatas"])
+            if not batch["ids"]:
+                return
+            yield {
+                "ids": batch["ids"],
+                "embeddings": np.asarray(batch["embeddings"], dtype=np.float32),
+                "documents": batch["documents"],
+                "metadatas": batch["metadatas"],
+            }
+            offset += len(batch["ids"])
+
+    def delete(self, ids: List[str]) -> None:
+        self.collection.delete(ids=ids)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def reset(self) -> None:
+        self.client.delete_collection(name=self.collection_name)
+        self.collection = self._create()
+
+    def index_params(self) -> Dict[str, Any]:
+        """HNSW parameters the collection was built with (search_ef as currently set)"""
+        hnsw = (self.collection.configuration_json or {}).get("hnsw") or {}
+        return {name: hnsw.get(key) for name, key in _HNSW_CONFIGURATION_KEYS.items()}
+
+    def set_index_params(self, params: Dict[str, Any]) -> None:
+        """Store search_ef on the collection; the other parameters apply on the next rebuild"""
+        self.requested_params.update(params)
+        current = self.index_params()
+        if not current["space"]:
+            return  # no HNSW index, e.g. a distributed Chroma deployment
+        if current["search_ef"] != self.requested_params["search_ef"]:
+            self.collection.modify(configuration={"hnsw": {"ef_search": self.requested_params["search_ef"]}})
+        rebuild = [name for name in HNSW_BUILD_PARAMS if current[name] != self.requested_params[name]]
+        if rebuild:
+            logger.info(f"Collection {self.collection_name} was built with "
+                        f"{ {name: current[name] for name in rebuild} }; "
+                        f"{ {name: self.requested_params[name] for name in rebuild} } applies once it is rebuilt")
+
+
+def create_vector_store(collection_name: str, persist_directory: Optional[str] = None,
+                        index_params: Optional[Dict[str, Any]] = None) -> VectorStore:
+    """
+    Create the vector store configured by settings.VECTOR_STORE_BACKEND.
+
+    Args:
+        collection_name: Name of the collection
+        persist_directory: Directory used by the embedded Chroma client
+        index_params: HNSW parameters of the Chroma collection, see HNSW_PARAMS
+
+    Returns:
+        A VectorStore for the collection
+    """
+    backend = settings.VECTOR_STORE_BACKEND
+    if backend == "chroma":
+        if settings.VECTOR_QUANTIZATION != "none":
+            raise ValueError("VECTOR_QUANTIZATION requires VECTOR_STORE_BACKEND=numpy")
+        return ChromaVectorStore(collection_name, persist_directory=persist_directory, index_params=index_params)
+    if backend == "numpy":
+        from src.core.numpy_vector_store import NumpyVectorStore
+        return NumpyVectorStore(collection_name,
+                                directory=settings.VECTOR_STORE_DIRECTORY,
+                                quantization=settings.VECTOR_QUANTIZATION,
+                                rescore_factor=settings.QUANTIZATION_RESCORE_FACTOR)
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {backend}")
@@ -1,11 +1,25 @@
+import time
+
+# Measures how long this worker takes from import to serving requests
+IMPORT_STARTED = time.perf_counter()
+
 from contextlib import asynccontextmanager
+import asyncio
 import logging
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from src.agent.langgraph_agent import RAGAgent
-from src.config import settings
+from fastapi.responses import JSONResponse
+from src.config import embedding_model_name, settings
 from src.api import chat_api
+from src.core.collection_registry import collection_registry
+from src.core.index_writer import (
+    JOB_HANDLERS, IndexWriter, check_writer_mode, get_ingestion_queue, single_writer_enabled, writer_lock
+)
+from src.core.ingest_checkpoint import resume_interrupted_ingestions
+from src.core.model_warmup import STATE_READY, ModelWarmup
+from src.utils import memory
+from src.utils.profiling import RequestProfilingMiddleware
 
 
 logging.basicConfig(
@@ -15,9 +29,64 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logger.info("Starting FastAPI application...")
 
+
+async def evict_idle_collections(interval_seconds: int) -> None:
+    """Periodically close collection handles of idle tenants"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        collection_registry.evict_idle()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm the models and the vector index in the background, keep the
+    models loaded and close idle collection handles while the application
+    is running. In WRITER_MODE=single, also take part in the election of the
+    index writer; otherwise finish ingestions a stopped process left behind.
+    """
+    check_writer_mode()
+    if settings.MEMORY_TRACE_ON_STARTUP:
+        memory.start_tracing(settings.MEMORY_TRACE_FRAMES)
+    warmup = ModelWarmup(
+        chat_model=os.getenv("MODEL_NAME", "mistral"),
+        embedding_model=embedding_model_name(),
+        base_url=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"),
+        collection_name=settings.DEFAULT_COLLECTION,
+        keep_alive=settings.OLLAMA_KEEP_ALIVE,
+        fast_chat_model=settings.FAST_MODEL_NAME or None,
+    )
+    app.state.warmup = warmup
+    
+    tasks = []
+    if settings.WARMUP_ENABLED:
+        tasks.append(asyncio.create_task(warmup.run()))
+    else:
+        warmup.state = STATE_READY
+    if settings.KEEP_ALIVE_REFRESH_SECONDS > 0:
+        tasks.append(asyncio.create_task(warmup.keep_alive_loop(settings.KEEP_ALIVE_REFRESH_SECONDS)))
+    tasks.append(asyncio.create_task(evict_idle_collections(max(1, settings.COLLECTION_IDLE_SECONDS // 4))))
+    if single_writer_enabled():
+        # Every worker competes for the writer lock; the holder applies queued writes
+        index_writer = IndexWriter(get_ingestion_queue(), writer_lock, JOB_HANDLERS)
+        tasks.append(asyncio.create_task(index_writer.run(settings.WRITER_POLL_SECONDS)))
+    elif settings.INGEST_RESUME_ON_STARTUP:
+        # With a single writer, interrupted add_document jobs are requeued and resume instead
+        tasks.append(asyncio.create_task(asyncio.to_thread(
+            resume_interrupted_ingestions, os.getenv("OLLAMA_BASE_URL", "http://ollama:11434")
+        )))
+    
+    logger.info(f"Serving requests {1000 * (time.perf_counter() - IMPORT_STARTED):.0f} ms after import")
+    yield
+    
+    for task in tasks:
+        task.cancel()
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     debug=settings.DEBUG,
+    lifespan=lifespan,
     openapi_url="/openapi.json",
     docs_url="/docs",
     redoc_url="/redoc"
@@ -32,6 +101,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Server-Timing breakdown for requests sent with ?profile=1, cpu or memory (DEBUG or X-Admin-Token only)
+app.add_middleware(RequestProfilingMiddleware)
+
 app.include_router(
     chat_api.router,
     prefix=f"{settings.API_PREFIX}/chat",
@@ -45,3 +117,16 @@ async def root():
     """
     return {"message": "Welcome to the FastAPI application!"}
 
+
+@app.get("/ready", tags=["Root"])
+async def ready():
+    """
+    Readiness endpoint. Returns 503 until the warm-up has succeeded, also
+    while it is degraded by a failed step, so load balancers only route
+    traffic to warm workers.
+    """
+    warmup = getattr(app.state, "warmup", None)
+    if warmup is None or not warmup.ready:
+        content = warmup.status() if warmup else {"ready": False}
+        return JSONResponse(status_code=503, content=content)
+    return warmup.status()
@@ -0,0 +1,118 @@
+"""
+Suggest MIN_SIMILARITY thresholds from a labeled query set.
+
+The query file is JSONL with one {"query": ..., "answerable": true|false}
+object per line. Each query is run against the collection and its best
+similarity recorded; the suggested threshold is the highest one that still
+lets at least --min-recall of the answerable queries through to generation.
+
+    python -m src.tools.calibrate_similarity queries.jsonl --collection resume_collection
+"""
+import argparse
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+
+
+def load_labeled_queries(path: str) -> List[Dict]:
+    """Read {"query", "answerable"} records from a JSONL file"""
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "query" not in record or "answerable" not in record:
+                raise ValueError(f"Line {line_number}: expected 'query' and 'answerable' fields")
+            records.append(record)
+    return records
+
+
+def evaluate_threshold(scores: Sequence[float], labels: Sequence[bool], threshold: float) -> Dict[str, float]:
+    """
+    Outcome of gating at a threshold.
+
+    Args:
+        scores: Best similarity per query
+        labels: Whether each query is answerable from the collection
+        threshold: Minimum similarity for generation
+
+    Returns:
+        Recall of answerable queries, share of unanswerable queries skipped
+        and share of all queries skipped
+    """
+    answerable = [score for score, label in zip(scores, labels) if label]
+    unanswerable = [score for score, label in zip(scores, labels) if not label]
+    passed = sum(score >= threshold for score in answerable)
+    skipped = sum(score < threshold for score in unanswerable)
+    return {
+        "threshold": round(threshold, 4),
+        "recall": passed / len(answerable) if answerable else 1.0,
+        "unanswerable_skipped": skipped / len(unanswerable) if unanswerable else 0.0,
+        "skipped": sum(score < threshold for score in scores) / len(scores) if scores else 0.0,
+    }
+
+
+def suggest_threshold(scores: Sequence[float], labels: Sequence[bool], min_recall: float = 0.95) -> Optional[Dict[str, float]]:
+    """
+    Highest threshold that keeps recall of answerable queries at or above min_recall.
+
+    Args:
+        scores: Best similarity per query
+        labels: Whether each query is answerable from the collection
+        min_recall: Share of answerable queries that must still be answered
+
+    Returns:
+        The evaluation of the suggested threshold, or None without answerable queries
+    """
+    if not any(labels):
+        return None
+    best = None
+    # Only the observed scores of answerable queries can change recall
+    for threshold in sorted({score for score, label in zip(scores, labels) if label}):
+        result = evaluate_threshold(scores, labels, threshold)
+        if result["recall"] >= min_recall:
+            best = result
+    return best
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Suggest a minimum-similarity threshold from labeled queries")
+    parser.add_argument("queries", help="JSONL file of {\"query\", \"answerable\"} records")
+    parser.add_argument("--collection", default=None, help="Collection to query, defaults to DEFAULT_COLLECTION")
+    parser.add_argument("--min-recall", type=float, default=0.95, help="Share of answerable queries to keep")
+    parser.add_argument("--base-url", default=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"))
+    args = parser.parse_args(argv)
+
+    from src.config import settings
+    from src.core.ollama_rag import OllamaRAG
+
+    collection_name = args.collection or settings.DEFAULT_COLLECTION
+    rag = OllamaRAG(base_url=args.base_url, collection_name=collection_name)
+    records = load_labeled_queries(args.queries)
+
+    scores = []
+    labels = []
+    for record in records:
+        docs = rag.retrieve_relevant_documents(record["query"])
+        scores.append(max((score for _, score in docs), default=0.0))
+        labels.append(bool(record["answerable"]))
+
+    suggestion = suggest_threshold(scores, labels, args.min_recall)
+    print(f"Collection: {collection_name} ({len(records)} queries, {sum(labels)} answerable)")
+    for threshold in (0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7):
+        result = evaluate_threshold(scores, labels, threshold)
+        print(f"  threshold {threshold:.2f}: recall {result['recall']:.2%}, "
+              f"unanswerable skipped {result['unanswerable_skipped']:.2%}, all skipped {result['skipped']:.2%}")
+    if suggestion is None:
+        print("No answerable queries, cannot suggest a threshold")
+        return
+    print(f"Suggested threshold: {suggestion['threshold']} "
+          f"(recall {suggestion['recall']:.2%}, unanswerable skipped {suggestion['unanswerable_skipped']:.2%})")
+    print(f"Set it with MIN_SIMILARITY={suggestion['threshold']} "
+          f"or MIN_SIMILARITY_BY_COLLECTION='{{\"{collection_name}\": {suggestion['threshold']}}}'")
+
+
+if __name__ == "__main__":
+    main()
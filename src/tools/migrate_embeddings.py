@@ -0,0 +1,51 @@
+"""
+Re-embed a collection with another embedding model, or reduce its vectors
+to fewer dimensions, and switch it over.
+
+Runs in the foreground with progress output; the API serves the old
+collection until the switch. Safe to interrupt and run again.
+
+    python -m src.tools.migrate_embeddings resume_collection --model nomic-embed-text
+    python -m src.tools.migrate_embeddings resume_collection --model mistral --reduce pca --dim 256
+"""
+import argparse
+import os
+import threading
+from typing import List, Optional
+
+from src.config import embedding_model_name, settings
+from src.core.embedding_migration import EmbeddingMigration
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Re-embed a collection with another embedding model")
+    parser.add_argument("collection")
+    parser.add_argument("--model", default=None, help="Target embedding model, defaults to EMBEDDING_MODEL_NAME")
+    parser.add_argument("--batch-size", type=int, default=settings.MIGRATION_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=settings.MIGRATION_PAUSE_SECONDS,
+                        help="Seconds to wait between batches")
+    parser.add_argument("--reduce", choices=["pca", "random"], help="Reduce stored vectors with a projection")
+    parser.add_argument("--dim", type=int, help="Dimension to reduce to")
+    parser.add_argument("--sample-size", type=int, default=settings.PROJECTION_SAMPLE_SIZE)
+    parser.add_argument("--seed", type=int, default=settings.PROJECTION_SEED)
+    args = parser.parse_args(argv)
+
+    migration = EmbeddingMigration(args.collection, args.model or embedding_model_name(),
+                                   base_url=os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"),
+                                   batch_size=args.batch_size, pause_seconds=args.pause,
+                                   reduce_method=args.reduce, reduce_dim=args.dim,
+                                   sample_size=args.sample_size, seed=args.seed)
+    thread = threading.Thread(target=migration.run, daemon=True)
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(timeout=5)
+            print(f"{migration.status}: {migration.rows_copied}/{migration.rows_total} rows copied")
+    except KeyboardInterrupt:
+        migration.stop()
+        thread.join()
+    print(migration.to_dict())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Compare retrieval recall and search latency of reduced and full-size vectors
+on a collection.
+
+Stored rows are used as queries, with each query's own row left out of its
+results, unless a file of questions (one per line) is given; those are
+embedded with the collection's model. Full-size exact search is the ground
+truth. The collection must store full-size vectors.
+
+    python -m src.tools.projection_report resume_collection --dims 128 256 512 --methods pca random
+"""
+import argparse
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.config import settings
+from src.core.projection import Projection
+
+
+def exact_top_k(queries: np.ndarray, vectors: np.ndarray, k: int,
+                exclude: Optional[np.ndarray] = None) -> np.ndarray:
+    """Rows of the k best dot products per query; `exclude` holds one row per query to leave out"""
+    scores = queries @ vectors.T
+    if exclude is not None:
+        scores[np.arange(len(queries)), exclude] = -np.inf
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1)
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    """Mean fraction of the true top-k rows that were found"""
+    hits = [len(set(t) & set(f)) / len(t) for t, f in zip(truth.tolist(), found.tolist())]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def search_ms(queries: np.ndarray, vectors: np.ndarray, k: int, repeat: int = 3) -> float:
+    """Best time of an exact top-k search, in milliseconds per query"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        exact_top_k(queries, vectors, k)
+        timings.append(time.perf_counter() - start)
+    return 1000 * min(timings) / len(queries)
+
+
+def evaluate(vectors: np.ndarray, queries: np.ndarray, projection: Optional[Projection], k: int,
+             exclude: Optional[np.ndarray] = None) -> Dict[str, float]:
+    """Recall@k against full-size search, latency and size per row of one configuration"""
+    truth = exact_top_k(queries, vectors, k, exclude)
+    if projection is None:
+        reduced_vectors, reduced_queries = vectors, queries
+    else:
+        reduced_vectors = projection.apply(vectors).astype(np.float32)
+        reduced_queries = projection.apply(queries).astype(np.float32)
+    found = exact_top_k(reduced_queries, reduced_vectors, k, exclude)
+    return {
+        "dim": reduced_vectors.shape[1],
+        "recall": recall_at_k(truth, found),
+        "ms_per_query": search_ms(reduced_queries, reduced_vectors, k),
+        "bytes_per_row": reduced_vectors.shape[1] * 4,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Recall and latency of reduced embeddings on a collection")
+    parser.add_argument("collection")
+    parser.add_argument("--dims", type=int, nargs="+", default=[128, 256, 512])
+    parser.add_argument("--methods", nargs="+", choices=["pca", "random"], default=["pca", "random"])
+    parser.add_argument("--queries", help="File with one question per line; stored rows are used otherwise")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--max-rows", type=int, default=100000)
+    parser.add_argument("--sample-size", type=int, default=settings.PROJECTION_SAMPLE_SIZE)
+    parser.add_argument("--seed", type=int, default=settings.PROJECTION_SEED)
+    args = parser.parse_args(argv)
+
+    from src.core.chromadb_manager import ChromaDBManager
+
+    manager = ChromaDBManager(collection_name=args.collection)
+    if manager.projection is not None:
+        parser.error(f"{manager.physical_name} already stores reduced vectors")
+    batches = []
+    for batch in manager.store.iter_rows(batch_size=4096):
+        batches.append(batch["embeddings"])
+        if sum(len(b) for b in batches) >= args.max_rows:
+            break
+    vectors = np.concatenate(batches)[:args.max_rows] if batches else np.zeros((0, 0), dtype=np.float32)
+    if len(vectors) <= args.k:
+        parser.error(f"{args.collection} has too few rows for k={args.k}")
+
+    rng = np.random.default_rng(args.seed)
+    if args.queries:
+        from src.core.ollama_embedding import OllamaEmbedding
+
+        with open(args.queries, "r") as f:
+            questions = [line.strip() for line in f if line.strip()][:args.num_queries]
+        embedder = OllamaEmbedding(manager.model_name, os.getenv("OLLAMA_BASE_URL", "http://ollama:11434"))
+        queries = np.asarray(embedder.embed_batch(questions), dtype=np.float32)
+        exclude = None
+    else:
+        exclude = rng.choice(len(vectors), size=min(args.num_queries, len(vectors)), replace=False)
+        queries = vectors[exclude]
+
+    print(f"{args.collection}: {len(vectors)} rows of {vectors.shape[1]} dims ({manager.model_name}), "
+          f"{len(queries)} queries, k={args.k}")
+    print(f"{'method':<8} {'dim':>6} {'recall@k':>9} {'ms/query':>9} {'bytes/row':>10}")
+    full = evaluate(vectors, queries, None, args.k, exclude)
+    print(f"{'full':<8} {full['dim']:>6} {full['recall']:>9.3f} {full['ms_per_query']:>9.3f} {full['bytes_per_row']:>10}")
+    sample = vectors[:args.sample_size]
+    for method in args.methods:
+        for dim in args.dims:
+            if dim >= vectors.shape[1] or (method == "pca" and dim > len(sample)):
+                continue
+            projection = (Projection.fit_pca(sample, dim) if method == "pca"
+                          else Projection.random(vectors.shape[1], dim, seed=args.seed))
+            result = evaluate(vectors, queries, projection, args.k, exclude)
+            print(f"{method:<8} {dim:>6} {result['recall']:>9.3f} {result['ms_per_query']:>9.3f} "
+                  f"{result['bytes_per_row']:>10}")
+
+
+if __name__ == "__main__":
+    main()
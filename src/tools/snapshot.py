@@ -0,0 +1,49 @@
+"""
+Export a collection to a snapshot file, or load one into a collection.
+
+    python -m src.tools.snapshot export resume_collection snapshots/resume_collection.snapshot
+    python -m src.tools.snapshot import snapshots/resume_collection.snapshot --collection replica_collection
+"""
+import argparse
+import time
+from typing import List, Optional
+
+from src.config import settings
+from src.core.chromadb_manager import ChromaDBManager
+from src.core.snapshot import export_snapshot, import_snapshot, read_snapshot_header
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export or import a collection snapshot")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write a collection to a snapshot file")
+    export_parser.add_argument("collection")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--block-rows", type=int, default=settings.SNAPSHOT_BLOCK_ROWS)
+    import_parser = commands.add_parser("import", help="Load a snapshot file into a collection")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--collection", help="Target collection; defaults to the exported collection")
+    import_parser.add_argument("--no-skip-existing", action="store_true",
+                               help="Import every row, even if its ID or document is already stored")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == "export":
+        result = export_snapshot(ChromaDBManager(collection_name=args.collection), args.path,
+                                 block_rows=args.block_rows)
+        print(f"Exported {result['rows']} rows ({result['bytes'] / 1e6:.1f} MB) "
+              f"in {time.perf_counter() - start:.1f} s")
+        return
+
+    collection = args.collection
+    if collection is None:
+        with open(args.path, "rb") as f:
+            collection = read_snapshot_header(f)["collection"]
+    result = import_snapshot(ChromaDBManager(collection_name=collection), args.path,
+                             skip_existing=not args.no_skip_existing)
+    print(f"Imported {result['imported']} rows into {collection}, skipped {result['skipped']} "
+          f"in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
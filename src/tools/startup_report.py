@@ -0,0 +1,110 @@
+"""
+Break down the cold-start cost of a worker.
+
+Imports src.main in a fresh interpreter with -X importtime and reports the
+slowest modules and the import time per top-level package, then starts
+the application (lifespan included) in another fresh interpreter and times
+the first requests to / and /ready.
+
+    python -m src.tools.startup_report --top 15
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+STARTUP_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from src.main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    startup = time.perf_counter()
+    root = client.get("/")
+    first_request = time.perf_counter()
+    ready = client.get("/ready")
+    ready_request = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - started,
+    "startup_seconds": startup - imported,
+    "root_seconds": first_request - startup,
+    "ready_seconds": ready_request - first_request,
+    "ready_status": ready.status_code,
+}))
+"""
+
+
+def parse_import_times(output: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self_us, cumulative_us, depth) for each line of -X importtime output"""
+    modules = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            modules.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+
+def time_by_package(modules: List[Tuple[str, int, int, int]]) -> Dict[str, int]:
+    """Import time (self, in microseconds) summed per top-level package"""
+    totals: Dict[str, int] = defaultdict(int)
+    for module, self_us, _, _ in modules:
+        totals[module.split(".")[0]] += self_us
+    return dict(totals)
+
+
+def run_python(code: str, env: Dict[str, str], importtime: bool = False) -> subprocess.CompletedProcess:
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(args, capture_output=True, text=True, env=env, cwd=os.getcwd())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Report import and startup cost of the API")
+    parser.add_argument("--top", type=int, default=15, help="Number of modules and packages to list")
+    parser.add_argument("--warmup", action="store_true", help="Keep model warm-up enabled during the startup run")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    if not args.warmup:
+        # Warm-up runs in the background and needs Ollama; leave it out of the measurement by default
+        env["WARMUP_ENABLED"] = "False"
+        env["KEEP_ALIVE_REFRESH_SECONDS"] = "0"
+
+    result = run_python("import src.main", env, importtime=True)
+    if result.returncode != 0:
+        print(result.stderr)
+        sys.exit(result.returncode)
+    modules = parse_import_times(result.stderr)
+    total_us = max((cumulative for module, _, cumulative, _ in modules if module == "src.main"), default=0)
+
+    print(f"Importing src.main: {total_us / 1000:.0f} ms")
+    print("\nSlowest modules (cumulative):")
+    for module, _, cumulative, _ in sorted(modules, key=lambda m: m[2], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+    print("\nImport time per package (self):")
+    for package, self_us in sorted(time_by_package(modules).items(), key=lambda p: p[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    result = run_python(STARTUP_SCRIPT, env)
+    if result.returncode != 0:
+        print(result.stderr)
+        sys.exit(result.returncode)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    print("\nApplication startup:")
+    print(f"  {timings['import_seconds'] * 1000:8.1f} ms  import src.main (bytecode cached)")
+    print(f"  {timings['startup_seconds'] * 1000:8.1f} ms  lifespan startup")
+    print(f"  {timings['root_seconds'] * 1000:8.1f} ms  first GET /")
+    print(f"  {timings['ready_seconds'] * 1000:8.1f} ms  first GET /ready (status {timings['ready_status']})")
+    serving = timings["import_seconds"] + timings["startup_seconds"] + timings["root_seconds"]
+    print(f"  {serving * 1000:8.1f} ms  total until / is served")
+
+
+if __name__ == "__main__":
+    main()
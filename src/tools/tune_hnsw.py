@@ -0,0 +1,178 @@
+"""
+Measure HNSW recall and search latency on a collection across a grid of
+index parameters, and recommend the fastest setting that reaches a recall
+target.
+
+Each (M, construction_ef) pair is built in a temporary Chroma index from
+the collection's stored vectors and searched with every search_ef. Stored
+rows are used as queries, with each query's own row left out of its
+results; exact search is the ground truth.
+
+    python -m src.tools.tune_hnsw resume_collection --m 8 16 32 --search-ef 10 50 100 --target-recall 0.95
+
+With --apply the recommendation is stored for the collection: search_ef
+takes effect when Chroma next loads the index (after a restart of the
+workers, or of the server in CHROMA_MODE=http), M and construction_ef when
+the collection is rebuilt (a reset or an embedding migration).
+"""
+import argparse
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import settings
+from src.tools.projection_report import exact_top_k, recall_at_k
+
+
+def ranking_space(queries: np.ndarray, vectors: np.ndarray, space: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Rewrite queries and vectors so a dot product ranks rows as `space` does"""
+    if space == "cosine":
+        def unit(x):
+            norms = np.linalg.norm(x, axis=1, keepdims=True)
+            return x / np.where(norms == 0, 1, norms)
+        return unit(queries), unit(vectors)
+    if space == "l2":
+        # -|q - v|^2 = 2 q.v - |v|^2 - |q|^2, and |q|^2 is the same for every row
+        ones = np.ones((len(queries), 1), dtype=np.float32)
+        squared_norms = np.sum(vectors ** 2, axis=1, keepdims=True)
+        return np.hstack([2 * queries, -ones]), np.hstack([vectors, squared_norms])
+    return queries, vectors
+
+
+def build_index(client, vectors: np.ndarray, space: str, m: int, construction_ef: int):
+    """Chroma collection of the vectors, with row numbers as ids; returns it and its build time"""
+    name = f"tune-hnsw-{m}-{construction_ef}"
+    start = time.perf_counter()
+    collection = client.create_collection(
+        name=name,
+        metadata={"hnsw:space": space, "hnsw:M": m, "hnsw:construction_ef": construction_ef},
+        embedding_function=None,
+    )
+    batch_size = client.get_max_batch_size()
+    for offset in range(0, len(vectors), batch_size):
+        rows = vectors[offset:offset + batch_size]
+        collection.add(ids=[str(row) for row in range(offset, offset + len(rows))], embeddings=rows.tolist())
+    return collection, time.perf_counter() - start
+
+
+def search(collection, queries: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, float]:
+    """Top-k rows per query, leaving out the query's own row, and the median latency in ms"""
+    found, latencies = [], []
+    for query, own_row in zip(queries.tolist(), rows.tolist()):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k + 1, include=[])
+        latencies.append(time.perf_counter() - start)
+        hits = [int(doc_id) for doc_id in result["ids"][0] if int(doc_id) != own_row][:k]
+        found.append(hits + [-1] * (k - len(hits)))
+    return np.asarray(found), 1000 * float(np.median(latencies))
+
+
+def tune(vectors: np.ndarray, rows: np.ndarray, space: str, k: int, m_values: List[int],
+         construction_efs: List[int], search_efs: List[int]) -> List[Dict[str, Any]]:
+    """
+    Recall@k and latency of every parameter combination, with `vectors[rows]`
+    as queries. Chroma's clients are reset in this process along the way.
+    """
+    import chromadb
+    from chromadb.api.client import SharedSystemClient
+
+    from src.core.chroma_client import clear_chroma_clients
+    from src.core.collection_registry import collection_registry
+
+    queries = vectors[rows]
+    truth = exact_top_k(*ranking_space(queries, vectors, space), k, exclude=rows)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for m in m_values:
+                for construction_ef in construction_efs:
+                    collection, build_seconds = build_index(chromadb.PersistentClient(directory), vectors,
+                                                            space, m, construction_ef)
+                    for search_ef in search_efs:
+                        collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+                        # ef_search is read when Chroma loads the index; reopen the client so it reloads
+                        SharedSystemClient.clear_system_cache()
+                        collection = chromadb.PersistentClient(directory).get_collection(collection.name)
+                        found, ms_per_query = search(collection, queries, rows, k)
+                        results.append({
+                            "M": m,
+                            "construction_ef": construction_ef,
+                            "search_ef": search_ef,
+                            "recall": recall_at_k(truth, found),
+                            "ms_per_query": ms_per_query,
+                            "build_seconds": build_seconds,
+                        })
+    finally:
+        # Handles opened before point at clients that no longer exist
+        SharedSystemClient.clear_system_cache()
+        collection_registry.clear()
+        clear_chroma_clients()
+    return results
+
+
+def recommend(results: List[Dict[str, Any]], target_recall: float) -> Dict[str, Any]:
+    """Fastest setting reaching the target recall (smaller M and build effort break ties), else the most accurate"""
+    reaching = [r for r in results if r["recall"] >= target_recall]
+    if reaching:
+        return min(reaching, key=lambda r: (round(r["ms_per_query"], 2), r["M"], r["construction_ef"]))
+    return max(results, key=lambda r: (r["recall"], -r["ms_per_query"]))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="HNSW recall and latency of a collection across index parameters")
+    parser.add_argument("collection")
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[64, 100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 20, 50, 100, 200])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--max-rows", type=int, default=100000)
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--apply", action="store_true", help="Store the recommended parameters for the collection")
+    args = parser.parse_args(argv)
+
+    if settings.VECTOR_STORE_BACKEND != "chroma":
+        parser.error("HNSW parameters only apply to VECTOR_STORE_BACKEND=chroma")
+
+    from src.core.chromadb_manager import ChromaDBManager
+
+    manager = ChromaDBManager(collection_name=args.collection)
+    current = manager.store.index_params()
+    batches = []
+    for batch in manager.store.iter_rows(batch_size=4096):
+        batches.append(batch["embeddings"])
+        if sum(len(b) for b in batches) >= args.max_rows:
+            break
+    vectors = np.concatenate(batches)[:args.max_rows] if batches else np.zeros((0, 0), dtype=np.float32)
+    if len(vectors) <= args.k:
+        parser.error(f"{args.collection} has too few rows for k={args.k}")
+    rng = np.random.default_rng(args.seed)
+    rows = rng.choice(len(vectors), size=min(args.num_queries, len(vectors)), replace=False)
+
+    print(f"{manager.physical_name}: {len(vectors)} rows of {vectors.shape[1]} dims, space={current['space']}, "
+          f"{len(rows)} queries, k={args.k}")
+    print(f"current: M={current['M']} construction_ef={current['construction_ef']} search_ef={current['search_ef']}")
+    print(f"{'M':>4} {'constr_ef':>9} {'search_ef':>9} {'recall@k':>9} {'ms/query':>9} {'build_s':>8}")
+    results = tune(vectors, rows, current["space"], args.k, args.m, args.construction_ef, args.search_ef)
+    for r in results:
+        print(f"{r['M']:>4} {r['construction_ef']:>9} {r['search_ef']:>9} {r['recall']:>9.3f} "
+              f"{r['ms_per_query']:>9.3f} {r['build_seconds']:>8.2f}")
+
+    best = recommend(results, args.target_recall)
+    params = {"M": best["M"], "construction_ef": best["construction_ef"], "search_ef": best["search_ef"]}
+    reached = "reaches" if best["recall"] >= args.target_recall else "is the closest to"
+    print(f"recommended: {params} {reached} recall@{args.k} >= {args.target_recall} "
+          f"({best['recall']:.3f}, {best['ms_per_query']:.3f} ms/query)")
+    if args.apply:
+        rebuild = ChromaDBManager(collection_name=args.collection).set_index_params(params)
+        print("stored; search_ef applies when Chroma next loads the index (restart the workers, "
+              "or the Chroma server in http mode)")
+        if rebuild:
+            print(f"{', '.join(rebuild)} apply once {args.collection} is rebuilt (reset or embedding migration)")
+
+
+if __name__ == "__main__":
+    main()
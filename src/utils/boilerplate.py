@@ -0,0 +1,116 @@
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+WHITESPACE = re.compile(r"\s+")
+MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+# Numeric dates (2024-03-01, 01/03/2024, 1.3.24) and written ones (March 3, 2024; 3 Mar 2024; March 2024)
+DATE_PATTERN = re.compile(
+    r"\b\d{1,4}[/.-]\d{1,2}[/.-]\d{1,4}\b"
+    rf"|\b{MONTH}\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{2,4}}\b"
+    rf"|\b\d{{1,2}}(?:st|nd|rd|th)?\s+{MONTH},?\s+\d{{2,4}}\b"
+    rf"|\b{MONTH}\s+\d{{4}}\b"
+)
+NUMBER_PATTERN = re.compile(r"\d+")
+
+# Repeated lines only show up in the report this many at a time
+REPORT_TOP_LINES = 10
+
+
+def line_signature(line: str) -> Tuple[str, bool]:
+    """
+    Normalized form of a line and whether it was fuzzy-matched: dates and
+    numbers are replaced by placeholders, so "Page 3 of 20" and "Page 4 of
+    20" have the same signature.
+    """
+    text = WHITESPACE.sub(" ", line).strip().lower()
+    signature = NUMBER_PATTERN.sub("#", DATE_PATTERN.sub("<date>", text))
+    return signature, signature != text
+
+
+class BoilerplateReport:
+    """What a BoilerplateFilter removed from one document"""
+
+    def __init__(self, pages: int, chars_total: int, chars_removed: int = 0, lines_removed: int = 0,
+                 repeated: Optional[List[Tuple[str, int]]] = None):
+        self.pages = pages
+        self.chars_total = chars_total
+        self.chars_removed = chars_removed
+        self.lines_removed = lines_removed
+        # (signature, pages it was removed from) of the most repeated lines
+        self.repeated = repeated or []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "pages": self.pages,
+            "chars_removed": self.chars_removed,
+            "removed_fraction": round(self.chars_removed / self.chars_total, 4) if self.chars_total else 0.0,
+            "lines_removed": self.lines_removed,
+            "repeated_lines": [{"line": line, "pages": pages} for line, pages in self.repeated],
+        }
+
+
+class BoilerplateFilter:
+    """
+    Removes lines repeated across the pages of a document (running headers
+    and footers, page numbers, dates, legal disclaimers) before chunking.
+
+    A line is boilerplate when its signature is found on at least
+    `min_page_fraction` of the pages, and on at least `min_pages` pages.
+    Lines matched only after replacing numbers or dates must also be
+    within `edge_lines` of the top or bottom of each page they are counted
+    on, so table rows that differ only in their figures are kept.
+    """
+
+    def __init__(self, min_page_fraction: float = 0.5, min_pages: int = 3, edge_lines: int = 3):
+        self.min_page_fraction = min_page_fraction
+        self.min_pages = min_pages
+        self.edge_lines = edge_lines
+
+    def _page_signatures(self, page_text: str) -> List[Optional[str]]:
+        """Signature of each line that may be boilerplate, None for the others"""
+        lines = page_text.split("\n")
+        content = [index for index, line in enumerate(lines) if line.strip()]
+        edges = set(content[:self.edge_lines]) | set(content[-self.edge_lines:])
+        signatures: List[Optional[str]] = [None] * len(lines)
+        for index in content:
+            signature, fuzzy = line_signature(lines[index])
+            if not fuzzy or index in edges:
+                signatures[index] = signature
+        return signatures
+
+    def find(self, pages: List[str]) -> Dict[str, int]:
+        """Boilerplate signatures and the number of pages each is found on"""
+        if len(pages) < self.min_pages:
+            return {}
+        counts: Counter = Counter()
+        for page_text in pages:
+            counts.update({signature for signature in self._page_signatures(page_text or "") if signature})
+        threshold = max(self.min_pages, self.min_page_fraction * len(pages))
+        return {signature: count for signature, count in counts.items() if count >= threshold}
+
+    def clean(self, pages: List[str]) -> Tuple[List[str], BoilerplateReport]:
+        """Pages without their boilerplate lines, and what was removed"""
+        report = BoilerplateReport(pages=len(pages), chars_total=sum(len(page or "") for page in pages))
+        boilerplate = self.find(pages)
+        if not boilerplate:
+            return list(pages), report
+
+        removed_from: Counter = Counter()
+        cleaned = []
+        for page_text in pages:
+            page_text = page_text or ""
+            lines = page_text.split("\n")
+            kept = []
+            seen: Set[str] = set()
+            for line, signature in zip(lines, self._page_signatures(page_text)):
+                if signature in boilerplate:
+                    report.lines_removed += 1
+                    seen.add(signature)
+                else:
+                    kept.append(line)
+            removed_from.update(seen)
+            cleaned.append("\n".join(kept))
+        report.chars_removed = report.chars_total - sum(len(page) for page in cleaned)
+        report.repeated = removed_from.most_common(REPORT_TOP_LINES)
+        return cleaned, report
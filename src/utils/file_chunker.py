@@ -1,38 +1,73 @@
-from pypdf import PdfReader
-from textsplitter import TextSplitter
+import logging
+from typing import Iterator, List, Optional
+
+from src.utils.boilerplate import BoilerplateFilter, BoilerplateReport
+from src.utils.text_chunker import Chunk, TextChunker
+
+logger = logging.getLogger(__name__)
 
 class PDFChunker:
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, remove_boilerplate: bool = True,
+                 boilerplate_filter: Optional[BoilerplateFilter] = None):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.text_chunker = TextChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.boilerplate_filter = (boilerplate_filter or BoilerplateFilter()) if remove_boilerplate else None
+        # What was removed from the last document read
+        self.boilerplate_report: Optional[BoilerplateReport] = None
 
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        text = ""
+    def iter_pages(self, pdf_path: str) -> Iterator[str]:
+        """
+        Yields the text of each page of the PDF file. A file that cannot be
+        read to the end raises, so it is never stored as if it were complete.
+        """
+        # Imported here so only ingestion pays for it
+        from pypdf import PdfReader
         try:
             with open(pdf_path, "rb") as file:
                 pdf_reader = PdfReader(file)
                 for page in pdf_reader.pages:
-                    text += page.extract_text() or "\n"
-        except Exception as e:
-            print(f"Error reading PDF file {pdf_path}: {e}")
-        return text
+                    yield page.extract_text() or "\n"
+        except Exception:
+            logger.exception(f"Error reading PDF file {pdf_path}")
+            raise
+
+    def clean_pages(self, pdf_path: str) -> List[str]:
+        """
+        Text of each page without the lines repeated across pages (headers,
+        footers, page numbers); the whole document is read before the first
+        page is returned. Sets boilerplate_report.
+        """
+        pages = list(self.iter_pages(pdf_path))
+        if self.boilerplate_filter is None:
+            return pages
+        pages, self.boilerplate_report = self.boilerplate_filter.clean(pages)
+        return pages
+    
+    def extract_text_from_pdf(self, pdf_path: str) -> str:
+        """Text of the PDF file; chunk spans are character positions in it"""
+        return "\n".join(self.clean_pages(pdf_path))
     
     def chunk_text(self, text: str) -> list[str]:
         """
         Splits the text into chunks of specified size with overlap.
         """
-        text_splitter = TextSplitter(max_token_size=self.chunk_size, remove_stopwords=False)
-        chunks = text_splitter.split_text(text)
-        return chunks
+        return [chunk.text for chunk in self.text_chunker.chunk_text(text)]
+    
+    def iter_chunks(self, pdf_path: str) -> Iterator[Chunk]:
+        """
+        Streams chunk records (text, page, character span) of the PDF file page by page.
+        With boilerplate removal, spans refer to the cleaned text and the pages are read up front.
+        """
+        if self.boilerplate_filter is None:
+            return self.text_chunker.chunk_pages(self.iter_pages(pdf_path))
+        return self._iter_clean_chunks(pdf_path)
+    
+    def _iter_clean_chunks(self, pdf_path: str) -> Iterator[Chunk]:
+        yield from self.text_chunker.chunk_pages(self.clean_pages(pdf_path))
     
     def process_pdf(self, pdf_path: str) -> list[str]:
         """
         Processes the PDF file and returns a list of text chunks.
         """
-        text = self.extract_text_from_pdf(pdf_path)
-        if not text:
-            return []
-        
-        chunks = self.chunk_text(text)
-        return chunks
-        
\ No newline at end of file
+        return [chunk.text for chunk in self.iter_chunks(pdf_path)]
@@ -0,0 +1,181 @@
+"""
+Process memory gauges and tracemalloc helpers.
+
+Resident set size is read from /proc and the peak from getrusage, so both
+are free to collect. Allocation sites and per-stage memory need
+tracemalloc, which slows every allocation down while it is tracing; it is
+started for memory-profiled requests and ingestions only, or for the
+lifetime of the process with MEMORY_TRACE_ON_STARTUP.
+"""
+import os
+import resource
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+_lock = threading.Lock()
+# Memory-profiled blocks currently running; tracing stops when the last one ends
+_tracing_users = 0
+# Whether tracemalloc was started here (and not by -X tracemalloc or PYTHONTRACEMALLOC)
+_tracing_owned = False
+_tracing_permanent = False
+# Open stages of every tracker: resetting the traced peak for one stage has to credit the others first
+_open_stages: List["_OpenStage"] = []
+
+# Allocations made by the tracing itself or by imports are not interesting sites
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>",
+                  "<unknown>")
+
+
+def _max_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # No procfs (macOS); the peak is the closest cheap figure
+        return _max_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """Highest resident set size this process has reached"""
+    # The kernel's high-water mark can trail the current size by a few pages
+    return max(_max_rss_bytes(), rss_bytes())
+
+
+def gauges() -> Dict[str, Any]:
+    """Memory gauges of this worker"""
+    result: Dict[str, Any] = {"pid": os.getpid(), "rss_bytes": rss_bytes(), "peak_rss_bytes": peak_rss_bytes(),
+                              "tracing": tracemalloc.is_tracing()}
+    if result["tracing"]:
+        current, peak = tracemalloc.get_traced_memory()
+        result["traced_bytes"] = current
+        result["traced_peak_bytes"] = peak
+    return result
+
+
+def start_tracing(frames: int = 1) -> None:
+    """Trace allocations until the process exits"""
+    global _tracing_owned, _tracing_permanent
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _tracing_owned = True
+        _tracing_permanent = True
+
+
+@contextmanager
+def tracing(frames: int = 1) -> Iterator[None]:
+    """Trace allocations while the block runs; nested and concurrent blocks share one trace"""
+    global _tracing_users, _tracing_owned
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _tracing_owned = True
+        _tracing_users += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _tracing_users -= 1
+            if _tracing_users == 0 and _tracing_owned and not _tracing_permanent:
+                tracemalloc.stop()
+                _tracing_owned = False
+
+
+def take_snapshot() -> Optional[tracemalloc.Snapshot]:
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+    )
+
+
+def top_allocations(limit: int = 20, snapshot: Optional[tracemalloc.Snapshot] = None,
+                    baseline: Optional[tracemalloc.Snapshot] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Source lines holding the most traced memory, or None when not tracing.
+    With a baseline, lines are ranked by how much their memory grew since it.
+    """
+    snapshot = snapshot or take_snapshot()
+    if snapshot is None:
+        return None
+    if baseline is not None:
+        stats = snapshot.compare_to(baseline, "lineno")
+        return [{"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 "size_bytes": stat.size, "size_diff_bytes": stat.size_diff,
+                 "count": stat.count, "count_diff": stat.count_diff}
+                for stat in stats[:limit] if stat.size_diff > 0]
+    return [{"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+             "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:limit]]
+
+
+class _OpenStage:
+    __slots__ = ("name", "start_bytes", "peak_bytes")
+
+    def __init__(self, name: str, start_bytes: int):
+        self.name = name
+        self.start_bytes = start_bytes
+        self.peak_bytes = start_bytes
+
+
+def _credit_peak(peak: int) -> None:
+    """Fold the traced peak into every open stage; called with the lock held"""
+    for stage in _open_stages:
+        if peak > stage.peak_bytes:
+            stage.peak_bytes = peak
+
+
+class MemoryStages:
+    """
+    Traced memory per stage of one request or ingestion: the bytes a stage
+    left allocated, summed over its calls, and the most it had allocated
+    on top of what was live when it started, over all calls.
+
+    tracemalloc traces the whole process, so stages running at the same
+    time as other work (concurrent requests, ingestion) include that
+    work's allocations too.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, int]] = {}
+        self._stages_lock = threading.Lock()
+
+    def enter(self, name: str) -> Optional[_OpenStage]:
+        if not tracemalloc.is_tracing():
+            return None
+        with _lock:
+            current, peak = tracemalloc.get_traced_memory()
+            _credit_peak(peak)
+            tracemalloc.reset_peak()
+            stage = _OpenStage(name, current)
+            _open_stages.append(stage)
+        return stage
+
+    def exit(self, stage: Optional[_OpenStage]) -> None:
+        if stage is None:
+            return
+        with _lock:
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                _credit_peak(peak)
+            else:
+                current = stage.start_bytes
+            _open_stages.remove(stage)
+        with self._stages_lock:
+            totals = self.stages.setdefault(stage.name, {"calls": 0, "allocated_bytes": 0, "peak_bytes": 0})
+            totals["calls"] += 1
+            totals["allocated_bytes"] += current - stage.start_bytes
+            totals["peak_bytes"] = max(totals["peak_bytes"], stage.peak_bytes - stage.start_bytes)
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        with self._stages_lock:
+            return {name: dict(totals) for name, totals in self.stages.items()}
@@ -0,0 +1,317 @@
+"""
+Opt-in per-request profiling.
+
+A request sent with `?profile=1` (or an `X-Profile: 1` header) gets a
+Server-Timing header with the time spent in each instrumented stage: graph
+nodes, embedding, vector search and generation. `profile=cpu` also samples
+the Python stacks of the threads running those stages and adds the folded
+stacks to a JSON response under "profile". `profile=memory` traces
+allocations with tracemalloc while the request runs and adds the memory
+each stage allocated and peaked at, plus the source lines whose memory grew
+most. Profiling is only honoured with DEBUG enabled or a matching
+X-Admin-Token header; ingestions can be memory-profiled with
+MEMORY_PROFILE_INGESTION.
+
+Stages are recorded through a context variable, so an unprofiled request
+pays one ContextVar lookup per stage. The variable is copied into worker
+threads by asyncio.to_thread and into graph nodes by LangGraph, so stages
+running there are attributed to the request that started them. Streamed
+answers send their headers before generation starts, so their Server-Timing
+covers the stages up to the first byte.
+"""
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from src.config import settings
+from src.utils import memory
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_DEPTH = 64
+PROFILE_TOP_STACKS = 50
+# Memory profiles of recent ingestions, served by the admin memory endpoint
+RECENT_MEMORY_PROFILES = 10
+
+
+class RequestTimings:
+    """Durations of the stages of one request, summed per stage name"""
+
+    def __init__(self, sample_stacks: bool = False, trace_memory: bool = False):
+        self.started = time.perf_counter()
+        self.sample_stacks = sample_stacks
+        self.memory = memory.MemoryStages() if trace_memory else None
+        self.stages: Dict[str, List[float]] = {}
+        # Threads currently inside a stage, with their nesting depth; only tracked when sampling
+        self.active_threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stage = self.stages.setdefault(name, [0.0, 0])
+            stage[0] += seconds
+            stage[1] += 1
+
+    def enter(self) -> None:
+        thread_id = threading.get_ident()
+        with self._lock:
+            self.active_threads[thread_id] = self.active_threads.get(thread_id, 0) + 1
+
+    def exit(self) -> None:
+        thread_id = threading.get_ident()
+        with self._lock:
+            depth = self.active_threads.get(thread_id, 1) - 1
+            if depth:
+                self.active_threads[thread_id] = depth
+            else:
+                self.active_threads.pop(thread_id, None)
+
+    def server_timing(self) -> str:
+        """Server-Timing header value; stages run several times carry their call count"""
+        with self._lock:
+            stages = list(self.stages.items())
+        entries = []
+        for name, (seconds, calls) in stages:
+            entry = f"{name};dur={seconds * 1000:.1f}"
+            if calls > 1:
+                entry += f';desc="{calls} calls"'
+            entries.append(entry)
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+# Innermost stage being timed, so a stage calling itself (e.g. a batch embed falling back to single embeds) counts once
+_stage: ContextVar[Optional[str]] = ContextVar("request_stage", default=None)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Record the duration of a block as stage `name` of the current profiled request"""
+    timings = _current.get()
+    if timings is None or _stage.get() == name:
+        yield
+        return
+    stage_token = _stage.set(name)
+    if timings.sample_stacks:
+        timings.enter()
+    memory_stage = timings.memory.enter(name) if timings.memory is not None else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+        if timings.memory is not None:
+            timings.memory.exit(memory_stage)
+        if timings.sample_stacks:
+            timings.exit()
+        _stage.reset(stage_token)
+
+
+def timed_stage(name: str) -> Callable:
+    """Decorator form of timed(); functools.wraps keeps the signature LangGraph inspects"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with timed(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of the threads inside a stage of one request"""
+
+    def __init__(self, timings: RequestTimings, interval_seconds: float):
+        super().__init__(daemon=True, name="request-profiler")
+        self.timings = timings
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def _folded(frame) -> str:
+        names = []
+        while frame is not None and len(names) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval_seconds):
+            with self.timings._lock:
+                thread_ids = list(self.timings.active_threads)
+            if not thread_ids:
+                continue
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[self._folded(frame)] += 1
+                    self.samples += 1
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop sampling and return the most frequent folded stacks (flamegraph.pl input)"""
+        self._stop_event.set()
+        self.join()
+        return {
+            "interval_ms": self.interval_seconds * 1000,
+            "samples": self.samples,
+            "stacks": [{"stack": stack, "samples": count}
+                       for stack, count in self.stacks.most_common(PROFILE_TOP_STACKS)],
+        }
+
+
+_memory_profiles: Deque[Dict[str, Any]] = deque(maxlen=RECENT_MEMORY_PROFILES)
+
+
+@contextmanager
+def memory_profile(label: str) -> Iterator[None]:
+    """
+    Trace memory per stage while the block runs and log the result, e.g.
+    for an ingestion. Inside an already memory-profiled request the stages
+    are recorded there instead.
+    """
+    current = _current.get()
+    if current is not None and current.memory is not None:
+        yield
+        return
+    with memory.tracing(settings.MEMORY_TRACE_FRAMES):
+        baseline = memory.take_snapshot()
+        timings = RequestTimings(trace_memory=True)
+        token = _current.set(timings)
+        try:
+            yield
+        finally:
+            _current.reset(token)
+            profile = {"label": label, "finished_at": time.time(), **_memory_report(timings, baseline)}
+            _memory_profiles.append(profile)
+            logger.info(f"Memory profile of {label}: peak RSS {profile['peak_rss_bytes']} bytes, "
+                        f"stages {profile['stages']}")
+
+
+def recent_memory_profiles() -> List[Dict[str, Any]]:
+    return list(_memory_profiles)
+
+
+def _memory_report(timings: RequestTimings, baseline) -> Dict[str, Any]:
+    """Per-stage memory of a profiled block and the allocation sites that grew during it"""
+    return {
+        "stages": timings.memory.to_dict(),
+        "top_allocations": memory.top_allocations(settings.MEMORY_TOP_ALLOCATIONS, baseline=baseline),
+        "rss_bytes": memory.rss_bytes(),
+        "peak_rss_bytes": memory.peak_rss_bytes(),
+    }
+
+
+def is_admin(admin_token: Optional[str]) -> bool:
+    """Whether a request may use admin features: always with DEBUG, else with the configured X-Admin-Token"""
+    return settings.DEBUG or bool(settings.ADMIN_TOKEN and admin_token == settings.ADMIN_TOKEN)
+
+
+def _profile_mode(scope) -> Optional[str]:
+    """"cpu", "memory", "timing" or None, from the profile query parameter or the X-Profile header"""
+    mode = None
+    query = scope.get("query_string", b"")
+    if b"profile=" in query:
+        for pair in query.split(b"&"):
+            if pair.startswith(b"profile="):
+                mode = pair[len(b"profile="):]
+    headers = scope.get("headers", [])
+    admin_token = None
+    for key, value in headers:
+        if key == b"x-profile":
+            mode = value
+        elif key == b"x-admin-token":
+            admin_token = value.decode("latin-1")
+    if mode is None or mode in (b"", b"0", b"false"):
+        return None
+    if not is_admin(admin_token):
+        return None
+    if mode in (b"cpu", b"memory"):
+        return mode.decode()
+    return "timing"
+
+
+def _with_header(message: Dict[str, Any], name: bytes, value: str) -> Dict[str, Any]:
+    headers = [(k, v) for k, v in message.get("headers", []) if k != name]
+    return {**message, "headers": headers + [(name, value.encode("latin-1"))]}
+
+
+class RequestProfilingMiddleware:
+    """ASGI middleware adding Server-Timing (and optionally a CPU or memory profile) to profiled requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        mode = _profile_mode(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings(sample_stacks=mode == "cpu", trace_memory=mode == "memory")
+        token = _current.set(timings)
+        try:
+            if mode == "timing":
+                await self._run_timed(scope, receive, send, timings)
+            elif mode == "cpu":
+                await self._run_buffered(scope, receive, send, timings)
+            else:
+                with memory.tracing(settings.MEMORY_TRACE_FRAMES):
+                    baseline = memory.take_snapshot()
+                    await self._run_buffered(scope, receive, send, timings, baseline)
+        finally:
+            _current.reset(token)
+
+    async def _run_timed(self, scope, receive, send, timings: RequestTimings) -> None:
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                message = _with_header(message, b"server-timing", timings.server_timing())
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+
+    async def _run_buffered(self, scope, receive, send, timings: RequestTimings, baseline=None) -> None:
+        """Buffer the response (streams included) so the profile can be added to a JSON body"""
+        sampler = None
+        if timings.sample_stacks:
+            sampler = StackSampler(timings, settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+            sampler.start()
+        start_message: Dict[str, Any] = {}
+        body: List[bytes] = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start_message.update(message)
+            elif message["type"] == "http.response.body":
+                body.append(message.get("body", b""))
+
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            profile = sampler.stop() if sampler is not None else _memory_report(timings, baseline)
+
+        content = b"".join(body)
+        content_type = dict(start_message.get("headers", [])).get(b"content-type", b"")
+        if content_type.startswith(b"application/json"):
+            payload = json.loads(content or b"null")
+            if isinstance(payload, dict):
+                payload["profile"] = profile
+                content = json.dumps(payload).encode("utf-8")
+        message = _with_header(start_message, b"server-timing", timings.server_timing())
+        message = _with_header(message, b"content-length", str(len(content)))
+        await send(message)
+        await send({"type": "http.response.body", "body": content})
+
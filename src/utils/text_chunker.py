@@ -0,0 +1,132 @@
+import re
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Tuple
+
+# Sentence ends: terminal punctuation followed by whitespace, or a blank line
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+# Approximates BPE tokens: words and individual punctuation marks
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+WORD_PATTERN = re.compile(r"\S+")
+WHITESPACE = re.compile(r"\s+")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count: words plus punctuation marks"""
+    return len(TOKEN_PATTERN.findall(text))
+
+
+class Chunk:
+    """A chunk of a document with the page it starts on and its character span in the document"""
+
+    __slots__ = ("text", "page", "start", "end")
+
+    def __init__(self, text: str, page: int, start: int, end: int):
+        self.text = text
+        self.page = page
+        self.start = start
+        self.end = end
+
+    def to_metadata(self) -> Dict[str, int]:
+        return {"page": self.page, "start": self.start, "end": self.end}
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Chunk) and (self.text, self.page, self.start, self.end) == \
+            (other.text, other.page, other.start, other.end)
+
+    def __repr__(self) -> str:
+        return f"Chunk(page={self.page}, start={self.start}, end={self.end}, text={self.text[:30]!r})"
+
+
+class TextChunker:
+    """
+    Single-pass, sentence-aware chunker.
+
+    Sentences are packed into chunks of at most `chunk_size` tokens; each
+    chunk starts with the trailing sentences of the previous one, up to
+    `chunk_overlap` tokens. Sentences longer than a chunk are split at word
+    boundaries. Pages are consumed one at a time, so only the sentences of
+    the chunk being built are held in memory. The chunker has no per-call
+    state and can be reused.
+
+    Offsets are character positions in the document formed by joining the
+    pages with "\\n".
+    """
+
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50,
+                 token_counter: Callable[[str], int] = count_tokens):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("chunk_overlap must be at least 0 and smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.token_counter = token_counter
+
+    def _units(self, page_text: str, page: int, offset: int) -> Iterator[Tuple[str, int, int, int, int]]:
+        """(text, tokens, page, start, end) of each sentence, or of each piece of an oversized sentence"""
+        position = 0
+        for boundary in SENTENCE_BOUNDARY.finditer(page_text + "\n\n"):
+            start, end = position, boundary.start()
+            position = boundary.end()
+            sentence = page_text[start:end]
+            if not sentence.strip():
+                continue
+            tokens = self.token_counter(sentence)
+            if tokens <= self.chunk_size:
+                yield WHITESPACE.sub(" ", sentence).strip(), tokens, page, offset + start, offset + end
+                continue
+
+            # Split an oversized sentence into pieces of whole words
+            piece_start, piece_end, piece_tokens, words = None, None, 0, []
+            for word in WORD_PATTERN.finditer(sentence):
+                word_tokens = self.token_counter(word.group())
+                if words and piece_tokens + word_tokens > self.chunk_size:
+                    yield " ".join(words), piece_tokens, page, offset + start + piece_start, offset + start + piece_end
+                    piece_start, piece_tokens, words = None, 0, []
+                if piece_start is None:
+                    piece_start = word.start()
+                piece_end = word.end()
+                piece_tokens += word_tokens
+                words.append(word.group())
+            if words:
+                yield " ".join(words), piece_tokens, page, offset + start + piece_start, offset + start + piece_end
+
+    def chunk_pages(self, pages: Iterable[str]) -> Iterator[Chunk]:
+        """
+        Chunk a document given as an iterable of page texts.
+
+        Args:
+            pages: Text of each page, in order; may be a generator
+
+        Returns:
+            Iterator over the chunks, produced as the pages are consumed
+        """
+        window: Deque[Tuple[str, int, int, int, int]] = deque()
+        window_tokens = 0
+        # Units added since the last chunk was emitted
+        new_units = 0
+        offset = 0
+
+        for page_number, page_text in enumerate(pages, start=1):
+            for unit in self._units(page_text or "", page_number, offset):
+                if window and window_tokens + unit[1] > self.chunk_size:
+                    yield self._make_chunk(window)
+                    new_units = 0
+                    # Carry the trailing sentences into the next chunk as overlap
+                    while window and (window_tokens > self.chunk_overlap or window_tokens + unit[1] > self.chunk_size):
+                        window_tokens -= window.popleft()[1]
+                window.append(unit)
+                window_tokens += unit[1]
+                new_units += 1
+            offset += len(page_text or "") + 1
+
+        if window and new_units:
+            yield self._make_chunk(window)
+
+    def chunk_text(self, text: str) -> List[Chunk]:
+        """Chunk a single text as one page"""
+        return list(self.chunk_pages([text]))
+
+    @staticmethod
+    def _make_chunk(window: Deque[Tuple[str, int, int, int, int]]) -> Chunk:
+        return Chunk(" ".join(unit[0] for unit in window), window[0][2], window[0][3], window[-1][4])
@@ -0,0 +1,82 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi import UploadFile
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+
+
+class StoredUpload:
+    """A file stored under its content hash"""
+
+    def __init__(self, path: Path, sha256: str, size: int, duplicate: bool):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        # True when identical content had been uploaded before
+        self.duplicate = duplicate
+
+
+def _write_chunk(buffer: BinaryIO, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+def _finish(buffer: BinaryIO, tmp_path: Path, final_path: Path) -> bool:
+    """Close the temporary file and move it into place; returns True if the content was already stored"""
+    buffer.flush()
+    os.fsync(buffer.fileno())
+    buffer.close()
+    if final_path.exists():
+        tmp_path.unlink()
+        return True
+    os.replace(tmp_path, final_path)
+    return False
+
+
+def _discard(buffer: BinaryIO, tmp_path: Path) -> None:
+    buffer.close()
+    tmp_path.unlink(missing_ok=True)
+
+
+async def save_upload(upload: UploadFile, directory: str, max_bytes: int, chunk_size: int = 1024 * 1024) -> StoredUpload:
+    """
+    Stream an upload to `<directory>/<sha256><suffix>`, hashing it as it is written.
+
+    Chunks are read from the upload asynchronously and written (and hashed)
+    in a worker thread, so the event loop never waits on the disk. Content
+    that is already stored is detected by its hash and not written twice.
+
+    Raises:
+        UploadTooLarge: If the upload is larger than max_bytes
+    """
+    target_directory = Path(directory)
+    await asyncio.to_thread(target_directory.mkdir, parents=True, exist_ok=True)
+    tmp_path = target_directory / f".incoming-{uuid.uuid4().hex}"
+    buffer = await asyncio.to_thread(open, tmp_path, "wb")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit")
+            await asyncio.to_thread(_write_chunk, buffer, digest, chunk)
+    except BaseException:
+        await asyncio.to_thread(_discard, buffer, tmp_path)
+        raise
+
+    sha256 = digest.hexdigest()
+    suffix = Path(upload.filename or "").suffix.lower()
+    final_path = target_directory / f"{sha256}{suffix}"
+    duplicate = await asyncio.to_thread(_finish, buffer, tmp_path, final_path)
+    return StoredUpload(final_path, sha256, size, duplicate)
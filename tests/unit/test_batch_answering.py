@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+from src.core.batch_answering import answer_batch, dedupe_documents
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+class TestBatchAnswering:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.rag = Mock()
+        self.rag.retrieve_batch.side_effect = lambda queries: [[(f"Doc for {q}", 0.9), (f"Doc for {q}", 0.9)] for q in queries]
+        self.rag.generate_answer.side_effect = lambda query, **kwargs: {
+            "answer": f"Answer to {query}",
+            "confidence": 0.9,
+            "sources": []
+        }
+
+    def test_dedupe_documents(self):
+        """Test that repeated documents are kept once"""
+        assert dedupe_documents([("a", 0.9), ("b", 0.8), ("a", 0.7)]) == [("a", 0.9), ("b", 0.8)]
+
+    def test_answers_every_question(self):
+        """Test that each question gets its result with its index"""
+        results = asyncio.run(collect(answer_batch(self.rag, ["Q1", "Q2", "Q1"])))
+
+        assert sorted(item["index"] for item in results) == [0, 1, 2]
+        for item in results:
+            assert item["answer"] == f"Answer to {item['query']}"
+        # One batched retrieval, and the repeated question is generated once
+        self.rag.retrieve_batch.assert_called_once_with(["Q1", "Q2"])
+        assert self.rag.generate_answer.call_count == 2
+        docs = self.rag.generate_answer.call_args_list[0][1]["relevant_docs"]
+        assert len(docs) == 1
+
+    def test_item_errors_do_not_fail_batch(self):
+        """Test that a failing question yields an error item"""
+        def generate(query, **kwargs):
+            if query == "bad":
+                raise Exception("generation failed")
+            return {"answer": "ok", "confidence": 0.5, "sources": []}
+
+        self.rag.generate_answer.side_effect = generate
+
+        results = asyncio.run(collect(answer_batch(self.rag, ["good", "bad"])))
+        by_index = {item["index"]: item for item in results}
+
+        assert by_index[0]["answer"] == "ok"
+        assert by_index[1]["error"] == "generation failed"
+
+    def test_falls_back_to_per_question_retrieval(self):
+        """Test that a failed batch retrieval is retried per question"""
+        self.rag.retrieve_batch.side_effect = Exception("embed endpoint down")
+        self.rag.retrieve_relevant_documents.return_value = [("Doc", 0.8)]
+
+        results = asyncio.run(collect(answer_batch(self.rag, ["Q1", "Q2"])))
+
+        assert len(results) == 2
+        assert self.rag.retrieve_relevant_documents.call_count == 2
+
+    def test_bounded_concurrency(self):
+        """Test that no more than `concurrency` generations run at once"""
+        lock = threading.Lock()
+        running = {"now": 0, "max": 0}
+
+        def generate(query, **kwargs):
+            with lock:
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+            time.sleep(0.02)
+            with lock:
+                running["now"] -= 1
+            return {"answer": "ok", "confidence": 0.5, "sources": []}
+
+        self.rag.generate_answer.side_effect = generate
+
+        results = asyncio.run(collect(answer_batch(self.rag, [f"Q{i}" for i in range(8)], concurrency=2)))
+
+        assert len(results) == 8
+        assert running["max"] == 2
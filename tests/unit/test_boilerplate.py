@@ -0,0 +1,81 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.utils.boilerplate import BoilerplateFilter, line_signature
+from src.utils.file_chunker import PDFChunker
+
+
+DIVISIONS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliett",
+             "kilo", "lima", "mike", "november", "oscar", "papa", "quebec", "romeo", "sierra", "tango"]
+
+
+def _body(number: int) -> str:
+    return f"Notes on the {DIVISIONS[number - 1]} division.\nIts outlook for {DIVISIONS[-number]} is stable."
+
+
+def _page(number: int, body: str) -> str:
+    return "\n".join([
+        "ACME Corp - Annual Report",
+        f"Printed {number} March 2024",
+        body,
+        "Confidential. Do not distribute without written permission.",
+        f"Page {number} of 20",
+    ])
+
+
+class TestBoilerplateFilter:
+
+    @pytest.mark.parametrize("first,second", [
+        ("Page 3 of 20", "Page 14 of 20"),
+        ("- 7 -", "- 8 -"),
+        ("Printed 2024-03-01", "Printed 2024-03-02"),
+        ("Updated March 3, 2024", "Updated April 11, 2024"),
+        ("  ACME   Corp ", "acme corp"),
+    ])
+    def test_fuzzy_signatures(self, first, second):
+        """Test that page numbers, dates, case and spacing do not separate repeated lines"""
+        assert line_signature(first)[0] == line_signature(second)[0]
+
+    def test_removes_repeated_lines(self):
+        """Test that headers, footers, page numbers and disclaimers are removed and reported"""
+        pages = [_page(i, _body(i)) for i in range(1, 11)]
+
+        cleaned, report = BoilerplateFilter().clean(pages)
+
+        assert cleaned[3] == _body(4)
+        assert report.lines_removed == 40
+        assert report.chars_removed == sum(map(len, pages)) - sum(map(len, cleaned))
+        assert report.to_dict()["removed_fraction"] > 0.5
+        assert {"line": "page # of #", "pages": 10} in report.to_dict()["repeated_lines"]
+
+    def test_keeps_table_rows_inside_the_page(self):
+        """Test that body lines differing only in their figures are kept"""
+        bodies = [_body(i).replace("\n", f"\nWidget {i} units\nGadget {2 * i} units\n") for i in range(1, 6)]
+        pages = [_page(i, body) for i, body in enumerate(bodies, start=1)]
+
+        cleaned, _ = BoilerplateFilter().clean(pages)
+
+        assert cleaned == bodies
+
+    def test_short_documents_unchanged(self):
+        """Test that documents with fewer pages than min_pages are left alone"""
+        pages = [_page(1, _body(1)), _page(2, _body(2))]
+
+        cleaned, report = BoilerplateFilter(min_pages=3).clean(pages)
+
+        assert cleaned == pages
+        assert report.chars_removed == 0
+
+    def test_pdf_chunker_removes_boilerplate(self):
+        """Test that boilerplate is removed before chunking, cutting the number of chunks"""
+        pages = [_page(i, _body(i)) for i in range(1, 21)]
+
+        with patch.object(PDFChunker, "iter_pages", side_effect=lambda path: iter(pages)):
+            raw = list(PDFChunker(chunk_size=20, chunk_overlap=0, remove_boilerplate=False).iter_chunks("a.pdf"))
+            chunker = PDFChunker(chunk_size=20, chunk_overlap=0)
+            cleaned = list(chunker.iter_chunks("a.pdf"))
+
+        assert len(cleaned) < len(raw) / 2
+        assert not any("Confidential" in chunk.text for chunk in cleaned)
+        assert chunker.boilerplate_report.lines_removed == 80
@@ -0,0 +1,36 @@
+import json
+import pytest
+from src.tools.calibrate_similarity import evaluate_threshold, load_labeled_queries, suggest_threshold
+
+
+class TestCalibrateSimilarity:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.scores = [0.9, 0.8, 0.55, 0.5, 0.3, 0.2]
+        self.labels = [True, True, True, False, False, False]
+
+    def test_evaluate_threshold(self):
+        """Test recall and skip rates at a threshold"""
+        result = evaluate_threshold(self.scores, self.labels, 0.52)
+
+        assert result["recall"] == 1.0
+        assert result["unanswerable_skipped"] == 1.0
+        assert result["skipped"] == 0.5
+
+    def test_suggest_threshold_keeps_recall(self):
+        """Test that the highest threshold meeting the recall target is suggested"""
+        assert suggest_threshold(self.scores, self.labels, min_recall=1.0)["threshold"] == 0.55
+        assert suggest_threshold(self.scores, self.labels, min_recall=0.6)["threshold"] == 0.8
+
+    def test_suggest_threshold_without_answerable(self):
+        """Test that no threshold is suggested without answerable queries"""
+        assert suggest_threshold([0.4], [False]) is None
+
+    def test_load_labeled_queries(self, tmp_path):
+        """Test reading the labeled query file"""
+        path = tmp_path / "queries.jsonl"
+        path.write_text(json.dumps({"query": "q1", "answerable": True}) + "\n\n" + json.dumps({"query": "q2"}) + "\n")
+
+        with pytest.raises(ValueError):
+            load_labeled_queries(str(path))
@@ -1,10 +1,15 @@
+import hashlib
+import json
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
 from fastapi.testclient import TestClient
 from fastapi import HTTPException
 import os
 
+from src.config import settings
 from src.api.chat_api import router, ChatRequest, ChatResponse
+from src.core.collection_catalog import CATALOG_COLLECTION
+from src.core.ingest_checkpoint import get_ingest_checkpoints
 
 
 class TestChatAPI:
@@ -48,7 +53,7 @@ class TestChatAPI:
         assert call_args[1]['base_url'] == os.getenv("OLLAMA_BASE_URL", "http://ollama:11434")
         
         # Verify process_query was called
-        mock_agent_instance.process_query.assert_called_once_with("What is the test question?")
+        mock_agent_instance.process_query.assert_called_once_with("What is the test question?", session_id=None)
     
     @patch('src.api.chat_api.RAGAgent')
     def test_ask_question_with_environment_variables(self, mock_rag_agent):
@@ -84,29 +89,107 @@ class TestChatAPI:
             assert call_args[1]['base_url'] == 'http://localhost:8080'
     
     @patch('src.api.chat_api.OllamaRAG')
-    def test_upload_file_success(self, mock_ollama_rag):
+    def test_upload_file_success(self, mock_ollama_rag, tmp_path):
         """Test successful file upload"""
         # Setup mock
         mock_rag_instance = Mock()
         mock_rag_instance.add_documents.return_value = {"status": "success"}
+        mock_rag_instance.chroma_client.has_documents.return_value = False
         mock_ollama_rag.return_value = mock_rag_instance
+        content = b"%PDF-1.4 test resume"
+        content_hash = hashlib.sha256(content).hexdigest()
         
         # Execute
-        response = self.client.get("/upload_file")
+        with patch.object(settings, 'UPLOAD_DIRECTORY', str(tmp_path)):
+            response = self.client.post("/upload_file", files={"file": ("Resume.pdf", content, "application/pdf")})
         
         # Assertions
         assert response.status_code == 200
         response_data = response.json()
         assert response_data["message"] == "PDF processed successfully"
         assert response_data["chroma response"] == {"status": "success"}
+        assert response_data["content_hash"] == content_hash
+        assert response_data["duplicate"] is False
         
         # Verify OllamaRAG was initialized correctly
         mock_ollama_rag.assert_called_once()
         call_args = mock_ollama_rag.call_args
         assert call_args[1]['base_url'] == os.getenv("OLLAMA_BASE_URL", "http://ollama:11434")
         
-        # Verify add_documents was called with correct file path
-        mock_rag_instance.add_documents.assert_called_once_with(file_path="/app/raw/Resume.pdf")
+        # Verify the file was stored under its content hash and added with it
+        file_path = tmp_path / f"{content_hash}.pdf"
+        assert file_path.read_bytes() == content
+        mock_rag_instance.add_documents.assert_called_once_with(
+            file_path=str(file_path),
+            document_metadata={"content_hash": content_hash, "filename": "Resume.pdf"}
+        )
+    
+    @patch('src.api.chat_api.OllamaRAG')
+    def test_upload_file_duplicate(self, mock_ollama_rag, tmp_path):
+        """Test that content already in the collection is not parsed again"""
+        mock_rag_instance = Mock()
+        mock_rag_instance.chroma_client.has_documents.return_value = True
+        mock_ollama_rag.return_value = mock_rag_instance
+        
+        # Execute
+        with patch.object(settings, 'UPLOAD_DIRECTORY', str(tmp_path)):
+            response = self.client.post("/upload_file", files={"file": ("Copy.pdf", b"same bytes", "application/pdf")})
+        
+        # Assertions
+        assert response.status_code == 200
+        assert response.json()["duplicate"] is True
+        mock_rag_instance.add_documents.assert_not_called()
+    
+    @patch('src.api.chat_api.OllamaRAG')
+    def test_upload_file_resumes_partial_ingestion(self, mock_ollama_rag, tmp_path):
+        """Test that a file whose ingestion did not finish is added again instead of reported as duplicate"""
+        mock_rag_instance = Mock()
+        mock_rag_instance.add_documents.return_value = None
+        mock_rag_instance.chroma_client.has_documents.return_value = True
+        mock_ollama_rag.return_value = mock_rag_instance
+        content_hash = hashlib.sha256(b"half done").hexdigest()
+        
+        with patch.object(settings, 'UPLOAD_DIRECTORY', str(tmp_path / "raw")), \
+             patch.object(settings, 'INGEST_CHECKPOINT_DIRECTORY', str(tmp_path / "checkpoints")):
+            get_ingest_checkpoints().save({"collection": settings.DEFAULT_COLLECTION, "content_hash": content_hash,
+                                           "committed": 64, "in_flight": 64})
+            response = self.client.post("/upload_file", files={"file": ("Big.pdf", b"half done", "application/pdf")})
+        
+        assert response.status_code == 200
+        assert response.json()["duplicate"] is False
+        mock_rag_instance.add_documents.assert_called_once()
+    
+    def test_memory_gauges(self):
+        """Test that the worker's RSS gauges are reported"""
+        response = self.client.get("/memory")
+        
+        assert response.status_code == 200
+        assert response.json()["rss_bytes"] > 0
+    
+    def test_admin_memory_allocations(self):
+        """Test that allocation sites need the admin token and are traced for the requested window"""
+        with patch.object(settings, 'DEBUG', False), patch.object(settings, 'ADMIN_TOKEN', "secret"):
+            with pytest.raises(HTTPException) as exc_info:
+                self.client.get("/admin/memory")
+            response = self.client.get("/admin/memory?seconds=0.05&top=5", headers={"X-Admin-Token": "secret"})
+            untraced = self.client.get("/admin/memory", headers={"X-Admin-Token": "secret"})
+        
+        assert exc_info.value.status_code == 403
+        assert response.status_code == 200
+        assert isinstance(response.json()["top_allocations"], list)
+        assert untraced.json()["top_allocations"] is None
+    
+    @patch('src.api.chat_api.OllamaRAG')
+    def test_upload_file_too_large(self, mock_ollama_rag, tmp_path):
+        """Test that uploads over the size limit are rejected"""
+        with patch.object(settings, 'UPLOAD_DIRECTORY', str(tmp_path)), \
+             patch.object(settings, 'UPLOAD_MAX_BYTES', 10):
+            with pytest.raises(HTTPException) as exc_info:
+                self.client.post("/upload_file", files={"file": ("Big.pdf", b"x" * 100, "application/pdf")})
+        
+        assert exc_info.value.status_code == 413
+        assert list(tmp_path.iterdir()) == []
+        mock_ollama_rag.assert_not_called()
     
     @patch('src.api.chat_api.ChromaDBManager')
     def test_get_collection_count_success(self, mock_chromadb):
@@ -130,4 +213,156 @@ class TestChatAPI:
         # Verify get_collection_count was called
         mock_chromadb_instance.get_collection_count.assert_called_once()
     
-    
\ No newline at end of file
+    @patch('src.api.chat_api.ChromaDBManager')
+    def test_get_collection_count_for_tenant(self, mock_chromadb):
+        """Test that the tenant header and collection parameter select the collection"""
+        mock_chromadb.return_value.get_collection_count.return_value = 7
+        
+        # Execute
+        response = self.client.get("/collections/count?collection=contracts", headers={"X-Tenant-ID": "acme"})
+        
+        # Assertions
+        assert response.status_code == 200
+        assert response.json()["collection count"] == 7
+        mock_chromadb.assert_called_once_with(collection_name="acme__contracts")
+    
+    @pytest.mark.parametrize("query,headers", [
+        # Would resolve to a__b__c, the same collection as tenant "a__b" with collection "c"
+        ("?collection=b__c", {"X-Tenant-ID": "a"}),
+        ("?collection=c", {"X-Tenant-ID": "a__b"}),
+        # Another tenant's collection addressed without a tenant header
+        ("?collection=acme__contracts", {}),
+        ("?collection=contracts", {"X-Tenant-ID": "acme/.."}),
+        # The collection catalog kept on a Chroma server
+        ("?collection=pdf-chatbot-catalog", {}),
+    ])
+    @patch('src.api.chat_api.ChromaDBManager')
+    def test_cross_tenant_names_rejected(self, mock_chromadb, query, headers):
+        """Test that names which could reach another tenant's or a reserved collection are rejected"""
+        with pytest.raises(HTTPException) as exc_info:
+            self.client.get(f"/collections/count{query}", headers=headers)
+        
+        assert exc_info.value.status_code == 400
+        mock_chromadb.assert_not_called()
+    
+    @patch('src.api.chat_api.ChromaDBManager')
+    def test_catalog_collection_cannot_be_reset(self, mock_chromadb):
+        """Test that the collection catalog on a Chroma server cannot be reset through the API"""
+        with pytest.raises(HTTPException) as exc_info:
+            self.client.delete(f"/collections/reset?collection={CATALOG_COLLECTION}")
+        
+        assert exc_info.value.status_code == 400
+        mock_chromadb.assert_not_called()
+
+    @patch('src.api.chat_api.ChromaDBManager')
+    @patch('src.api.chat_api.get_ingestion_queue')
+    @patch('src.api.chat_api.single_writer_enabled', return_value=True)
+    def test_reset_collection_queued_off_event_loop(self, mock_single_writer, mock_queue, mock_chromadb):
+        """Test that a reset in single-writer mode is queued through a worker thread"""
+        mock_queue.return_value.enqueue.return_value = {"job_id": "job-1"}
+
+        with patch('src.api.chat_api.asyncio.to_thread', new_callable=AsyncMock) as mock_to_thread:
+            mock_to_thread.side_effect = lambda func, *args: func(*args)
+            response = self.client.delete("/collections/reset?collection=docs")
+
+        assert response.status_code == 202
+        assert response.json()["job_id"] == "job-1"
+        mock_to_thread.assert_awaited_once_with(
+            mock_queue.return_value.enqueue, "reset_collection", {"collection": "docs"}
+        )
+        mock_chromadb.assert_not_called()
+
+    @patch('src.api.chat_api.RAGAgent')
+    def test_ask_question_invalid_collection(self, mock_rag_agent):
+        """Test that invalid collection names are rejected before any work is done"""
+        with pytest.raises(HTTPException) as exc_info:
+            self.client.post("/ask?collection=a", json={"query": "Test query"})
+        
+        assert exc_info.value.status_code == 400
+        mock_rag_agent.assert_not_called()
+    
+    @patch('src.api.chat_api.RAGAgent')
+    def test_ask_question_unknown_session(self, mock_rag_agent):
+        """Test that an unknown session is rejected"""
+        with pytest.raises(HTTPException) as exc_info:
+            self.client.post("/ask", json={"query": "Test query", "session_id": "missing"})
+        
+        assert exc_info.value.status_code == 404
+        mock_rag_agent.assert_not_called()
+    
+    @patch('src.api.chat_api.RAGAgent')
+    def test_ask_question_in_session(self, mock_rag_agent):
+        """Test that a follow-up question is routed to its session"""
+        mock_agent_instance = Mock()
+        mock_agent_instance.process_query = AsyncMock(return_value={
+            "answer": "Follow-up answer",
+            "confidence": 0.7,
+            "sources": [],
+            "query": "And then?",
+            "session_id": None
+        })
+        mock_rag_agent.return_value = mock_agent_instance
+        session_id = self.client.post("/sessions").json()["session_id"]
+        mock_agent_instance.process_query.return_value["session_id"] = session_id
+        
+        # Execute
+        response = self.client.post("/ask", json={"query": "And then?", "session_id": session_id})
+        
+        # Assertions
+        assert response.status_code == 200
+        assert response.json()["session_id"] == session_id
+        mock_agent_instance.process_query.assert_called_once_with("And then?", session_id=session_id)
+    
+    @patch('src.api.chat_api.OllamaRAG')
+    def test_ask_batch_streams_results(self, mock_ollama_rag):
+        """Test that batch results are streamed as NDJSON lines"""
+        mock_rag_instance = Mock()
+        mock_rag_instance.retrieve_batch.return_value = [[("Doc", 0.8)], [("Doc", 0.8)]]
+        mock_rag_instance.generate_answer.side_effect = [
+            {"answer": "A1", "confidence": 0.8, "sources": []},
+            Exception("failed")
+        ]
+        mock_ollama_rag.return_value = mock_rag_instance
+        
+        # Execute
+        response = self.client.post("/ask_batch", json={"queries": ["Q1", "Q2"]})
+        
+        # Assertions
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        items = [json.loads(line) for line in response.text.splitlines()]
+        assert len(items) == 2
+        assert {item["index"] for item in items} == {0, 1}
+        assert sum("error" in item for item in items) == 1
+    
+    def test_ask_batch_empty(self):
+        """Test that an empty batch is rejected"""
+        with pytest.raises(HTTPException) as exc_info:
+            self.client.post("/ask_batch", json={"queries": []})
+        
+        assert exc_info.value.status_code == 400
+    
+    @patch('src.core.chromadb_manager.OllamaEmbedding')
+    def test_export_and_import_collection(self, mock_embedding, tmp_path):
+        """Test that an exported snapshot loads into another collection"""
+        from src.core.chromadb_manager import ChromaDBManager
+        from src.core.collection_registry import collection_registry
+        
+        with patch.object(settings, 'VECTOR_STORE_BACKEND', 'numpy'), \
+             patch.object(settings, 'VECTOR_STORE_DIRECTORY', str(tmp_path / "store")), \
+             patch.object(settings, 'SNAPSHOT_DIRECTORY', str(tmp_path / "snapshots")):
+            ChromaDBManager(collection_name="resume_collection").add_documents(
+                documents=["chunk"], embeddings=[[1.0, 0.0]], metadatas=[{"source": "doc_0"}], ids=["doc_0"]
+            )
+            
+            exported = self.client.get("/collections/export")
+            imported = self.client.post("/collections/import?collection=replica",
+                                        files={"file": ("snapshot", exported.content, "application/octet-stream")})
+            with pytest.raises(HTTPException) as exc_info:
+                self.client.post("/collections/import?collection=replica",
+                                 files={"file": ("snapshot", b"not a snapshot", "application/octet-stream")})
+            collection_registry.clear()
+        
+        assert exported.status_code == 200
+        assert imported.json()["imported"] == 1
+        assert exc_info.value.status_code == 400
@@ -0,0 +1,202 @@
+import asyncio
+import socket
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+from src.config import settings
+from src.core.chroma_client import clear_chroma_clients, get_async_chroma_client, get_chroma_client
+from src.core.collection_catalog import ServerCollectionCatalog
+from src.core.collection_registry import collection_registry
+from src.core.chromadb_manager import ChromaDBManager
+from src.core.retrieval_cache import retrieval_cache
+
+
+def _find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def chroma_server():
+    """Run an in-process Chroma server on a free port"""
+    uvicorn = pytest.importorskip("uvicorn")
+    chroma_fastapi = pytest.importorskip("chromadb.server.fastapi")
+    from chromadb.config import Settings
+
+    port = _find_free_port()
+    server_api = chroma_fastapi.FastAPI(Settings(is_persistent=False, allow_reset=True))
+    server = uvicorn.Server(uvicorn.Config(server_api.app(), host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    yield port
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+class TestChromaDBManager:
+
+    def teardown_method(self):
+        """Drop cached clients and handles so each test picks up its own backend settings"""
+        collection_registry.clear()
+        clear_chroma_clients()
+        retrieval_cache.clear()
+
+    def _exercise(self, manager: ChromaDBManager, scan: bool = True):
+        manager.add_documents(
+            documents=["first document", "second document"],
+            embeddings=[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]],
+            metadatas=[{"source": "a"}, {"source": "b"}],
+            ids=["doc_a", "doc_b"]
+        )
+        assert manager.get_collection_count() == 2
+        assert manager.has_documents({"source": "a"})
+        assert not manager.has_documents({"source": "z"})
+
+        results = manager.query_by_embedding([1.0, 0.0, 0.0], n_results=1)
+        assert results["ids"][0] == ["doc_a"]
+        assert results["documents"][0] == ["first document"]
+
+        manager.delete_documents(["doc_a"])
+        assert manager.get_collection_count() == 1
+        if scan:
+            batches = list(manager.store.iter_rows())
+            assert batches[0]["ids"] == ["doc_b"]
+            assert batches[0]["embeddings"].tolist() == [[0.0, 1.0, 0.0]]
+            assert batches[0]["metadatas"] == [{"source": "b"}]
+
+        manager.reset_collection()
+        assert manager.get_collection_count() == 0
+
+        stats = manager.get_stats()
+        assert stats["queries"] == 1
+        assert stats["documents_added"] == 2
+        assert stats["documents_deleted"] == 1
+        assert stats["open"] is True
+
+    @patch('src.core.chromadb_manager.OllamaEmbedding')
+    def test_embedded_mode(self, mock_embedding, tmp_path):
+        """Test the manager against a local persistent client"""
+        with patch.object(settings, "CHROMA_MODE", "embedded"):
+            manager = ChromaDBManager(collection_name="test_collection", persist_directory=str(tmp_path))
+            self._exercise(manager)
+
+    @patch('src.core.chromadb_manager.OllamaEmbedding')
+    def test_http_mode(self, mock_embedding, chroma_server, tmp_path):
+        """Test the same manager API against a Chroma server"""
+        with patch.object(settings, "CHROMA_MODE", "http"), \
+             patch.object(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path)), \
+             patch.object(settings, "CHROMA_HOST", "127.0.0.1"), \
+             patch.object(settings, "CHROMA_PORT", chroma_server):
+            manager = ChromaDBManager(collection_name="test_collection")
+            # The in-process Python server cannot serialize embeddings in get() responses
+            self._exercise(manager, scan=False)
+            # The catalog lives on the server, not in a per-host file
+            assert manager.catalog.location == f"http://127.0.0.1:{chroma_server}"
+            assert manager.catalog.version("test_collection") > 0
+            assert not (tmp_path / "collection_catalog.json").exists()
+
+    @patch('src.core.chromadb_manager.OllamaEmbedding')
+    def test_http_cache_sees_writes_of_other_replicas(self, mock_embedding, chroma_server):
+        """Test that a version bumped by a replica on another host invalidates cached results at once"""
+        with patch.object(settings, "CHROMA_MODE", "http"), \
+             patch.object(settings, "CHROMA_HOST", "127.0.0.1"), \
+             patch.object(settings, "CHROMA_PORT", chroma_server):
+            manager = ChromaDBManager(collection_name="replicated_collection")
+            manager.add_documents(documents=["near"], embeddings=[[0.9, 0.1, 0.0]], ids=["doc_near"])
+            assert manager.query_by_embedding([1.0, 0.0, 0.0], n_results=1)["ids"][0] == ["doc_near"]
+
+            client = get_chroma_client("http")
+            client.get_collection(manager.physical_name).add(
+                ids=["doc_exact"], embeddings=[[1.0, 0.0, 0.0]], documents=["exact"], metadatas=[{"source": "b"}]
+            )
+            ServerCollectionCatalog(lambda: client, "other-replica").bump_version(manager.physical_name)
+
+            # Seen at once, not only after CATALOG_REFRESH_SECONDS
+            with patch.object(manager.catalog, "refresh_seconds", 3600):
+                assert manager.query_by_embedding([1.0, 0.0, 0.0], n_results=1)["ids"][0] == ["doc_exact"]
+
+    @patch('src.core.chromadb_manager.OllamaEmbedding')
+    def test_http_async_query_reuses_collection_handle(self, mock_embedding, chroma_server):
+        """Test that async queries open the collection once, and again only after a reset"""
+        with patch.object(settings, "CHROMA_MODE", "http"), \
+             patch.object(settings, "CHROMA_HOST", "127.0.0.1"), \
+             patch.object(settings, "CHROMA_PORT", chroma_server), \
+             patch.object(retrieval_cache, "max_bytes", 0):
+            manager = ChromaDBManager(collection_name="async_collection")
+            manager.add_documents(documents=["first"], embeddings=[[1.0, 0.0, 0.0]], ids=["doc_a"])
+
+            async def run():
+                client = await get_async_chroma_client()
+                with patch.object(client, "get_collection", wraps=client.get_collection) as get_collection:
+                    first = await manager.aquery_by_embedding([1.0, 0.0, 0.0], n_results=1)
+                    await manager.aquery_by_embedding([0.0, 1.0, 0.0], n_results=1)
+                    assert get_collection.call_count == 1
+                    manager.reset_collection()
+                    manager.add_documents(documents=["second"], embeddings=[[1.0, 0.0, 0.0]], ids=["doc_b"])
+                    second = await manager.aquery_by_embedding([1.0, 0.0, 0.0], n_results=1)
+                    assert get_collection.call_count == 2
+                return first, second
+
+            first, second = asyncio.run(run())
+
+            assert first["ids"] == [["doc_a"]]
+            assert second["ids"] == [["doc_b"]]
+
+    @patch('src.core.chromadb_manager.OllamaEmbedding')
+    def test_numpy_backend(self, mock_embedding, tmp_path):
+        """Test the same manager API against the memory-mapped NumPy store"""
+        with patch.object(settings, "VECTOR_STORE_BACKEND", "numpy"), \
+             patch.object(settings, "VECTOR_STORE_DIRECTORY", str(tmp_path)):
+            manager = ChromaDBManager(collection_name="test_collection")
+            self._exercise(manager)
+
+    @patch('src.core.chromadb_manager.OllamaEmbedding')
+    def test_index_params_survive_reset(self, mock_embedding, tmp_path):
+        """Test that a reset rebuilds the collection with its HNSW parameters"""
+        with patch.object(settings, "CHROMA_MODE", "embedded"), \
+             patch.object(settings, "HNSW_M", 32), \
+             patch.object(settings, "HNSW_SEARCH_EF", 40):
+            manager = ChromaDBManager(collection_name="test_collection", persist_directory=str(tmp_path))
+            expected = {"space": "cosine", "M": 32, "construction_ef": 100, "search_ef": 40}
+            assert manager.store.index_params() == expected
+
+            manager.reset_collection()
+
+            assert manager.store.index_params() == expected
+            assert manager.get_stats()["index"] == expected
+
+    @patch('src.core.chromadb_manager.OllamaEmbedding')
+    def test_set_index_params(self, mock_embedding, tmp_path):
+        """Test that search_ef applies at once and build parameters on the next rebuild"""
+        with patch.object(settings, "CHROMA_MODE", "embedded"):
+            manager = ChromaDBManager(collection_name="test_collection", persist_directory=str(tmp_path))
+
+            rebuild = manager.set_index_params({"M": 8, "search_ef": 25})
+
+            assert rebuild == ["M"]
+            assert manager.store.index_params()["search_ef"] == 25
+            assert manager.store.index_params()["M"] == 16
+
+            manager.reset_collection()
+            assert manager.store.index_params()["M"] == 8
+
+            collection_registry.clear()
+            reopened = ChromaDBManager(collection_name="test_collection", persist_directory=str(tmp_path))
+            assert reopened.index_params["M"] == 8
+            with pytest.raises(ValueError):
+                reopened.set_index_params({"ef": 10})
+
+    def test_client_is_shared(self, tmp_path):
+        """Test that managers share one client per backend configuration"""
+        with patch.object(settings, "CHROMA_MODE", "embedded"):
+            assert get_chroma_client(persist_directory=str(tmp_path)) is get_chroma_client(persist_directory=str(tmp_path))
+
+    def test_unknown_mode(self):
+        """Test that an unknown backend is rejected"""
+        with pytest.raises(ValueError):
+            get_chroma_client(mode="cloud")
@@ -0,0 +1,108 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.core.collection_catalog import CollectionCatalog, ServerCollectionCatalog, physical_collection_name
+from src.core.projection import Projection
+
+
+class TestCollectionCatalog:
+
+    def test_aliases_and_tags(self, tmp_path):
+        """Test resolving aliases and reading tags, including changes made through another handle"""
+        catalog = CollectionCatalog(str(tmp_path))
+        other_process = CollectionCatalog(str(tmp_path))
+
+        assert catalog.resolve("docs") == "docs"
+        assert catalog.tag("docs") is None
+
+        other_process.set_tag("docs__nomic-embed-text", "nomic-embed-text", 768)
+        other_process.set_alias("docs", "docs__nomic-embed-text")
+
+        assert catalog.resolve("docs") == "docs__nomic-embed-text"
+        assert catalog.tag("docs__nomic-embed-text") == {"embedding_model": "nomic-embed-text", "dim": 768}
+
+        catalog.set_alias("docs", "docs")
+        catalog.clear_tag("docs__nomic-embed-text")
+
+        assert other_process.resolve("docs") == "docs"
+        assert other_process.tag("docs__nomic-embed-text") is None
+
+    def test_versions_survive_reset(self, tmp_path):
+        """Test that write versions are seen by other handles and kept when a tag is cleared"""
+        catalog = CollectionCatalog(str(tmp_path))
+        other_process = CollectionCatalog(str(tmp_path))
+        assert other_process.version("docs") == 0
+
+        catalog.set_tag("docs", "nomic-embed-text", 768)
+        catalog.bump_version("docs")
+        catalog.bump_version("docs")
+        catalog.clear_tag("docs")
+
+        assert other_process.version("docs") == 2
+        assert other_process.version("other") == 0
+
+    def test_physical_collection_name(self):
+        """Test that model names become valid collection name suffixes"""
+        assert physical_collection_name("docs", "nomic-embed-text:latest") == "docs__nomic-embed-text-latest"
+
+
+class TestServerCollectionCatalog:
+
+    def setup_method(self):
+        """Two replicas sharing one in-memory Chroma server"""
+        chromadb = pytest.importorskip("chromadb")
+        from chromadb.config import Settings
+
+        self.client = chromadb.EphemeralClient(Settings(allow_reset=True, anonymized_telemetry=False))
+        self.client.reset()
+        self.replica = ServerCollectionCatalog(lambda: self.client, "http://chroma:8000", refresh_seconds=0)
+        self.other_replica = ServerCollectionCatalog(lambda: self.client, "http://chroma:8000", refresh_seconds=0)
+
+    def test_aliases_tags_and_projections_are_shared(self):
+        """Test that a migration's alias, tag and projection are seen by every replica"""
+        projection = Projection.random(32, 8, seed=1)
+
+        self.replica.set_projection("docs__nomic-embed-text", "nomic-embed-text", projection)
+        self.replica.set_alias("docs", "docs__nomic-embed-text")
+        self.replica.set_index_params("docs__nomic-embed-text", {"M": 32})
+
+        assert self.other_replica.resolve("docs") == "docs__nomic-embed-text"
+        assert self.other_replica.tag("docs__nomic-embed-text")["dim"] == 32
+        assert self.other_replica.load_projection("docs__nomic-embed-text").id == projection.id
+        assert self.other_replica.index_params("docs__nomic-embed-text") == {"M": 32}
+
+        self.other_replica.set_alias("docs", "docs")
+        self.other_replica.clear_tag("docs__nomic-embed-text")
+
+        assert self.replica.resolve("docs") == "docs"
+        assert self.replica.tag("docs__nomic-embed-text") is None
+        # Changing one entry leaves the others alone
+        assert self.replica.index_params("docs__nomic-embed-text") == {"M": 32}
+
+    def test_versions_are_unique_across_replicas(self):
+        """Test that bumps from replicas holding the same version still produce new versions"""
+        self.replica.bump_version("docs")
+        seen = self.replica.version("docs")
+
+        stale = patch.object(ServerCollectionCatalog, "_fetch", lambda catalog: {"versions": {"docs": seen}})
+        with stale:
+            self.replica.bump_version("docs")
+        first = self.replica.version("docs")
+        with stale:
+            self.other_replica.bump_version("docs")
+        second = self.replica.version("docs")
+
+        assert len({seen, first, second}) == 3
+        assert second > seen
+
+    def test_changes_seen_after_refresh_interval(self):
+        """Test that other replicas are read at most every refresh_seconds"""
+        cached = ServerCollectionCatalog(lambda: self.client, "http://chroma:8000", refresh_seconds=5)
+
+        with patch("src.core.collection_catalog.time.monotonic", return_value=100.0):
+            assert cached.resolve("docs") == "docs"
+        self.replica.set_alias("docs", "docs__nomic-embed-text")
+        with patch("src.core.collection_catalog.time.monotonic", side_effect=[101.0, 106.0]):
+            assert cached.resolve("docs") == "docs"
+            assert cached.resolve("docs") == "docs__nomic-embed-text"
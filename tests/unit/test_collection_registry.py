@@ -0,0 +1,66 @@
+import pytest
+from unittest.mock import Mock, patch
+from src.core.collection_registry import CollectionRegistry
+
+
+class TestCollectionRegistry:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.registry = CollectionRegistry(max_open=2, idle_seconds=60)
+
+    @patch('src.core.collection_registry.create_vector_store')
+    def test_handles_are_cached(self, mock_create_store):
+        """Test that a collection is opened once and then reused"""
+        mock_create_store.side_effect = lambda name, persist_directory=None, index_params=None: Mock(name=name)
+
+        first = self.registry.get_store("tenant_a")
+        second = self.registry.get_store("tenant_a")
+
+        assert first is second
+        mock_create_store.assert_called_once_with("tenant_a", persist_directory=None, index_params=None)
+        assert self.registry.stats("tenant_a")["times_opened"] == 1
+
+    @patch('src.core.collection_registry.create_vector_store')
+    def test_lru_eviction(self, mock_create_store):
+        """Test that the least recently used handle is closed when the cache is full"""
+        mock_create_store.side_effect = lambda name, persist_directory=None, index_params=None: Mock(name=name)
+
+        store_a = self.registry.get_store("tenant_a")
+        self.registry.get_store("tenant_b")
+        self.registry.get_store("tenant_a")
+        self.registry.get_store("tenant_c")
+
+        assert set(self.registry.open_collections()) == {"tenant_a", "tenant_c"}
+        store_a.close.assert_not_called()
+        assert self.registry.is_open("tenant_b") is False
+
+    @patch('src.core.collection_registry.time.time')
+    @patch('src.core.collection_registry.create_vector_store')
+    def test_idle_eviction(self, mock_create_store, mock_time):
+        """Test that idle handles are closed"""
+        mock_create_store.side_effect = lambda name, persist_directory=None, index_params=None: Mock(name=name)
+        mock_time.return_value = 1000.0
+        store = self.registry.get_store("tenant_a")
+
+        mock_time.return_value = 1061.0
+        self.registry.evict_idle()
+
+        store.close.assert_called_once()
+        assert self.registry.open_collections() == []
+
+    def test_stats(self):
+        """Test the per-collection counters"""
+        self.registry.record_query("tenant_a", 0.010)
+        self.registry.record_query("tenant_a", 0.030)
+        self.registry.record_add("tenant_a", 5)
+        self.registry.record_delete("tenant_a", 2)
+
+        stats = self.registry.stats("tenant_a")
+
+        assert stats["queries"] == 2
+        assert stats["avg_query_ms"] == pytest.approx(20.0)
+        assert stats["documents_added"] == 5
+        assert stats["documents_deleted"] == 2
+        assert stats["open"] is False
+        assert self.registry.stats("tenant_b")["queries"] == 0
@@ -0,0 +1,123 @@
+import os
+import pytest
+import numpy as np
+from unittest.mock import patch
+
+from src.config import settings
+from src.core.collection_registry import collection_registry
+from src.core.chromadb_manager import ChromaDBManager
+from src.core.embedding_migration import EmbeddingMigration
+from src.core.snapshot import export_snapshot, import_snapshot
+
+
+@patch('src.core.chromadb_manager.OllamaEmbedding')
+class TestEmbeddingMigration:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.env = patch.dict(os.environ, {"MODEL_NAME": "mistral", "EMBEDDING_MODEL_NAME": ""})
+        self.env.start()
+
+    def teardown_method(self):
+        self.env.stop()
+        collection_registry.clear()
+
+    def _settings(self, tmp_path):
+        return patch.multiple(settings, VECTOR_STORE_BACKEND="numpy", VECTOR_STORE_DIRECTORY=str(tmp_path))
+
+    def _source(self):
+        source = ChromaDBManager(collection_name="docs")
+        source.add_documents(documents=["first", "second"],
+                             embeddings=[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]],
+                             metadatas=[{"source": "doc_0"}, {"source": "doc_1"}],
+                             ids=["a", "b"])
+        return source
+
+    def test_migration_switches_collection(self, mock_embedding, tmp_path):
+        """Test that queries move to the re-embedded collection once the migration finishes"""
+        with self._settings(tmp_path), \
+             patch('src.core.embedding_migration.OllamaEmbedding') as mock_target_embedding:
+            source = self._source()
+            calls = []
+
+            def embed_batch(texts):
+                if not calls:
+                    # A document uploaded while the migration runs
+                    source.add_documents(documents=["third"], embeddings=[[0.0, 0.0, 1.0]],
+                                         metadatas=[{"source": "doc_2"}], ids=["c"])
+                calls.append(texts)
+                return [[1.0, 0.0] if text == "first" else [0.0, 1.0] for text in texts]
+
+            mock_target_embedding.return_value.embed_batch.side_effect = embed_batch
+            migration = EmbeddingMigration("docs", "nomic-embed-text", batch_size=1, pause_seconds=0)
+
+            result = migration.run()
+            current = ChromaDBManager(collection_name="docs")
+
+            assert result["status"] == "done"
+            assert result["rows_copied"] == 3
+            assert current.physical_name == "docs__nomic-embed-text"
+            assert current.model_name == "nomic-embed-text"
+            assert sorted(current.store.get_ids()) == ["a", "b", "c"]
+            assert current.query_by_embedding([1.0, 0.0], n_results=1)["ids"] == [["a"]]
+            # The previous collection is kept, still tagged with its model
+            assert ChromaDBManager(collection_name="docs").catalog.tag("docs")["dim"] == 3
+
+    def test_migration_to_current_model_is_rejected(self, mock_embedding, tmp_path):
+        """Test that migrating to the model a collection already uses fails"""
+        with self._settings(tmp_path):
+            self._source()
+            migration = EmbeddingMigration("docs", "mistral", pause_seconds=0)
+
+            with pytest.raises(ValueError):
+                migration.run()
+            assert migration.status == "failed"
+
+    def test_vectors_of_another_size_are_rejected(self, mock_embedding, tmp_path):
+        """Test that a collection only accepts vectors of the model and dimension it is tagged with"""
+        with self._settings(tmp_path):
+            source = self._source()
+
+            with pytest.raises(ValueError):
+                source.add_documents(documents=["other"], embeddings=[[1.0, 0.0]], ids=["x"])
+
+    def test_untagged_collection_keeps_chat_model(self, mock_embedding, tmp_path):
+        """Test that collections built before tagging are still queried with MODEL_NAME"""
+        with self._settings(tmp_path):
+            self._source().catalog.clear_tag("docs")
+
+            with patch.dict(os.environ, {"EMBEDDING_MODEL_NAME": "nomic-embed-text"}):
+                assert ChromaDBManager(collection_name="docs").model_name == "mistral"
+                assert ChromaDBManager(collection_name="new_docs").model_name == "nomic-embed-text"
+
+    def test_reduction_projects_stored_and_query_vectors(self, mock_embedding, tmp_path):
+        """Test that a reduced collection stores fewer dimensions and still answers full-size queries"""
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((20, 8)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        with self._settings(tmp_path), \
+             patch('src.core.embedding_migration.OllamaEmbedding') as mock_target_embedding:
+            ChromaDBManager(collection_name="docs").add_documents(
+                documents=[f"chunk {i}" for i in range(20)], embeddings=vectors.tolist(),
+                metadatas=[{"source": f"doc_{i}"} for i in range(20)], ids=[f"id{i}" for i in range(20)]
+            )
+            migration = EmbeddingMigration("docs", "mistral", pause_seconds=0, reduce_method="pca", reduce_dim=4)
+
+            result = migration.run()
+            current = ChromaDBManager(collection_name="docs")
+
+            assert result["status"] == "done"
+            assert current.physical_name == "docs__mistral-pca4"
+            assert current.projection.dim == 4
+            assert current.store.meta["dim"] == 4
+            assert current.query_by_embedding(vectors[3].tolist(), n_results=1)["ids"] == [["id3"]]
+            # Stored full-size vectors are reused instead of re-embedding the chunks
+            mock_target_embedding.return_value.embed_batch.assert_not_called()
+
+            snapshot = str(tmp_path / "docs.snapshot")
+            export_snapshot(current, snapshot)
+            replica = ChromaDBManager(collection_name="replica")
+            import_snapshot(replica, snapshot)
+
+            assert replica.projection.id == current.projection.id
+            assert replica.query_by_embedding(vectors[5].tolist(), n_results=1)["ids"] == [["id5"]]
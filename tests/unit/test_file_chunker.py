@@ -0,0 +1,49 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.utils.file_chunker import PDFChunker
+
+
+def _pdf_reader(pages):
+    """PdfReader replacement whose pages return the given texts, raising for exceptions"""
+    def extract(text):
+        if isinstance(text, Exception):
+            raise text
+        return text
+    reader = Mock()
+    reader.pages = [Mock(extract_text=Mock(side_effect=lambda text=text: extract(text))) for text in pages]
+    return Mock(return_value=reader)
+
+
+class TestPDFChunker:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.chunker = PDFChunker(chunk_size=8, chunk_overlap=0, remove_boilerplate=False)
+
+    def test_read_error_is_raised(self, tmp_path, caplog):
+        """Test that a PDF failing part way raises instead of ending the page stream early"""
+        pdf_path = tmp_path / "broken.pdf"
+        pdf_path.write_bytes(b"%PDF")
+
+        with patch("pypdf.PdfReader", _pdf_reader(["First page.", ValueError("bad xref")])):
+            pages = self.chunker.iter_pages(str(pdf_path))
+            assert next(pages) == "First page."
+            with pytest.raises(ValueError):
+                next(pages)
+
+        assert "broken.pdf" in caplog.text
+
+    def test_spans_point_into_extracted_text(self, tmp_path):
+        """Test that chunk spans are positions in the text extract_text_from_pdf returns"""
+        pdf_path = tmp_path / "doc.pdf"
+        pdf_path.write_bytes(b"%PDF")
+
+        with patch("pypdf.PdfReader", _pdf_reader(["Alpha one. Beta two.", "Gamma three.", "Delta four."])):
+            text = self.chunker.extract_text_from_pdf(str(pdf_path))
+            chunks = list(self.chunker.iter_chunks(str(pdf_path)))
+
+        assert [chunk.page for chunk in chunks] == [1, 2]
+        for chunk in chunks:
+            assert " ".join(text[chunk.start:chunk.end].split()) == chunk.text
@@ -0,0 +1,106 @@
+import pytest
+from unittest.mock import Mock, patch
+from src.config import settings
+from src.core.index_writer import IndexWriter, IngestionQueue, WriterLock, can_write, check_writer_mode
+
+
+class TestWriterLock:
+
+    def test_only_one_holder(self, tmp_path):
+        """Test that a second holder cannot take the lock until it is released"""
+        first = WriterLock(str(tmp_path / "writer.lock"))
+        second = WriterLock(str(tmp_path / "writer.lock"))
+
+        assert first.acquire() is True
+        assert second.acquire() is False
+
+        first.release()
+
+        assert second.acquire() is True
+        second.release()
+
+
+class TestIngestionQueue:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.handler = Mock(return_value={"count": 1})
+
+    def test_jobs_run_in_order(self, tmp_path):
+        """Test that pending jobs are claimed oldest first and their outcome recorded"""
+        queue = IngestionQueue(str(tmp_path))
+        first = queue.enqueue("add_document", {"n": 1})
+        second = queue.enqueue("add_document", {"n": 2})
+
+        assert queue.claim_next()["job_id"] == first["job_id"]
+        assert queue.get(first["job_id"])["status"] == "running"
+        assert queue.claim_next()["job_id"] == second["job_id"]
+        assert queue.claim_next() is None
+
+    def test_get_unknown_job(self, tmp_path):
+        """Test that unknown or malformed job IDs are not found"""
+        queue = IngestionQueue(str(tmp_path))
+
+        assert queue.get("00000000000000000001-deadbeef") is None
+        assert queue.get("../pending") is None
+
+    def test_requeue_interrupted_jobs(self, tmp_path):
+        """Test that jobs left running by a dead writer are retried"""
+        queue = IngestionQueue(str(tmp_path))
+        job = queue.enqueue("add_document", {})
+        queue.claim_next()
+
+        assert queue.requeue_running() == 1
+        assert queue.get(job["job_id"])["status"] == "running"
+        assert queue.claim_next()["job_id"] == job["job_id"]
+
+
+class TestIndexWriter:
+
+    def test_only_lock_holder_processes_jobs(self, tmp_path):
+        """Test that jobs run in the process holding the lock, with failures recorded"""
+        queue = IngestionQueue(str(tmp_path / "spool"))
+        handler = Mock(side_effect=[{"count": 3}, Exception("embedding failed")])
+        writer = IndexWriter(queue, WriterLock(str(tmp_path / "spool" / "writer.lock")), {"add_document": handler})
+        other = IndexWriter(queue, WriterLock(str(tmp_path / "spool" / "writer.lock")), {"add_document": handler})
+        ok = queue.enqueue("add_document", {"file_path": "a.pdf"})
+        failed = queue.enqueue("add_document", {"file_path": "b.pdf"})
+        unknown = queue.enqueue("compact", {})
+
+        assert writer.try_become_writer() is True
+        assert other.try_become_writer() is False
+        assert writer.process_pending() == 3
+
+        assert queue.get(ok["job_id"])["status"] == "done"
+        assert queue.get(ok["job_id"])["result"] == {"count": 3}
+        assert queue.get(failed["job_id"])["error"] == "embedding failed"
+        assert queue.get(unknown["job_id"])["status"] == "failed"
+        handler.assert_any_call({"file_path": "a.pdf"})
+        writer.lock.release()
+
+
+class TestWriterMode:
+
+    def test_single_mode_requires_numpy_backend(self):
+        """Test that a shared embedded Chroma store is rejected"""
+        with patch.object(settings, 'WRITER_MODE', 'single'), \
+             patch.object(settings, 'VECTOR_STORE_BACKEND', 'chroma'):
+            with pytest.raises(ValueError):
+                check_writer_mode()
+
+    def test_only_writer_can_write(self):
+        """Test that readers in single-writer mode refuse writes"""
+        with patch.object(settings, 'WRITER_MODE', 'single'):
+            assert can_write() is False
+        assert can_write() is True
+
+    def test_reader_rejects_direct_writes(self, tmp_path):
+        """Test that a worker without the lock cannot write the shared store directly"""
+        from src.core.chromadb_manager import ChromaDBManager
+
+        with patch.object(settings, 'WRITER_MODE', 'single'), \
+             patch.object(settings, 'VECTOR_STORE_BACKEND', 'numpy'), \
+             patch.object(settings, 'VECTOR_STORE_DIRECTORY', str(tmp_path)):
+            manager = ChromaDBManager(collection_name="test_collection")
+            with pytest.raises(RuntimeError):
+                manager.add_documents(["text"], [[0.1, 0.2]])
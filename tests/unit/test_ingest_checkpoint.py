@@ -0,0 +1,74 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.config import settings
+from src.core.ingest_checkpoint import (
+    IngestCheckpoints, IngestionInProgress, file_sha256, resume_interrupted_ingestions
+)
+
+CONTENT_HASH = "cd" * 32
+
+
+def _checkpoint(collection: str, file_path: str, started_at: float, **extra):
+    return {"collection": collection, "content_hash": CONTENT_HASH, "file_path": file_path,
+            "document_metadata": {"content_hash": CONTENT_HASH}, "committed": 0, "in_flight": 0,
+            "started_at": started_at, **extra}
+
+
+class TestIngestCheckpoints:
+
+    def test_save_load_delete(self, tmp_path):
+        """Test that checkpoints round-trip and are listed oldest first"""
+        checkpoints = IngestCheckpoints(str(tmp_path))
+        checkpoints.save(_checkpoint("b", "b.pdf", 2))
+        checkpoints.save(_checkpoint("a", "a.pdf", 1))
+
+        assert checkpoints.load("a", CONTENT_HASH)["file_path"] == "a.pdf"
+        assert [c["collection"] for c in checkpoints.pending()] == ["a", "b"]
+
+        checkpoints.delete("a", CONTENT_HASH)
+        assert checkpoints.load("a", CONTENT_HASH) is None
+        assert list((tmp_path / "a").glob("*.tmp")) == []
+
+    def test_claim_is_exclusive(self, tmp_path):
+        """Test that only one ingestion of a file into a collection runs at a time"""
+        checkpoints = IngestCheckpoints(str(tmp_path))
+
+        with checkpoints.claim("a", CONTENT_HASH):
+            with pytest.raises(IngestionInProgress):
+                with checkpoints.claim("a", CONTENT_HASH):
+                    pass
+            with checkpoints.claim("b", CONTENT_HASH):
+                pass
+
+        with checkpoints.claim("a", CONTENT_HASH):
+            pass
+        assert list((tmp_path / "a").iterdir()) == []
+
+    def test_file_sha256(self, tmp_path):
+        """Test that the file hash matches the hash uploads are stored under"""
+        path = tmp_path / "doc.pdf"
+        path.write_bytes(b"abc")
+
+        assert file_sha256(str(path), chunk_size=2) == (
+            "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
+        )
+
+    @patch('src.core.ollama_rag.OllamaRAG')
+    def test_resume_interrupted_ingestions(self, mock_rag, tmp_path):
+        """Test that startup resumes checkpoints whose file still exists"""
+        document = tmp_path / "doc.pdf"
+        document.write_bytes(b"pdf")
+        checkpoints = IngestCheckpoints(str(tmp_path / "checkpoints"))
+        checkpoints.save(_checkpoint("a", str(document), 1))
+        checkpoints.save(_checkpoint("b", str(tmp_path / "gone.pdf"), 2))
+        checkpoints.save(_checkpoint("c", str(document), 3, custom_metadata=True))
+
+        with patch.object(settings, "INGEST_CHECKPOINT_DIRECTORY", str(tmp_path / "checkpoints")):
+            assert resume_interrupted_ingestions("http://ollama:11434") == 1
+
+        mock_rag.assert_called_once_with(base_url="http://ollama:11434", collection_name="a")
+        mock_rag.return_value.add_documents.assert_called_once_with(
+            file_path=str(document), document_metadata={"content_hash": CONTENT_HASH}
+        )
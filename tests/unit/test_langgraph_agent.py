@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+from src.agent.langgraph_agent import RAGAgent, merge_documents
+
+
+class TestFanOutRetrieval:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        with patch('src.agent.langgraph_agent.OllamaRAG') as mock_rag_class:
+            self.mock_rag = Mock()
+            mock_rag_class.return_value = self.mock_rag
+            self.agent = RAGAgent()
+        self.mock_rag.generate_answer.return_value = {"answer": "Answer.", "confidence": 0.9}
+
+    def test_merge_documents(self):
+        """Test that merged results keep each document once with its best score"""
+        merged = merge_documents([("a", 0.5), ("b", 0.7)], [("a", 0.9), ("c", 0.1)])
+
+        assert merged == [("a", 0.9), ("b", 0.7), ("c", 0.1)]
+
+    def test_compound_question_retrieves_sub_queries_in_parallel(self):
+        """Test that sub-queries are searched concurrently and their results merged"""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def retrieve(query, **kwargs):
+            # Both branches must be running at the same time to pass the barrier
+            barrier.wait()
+            if query.startswith("What did he study"):
+                return [("Studied CS", 0.8), ("Worked at Acme", 0.4)]
+            return [("Worked at Acme", 0.7)]
+
+        self.mock_rag.retrieve_relevant_documents.side_effect = retrieve
+
+        result = asyncio.run(self.agent.process_query("What did he study and where did he work?"))
+
+        assert result["answer"] == "Answer."
+        assert self.mock_rag.retrieve_relevant_documents.call_count == 2
+        call_args = self.mock_rag.generate_answer.call_args
+        assert call_args[1]["user_question"] == "What did he study and where did he work?"
+        assert call_args[1]["relevant_docs"] == [("Studied CS", 0.8), ("Worked at Acme", 0.7)]
+
+    def test_partial_retrieval_failure(self):
+        """Test that the answer uses the sub-queries that succeeded"""
+        def retrieve(query, **kwargs):
+            if query.startswith("where"):
+                raise Exception("search failed")
+            return [("Studied CS", 0.8)]
+
+        self.mock_rag.retrieve_relevant_documents.side_effect = retrieve
+
+        result = asyncio.run(self.agent.process_query("What did he study and where did he work?"))
+
+        assert result["error"] is None
+        assert self.mock_rag.generate_answer.call_args[1]["relevant_docs"] == [("Studied CS", 0.8)]
+
+    def test_retrieval_failure(self):
+        """Test that the error handler answers when every sub-query failed"""
+        self.mock_rag.retrieve_relevant_documents.side_effect = Exception("search failed")
+
+        result = asyncio.run(self.agent.process_query("What did he study?"))
+
+        assert "Retrieval failed" in result["error"]
+        assert result["answer"].startswith("I apologize")
+        self.mock_rag.generate_answer.assert_not_called()
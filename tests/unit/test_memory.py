@@ -0,0 +1,68 @@
+import tracemalloc
+
+from src.utils import memory
+from src.utils.memory import MemoryStages
+
+MB = 1024 * 1024
+
+
+class TestMemory:
+
+    def test_gauges(self):
+        """Test that RSS and its peak are reported without tracing"""
+        gauges = memory.gauges()
+
+        assert 0 < gauges["rss_bytes"] <= gauges["peak_rss_bytes"]
+        assert "traced_bytes" not in gauges or gauges["tracing"]
+
+    def test_tracing_is_shared_and_stopped(self):
+        """Test that nested tracing blocks share one trace that stops with the last block"""
+        assert not tracemalloc.is_tracing()
+        with memory.tracing():
+            with memory.tracing():
+                assert tracemalloc.is_tracing()
+            assert tracemalloc.is_tracing()
+        assert not tracemalloc.is_tracing()
+
+    def test_nested_stage_peaks(self):
+        """Test that an outer stage keeps the peak reached inside a nested stage"""
+        stages = MemoryStages()
+        with memory.tracing():
+            outer = stages.enter("ingest")
+            inner = stages.enter("embed")
+            blob = bytearray(4 * MB)
+            del blob
+            stages.exit(inner)
+            kept = bytearray(MB)
+            stages.exit(outer)
+
+        result = stages.to_dict()
+        assert result["embed"]["peak_bytes"] >= 4 * MB
+        assert result["embed"]["allocated_bytes"] < MB
+        assert result["ingest"]["peak_bytes"] >= 4 * MB
+        assert result["ingest"]["allocated_bytes"] >= MB
+        assert len(kept) == MB
+
+    def test_stages_without_tracing(self):
+        """Test that stages are not recorded while tracemalloc is off"""
+        stages = MemoryStages()
+        stages.exit(stages.enter("embed"))
+
+        assert stages.to_dict() == {}
+
+    def test_top_allocations_since_baseline(self):
+        """Test that the allocation sites that grew since the baseline are listed first"""
+        with memory.tracing():
+            baseline = memory.take_snapshot()
+            retained = [bytes(MB) for _ in range(3)]
+            allocations = memory.top_allocations(5, baseline=baseline)
+
+        assert allocations[0]["site"].endswith("test_memory.py:" + str(self._line_of("retained = [")))
+        assert allocations[0]["size_diff_bytes"] >= 3 * MB
+        assert memory.top_allocations(5) is None
+        assert len(retained) == 3
+
+    @staticmethod
+    def _line_of(text: str) -> int:
+        with open(__file__) as f:
+            return next(number for number, line in enumerate(f, 1) if text in line and "_line_of" not in line)
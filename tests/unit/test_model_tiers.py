@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from src.config import settings
+from src.core.model_tiers import TIER_FAST, TIER_LARGE, TierRouter, TierStats, tier_config
+from unittest.mock import patch
+
+
+class TestTierRouter:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.router = TierRouter(fast_available=True, max_query_words=8, min_confidence=0.6)
+
+    @pytest.mark.parametrize("query,tier,reason", [
+        ("What is his email address?", TIER_FAST, "lookup:0.80"),
+        ("Why did he leave his first job?", TIER_LARGE, "cue:why"),
+        ("Summarize the document", TIER_LARGE, "cue:summarize"),
+        ("Compare his two most recent roles", TIER_LARGE, "cue:compare"),
+        ("Where did he study? When did he graduate?", TIER_LARGE, "compound"),
+        ("Which of the projects listed in the resume used Kubernetes in production?", TIER_LARGE, "long_query:12"),
+    ])
+    def test_query_features(self, query, tier, reason):
+        """Test that lookups go to the fast tier and explanations, long and compound questions do not"""
+        decision = self.router.choose(query, [("passage", 0.8)])
+
+        assert (decision.tier, decision.reason) == (tier, reason)
+
+    def test_low_retrieval_confidence(self):
+        """Test that a lookup without a confident passage goes to the large tier"""
+        assert self.router.choose("What is his email?", [("passage", 0.4)]).reason == "low_confidence:0.40"
+        assert self.router.choose("What is his email?", []).tier == TIER_LARGE
+
+    def test_single_tier(self):
+        """Test that every question goes to the large tier without a fast model"""
+        router = TierRouter(fast_available=False)
+
+        assert router.choose("What is his email?", [("passage", 0.9)]).tier == TIER_LARGE
+
+    def test_budget_per_tier(self):
+        """Test that each tier carries its own response-length budget"""
+        with patch.object(settings, "FAST_MODEL_NAME", "small"), patch.object(settings, "FAST_MODEL_MAX_TOKENS", 100):
+            tiers = tier_config("mistral")
+
+        assert tiers[TIER_FAST] == {"model": "small", "max_tokens": 100}
+        assert tiers[TIER_LARGE] == {"model": "mistral", "max_tokens": settings.LARGE_MODEL_MAX_TOKENS}
+        assert tier_config("mistral")[TIER_FAST] is None
+
+
+class TestTierStats:
+
+    def test_measure(self):
+        """Test that latency and errors are recorded per tier"""
+        stats = TierStats()
+        with stats.measure(TIER_FAST):
+            time.sleep(0.01)
+        with pytest.raises(RuntimeError):
+            with stats.measure(TIER_FAST):
+                raise RuntimeError("model not found")
+
+        fast = stats.stats()[TIER_FAST]
+        assert fast["requests"] == 2
+        assert fast["errors"] == 1
+        assert fast["max_ms"] >= 10
+        assert TIER_LARGE not in stats.stats()
@@ -0,0 +1,104 @@
+import pytest
+from unittest.mock import Mock, patch
+from src.core.model_warmup import ModelWarmup
+
+
+class TestModelWarmup:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        with patch('src.core.model_warmup.OllamaChat'), \
+             patch('src.core.model_warmup.OllamaEmbedding'):
+            self.warmup = ModelWarmup(
+                chat_model="mistral",
+                embedding_model="mistral",
+                base_url="http://ollama:11434",
+                collection_name="test_collection",
+                keep_alive="30m"
+            )
+
+    @patch('src.core.model_warmup.ChromaDBManager')
+    def test_warm_up_success(self, mock_chromadb):
+        """Test that all warm-up steps run and the worker becomes ready"""
+        # Setup mocks
+        self.warmup.embedding_client.embed_query.return_value = [0.9, 0.1]
+        mock_chromadb_instance = Mock()
+        mock_chromadb_instance.get_collection_count.return_value = 10
+        # The collection's own model, e.g. a legacy collection embedded with the chat model
+        mock_chromadb_instance.embedding_function.embed_query.return_value = [0.1, 0.2, 0.3]
+        mock_chromadb.return_value = mock_chromadb_instance
+
+        assert self.warmup.ready is False
+        assert self.warmup.status()["state"] == "warming"
+
+        # Execute
+        self.warmup.warm_up()
+
+        # Assertions
+        assert self.warmup.ready is True
+        assert self.warmup.status()["state"] == "ready"
+        assert self.warmup.errors == {}
+        assert set(self.warmup.durations) == {"chat_model", "embedding", "generation", "index"}
+        self.warmup.chat_client.preload.assert_called_once()
+        self.warmup.chat_client.generate_answer.assert_called_once_with("warm-up", context=[], max_tokens=1)
+        mock_chromadb.assert_called_once_with(collection_name="test_collection")
+        mock_chromadb_instance.query_by_embedding.assert_called_once_with([0.1, 0.2, 0.3], n_results=1)
+
+    @patch('src.core.model_warmup.ChromaDBManager')
+    def test_warm_up_records_errors(self, mock_chromadb):
+        """Test that a failing step is recorded, keeps the worker out of traffic and is retried"""
+        self.warmup.embedding_client.embed_query.side_effect = Exception("connection refused")
+
+        # Execute
+        self.warmup.warm_up()
+
+        # Assertions
+        assert self.warmup.ready is False
+        assert self.warmup.status()["state"] == "degraded"
+        assert self.warmup.errors["embedding"] == "connection refused"
+        self.warmup.chat_client.generate_answer.assert_called_once()
+        mock_chromadb.assert_called_once()
+
+        # The next keep-alive refresh warms up again
+        self.warmup.embedding_client.embed_query.side_effect = None
+        self.warmup.refresh_keep_alive()
+
+        assert self.warmup.ready is True
+        assert self.warmup.errors == {}
+
+    @patch('src.core.model_warmup.ChromaDBManager')
+    def test_failed_index_step_is_not_ready(self, mock_chromadb):
+        """Test that a collection that cannot be searched keeps the worker not ready"""
+        mock_chromadb.return_value.get_collection_count.return_value = 10
+        mock_chromadb.return_value.query_by_embedding.side_effect = ValueError("dimension mismatch")
+
+        self.warmup.warm_up()
+
+        assert self.warmup.ready is False
+        assert self.warmup.errors == {"index": "dimension mismatch"}
+
+    def test_refresh_keep_alive(self):
+        """Test that the keep-alive refresher pings both models"""
+        self.warmup.embedding_client.preload.side_effect = Exception("timeout")
+
+        # Execute
+        self.warmup.refresh_keep_alive()
+
+        # Assertions
+        self.warmup.chat_client.preload.assert_called_once()
+        self.warmup.embedding_client.preload.assert_called_once()
+        assert self.warmup.last_refresh is not None
+        assert self.warmup.status()["ready"] is False
+
+    def test_fast_chat_model(self):
+        """Test that a configured fast model is preloaded and kept alive too"""
+        with patch('src.core.model_warmup.OllamaChat', side_effect=lambda *args, **kwargs: Mock()), \
+             patch('src.core.model_warmup.OllamaEmbedding'):
+            warmup = ModelWarmup(chat_model="mistral", embedding_model="mistral", fast_chat_model="llama3.2:1b")
+
+        warmup._warm_index = Mock()
+        warmup.warm_up()
+        warmup.refresh_keep_alive()
+
+        assert warmup.fast_chat_client.preload.call_count == 2
+        assert "fast_chat_model" in warmup.durations
@@ -0,0 +1,183 @@
+import pytest
+import numpy as np
+from unittest.mock import patch
+from src.core.numpy_vector_store import NumpyVectorStore, matches_where
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class TestNumpyVectorStore:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.embeddings = [_unit([1, 0, 0]), _unit([0.9, 0.1, 0]), _unit([0, 1, 0]), _unit([0, 0, 1])]
+        self.documents = ["doc a", "doc b", "doc c", "doc d"]
+        self.metadatas = [{"source": "x", "page": 1}, {"source": "x", "page": 2},
+                          {"source": "y", "page": 3}, {"source": "y", "page": 4}]
+        self.ids = ["a", "b", "c", "d"]
+
+    def _store(self, tmp_path):
+        store = NumpyVectorStore("test_collection", directory=str(tmp_path))
+        store.add(self.ids, self.embeddings, self.documents, self.metadatas)
+        return store
+
+    def test_query_returns_exact_top_k(self, tmp_path):
+        """Test that the nearest documents come back best first in Chroma's layout"""
+        store = self._store(tmp_path)
+
+        results = store.query([_unit([1, 0.05, 0])], n_results=2)
+
+        assert results["ids"] == [["a", "b"]]
+        assert results["documents"] == [["doc a", "doc b"]]
+        assert results["metadatas"][0][0] == {"source": "x", "page": 1}
+        assert results["distances"][0][0] == pytest.approx(1 - np.dot(_unit([1, 0.05, 0]), self.embeddings[0]), abs=1e-6)
+
+    def test_query_with_where_filter(self, tmp_path):
+        """Test metadata filtering"""
+        store = self._store(tmp_path)
+
+        results = store.query([_unit([0, 1, 0.5])], n_results=5, where={"source": "y"})
+
+        assert results["ids"] == [["c", "d"]]
+
+    def test_get_ids(self, tmp_path):
+        """Test listing IDs by metadata, skipping deleted documents"""
+        store = self._store(tmp_path)
+        store.delete(["c"])
+
+        assert store.get_ids(where={"source": "y"}) == ["d"]
+        assert store.get_ids(limit=2) == ["a", "b"]
+
+    def test_delete_and_count(self, tmp_path):
+        """Test that deleted documents are no longer counted or returned"""
+        store = self._store(tmp_path)
+
+        store.delete(["a"])
+
+        assert store.count() == 3
+        assert store.query([_unit([1, 0, 0])], n_results=1)["ids"] == [["b"]]
+
+    def test_readd_replaces_existing_id(self, tmp_path):
+        """Test that adding an existing ID replaces the old row"""
+        store = self._store(tmp_path)
+
+        store.add(["a"], [_unit([0, 0, 1])], ["doc a v2"], [{"source": "z"}])
+
+        assert store.count() == 4
+        results = store.query([_unit([0, 0, 1])], n_results=2)
+        assert set(results["ids"][0]) == {"a", "d"}
+        assert "doc a v2" in results["documents"][0]
+
+    def test_reset(self, tmp_path):
+        """Test that reset drops all rows and allows a new dimension"""
+        store = self._store(tmp_path)
+
+        store.reset()
+
+        assert store.count() == 0
+        assert store.query([_unit([1, 0, 0])], n_results=3)["ids"] == [[]]
+        store.add(["e"], [_unit([1, 1])], ["doc e"], [{}])
+        assert store.count() == 1
+
+    def test_dimension_mismatch(self, tmp_path):
+        """Test that vectors of the wrong dimension are rejected"""
+        store = self._store(tmp_path)
+
+        with pytest.raises(ValueError):
+            store.add(["e"], [_unit([1, 1])], ["doc e"], [{}])
+
+    def test_other_instance_sees_committed_rows(self, tmp_path):
+        """Test that a second handle (e.g. another worker) picks up new rows"""
+        writer = self._store(tmp_path)
+        reader = NumpyVectorStore("test_collection", directory=str(tmp_path))
+
+        writer.add(["e"], [_unit([1, 1, 1])], ["doc e"], [{"source": "z"}])
+
+        assert reader.count() == 5
+        assert reader.query([_unit([1, 1, 1])], n_results=1)["ids"] == [["e"]]
+
+    def test_uncommitted_batch_is_discarded(self, tmp_path):
+        """Test that bytes appended without a commit are ignored and truncated"""
+        store = self._store(tmp_path)
+        with open(store.vectors_path, "ab") as f:
+            f.write(b"\x00" * 12)
+
+        store.add(["e"], [_unit([1, 1, 1])], ["doc e"], [{}])
+
+        assert store.vectors_path.stat().st_size == 5 * 3 * 4
+        assert store.query([_unit([1, 1, 1])], n_results=1)["ids"] == [["e"]]
+
+    def test_blocked_search_matches_brute_force(self, tmp_path):
+        """Test that the blocked top-k agrees with a full sort across block boundaries"""
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(50, 8)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        query = vectors[0] + 0.1
+        query /= np.linalg.norm(query)
+        store = NumpyVectorStore("blocked", directory=str(tmp_path))
+        store.add([str(i) for i in range(50)], vectors.tolist(), [f"doc {i}" for i in range(50)], [{}] * 50)
+
+        with patch('src.core.numpy_vector_store.SEARCH_BLOCK_ROWS', 7):
+            results = store.query([query.tolist()], n_results=10)
+
+        expected = np.argsort(-(vectors @ query))[:10]
+        assert results["ids"][0] == [str(i) for i in expected]
+
+    @pytest.mark.parametrize("quantization", ["int8", "float16"])
+    def test_quantized_search_matches_exact(self, tmp_path, quantization):
+        """Test that quantized search with rescoring returns the exact top-k"""
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(300, 32)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        queries = vectors[:10] + rng.normal(scale=0.1, size=(10, 32)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        store = NumpyVectorStore("quantized", directory=str(tmp_path), quantization=quantization)
+        for start in range(0, 300, 100):
+            store.add([str(i) for i in range(start, start + 100)], vectors[start:start + 100].tolist(),
+                      [f"doc {i}" for i in range(start, start + 100)], [{}] * 100)
+
+        results = store.query(queries.tolist(), n_results=5)
+
+        assert store.codes.dtype == np.dtype(quantization)
+        for query, ids, distances in zip(queries, results["ids"], results["distances"]):
+            expected = np.argsort(-(vectors @ query))[:5]
+            assert ids == [str(i) for i in expected]
+            # Distances come from the full-precision rescoring pass
+            np.testing.assert_allclose(distances, 1 - (vectors[expected] @ query), atol=1e-5)
+
+    def test_int8_first_add_larger_than_fit_rows(self, tmp_path):
+        """Test that the int8 range is fitted on a first batch too large to refit later"""
+        rng = np.random.default_rng(2)
+        vectors = rng.normal(size=(3000, 8)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        store = NumpyVectorStore("quantized", directory=str(tmp_path), quantization="int8")
+
+        store.add([str(i) for i in range(3000)], vectors.tolist(), [f"doc {i}" for i in range(3000)], [{}] * 3000)
+        results = store.query(vectors[:3].tolist(), n_results=1)
+
+        assert len(store.codes) == 3000
+        assert [ids[0] for ids in results["ids"]] == ["0", "1", "2"]
+
+    def test_quantization_is_stored_with_collection(self, tmp_path):
+        """Test that reopening a collection keeps its quantization"""
+        store = NumpyVectorStore("quantized", directory=str(tmp_path), quantization="int8")
+        store.add(self.ids, self.embeddings, self.documents, self.metadatas)
+
+        reopened = NumpyVectorStore("quantized", directory=str(tmp_path))
+        reopened.reset()
+
+        assert reopened.quantization == "int8"
+        assert (tmp_path / "quantized" / "quantizer.npz").exists() is False
+
+    def test_matches_where_operators(self):
+        """Test the supported filter operators"""
+        metadata = {"source": "x", "page": 3}
+
+        assert matches_where(metadata, {"page": {"$gte": 3}})
+        assert matches_where(metadata, {"source": {"$in": ["x", "y"]}})
+        assert matches_where(metadata, {"$or": [{"source": "y"}, {"page": 3}]})
+        assert not matches_where(metadata, {"$and": [{"source": "x"}, {"page": {"$lt": 3}}]})
+        assert not matches_where(metadata, {"source": {"$ne": "x"}})
@@ -51,4 +51,46 @@ class TestOllamaChat:
         assert "What is the weather like?" in payload['prompt']
         assert "Context 1: It's sunny today" in payload['prompt']
         assert "Context 2: Temperature is 25°C" in payload['prompt']
-    
\ No newline at end of file
+    
+    @patch('src.core.ollama_chat.requests.post')
+    def test_generate_turn_reuses_context(self, mock_post):
+        """Test that a follow-up turn sends the previous context and only the new turn"""
+        # Setup mock response
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"response": " Follow-up answer. ", "context": [1, 2, 3, 4]}
+        mock_post.return_value = mock_response
+        
+        # Execute
+        answer, context = self.chat_client.generate_turn(
+            "And his education?",
+            ["He studied CS"],
+            conversation_context=[1, 2],
+            conversation_summary="Earlier summary"
+        )
+        
+        # Assertions
+        assert answer == "Follow-up answer."
+        assert context == [1, 2, 3, 4]
+        payload = mock_post.call_args[1]['json']
+        assert payload['context'] == [1, 2]
+        assert "System:" not in payload['prompt']
+        assert "Earlier summary" not in payload['prompt']
+        assert "User Question: And his education?" in payload['prompt']
+    
+    @patch('src.core.ollama_chat.requests.post')
+    def test_generate_turn_starts_context(self, mock_post):
+        """Test that the first turn after compaction sends the system prompt and summary"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"response": "Answer.", "context": [5, 6]}
+        mock_post.return_value = mock_response
+        
+        # Execute
+        self.chat_client.generate_turn("Question?", ["ctx"], conversation_context=[], conversation_summary="Earlier summary")
+        
+        # Assertions
+        payload = mock_post.call_args[1]['json']
+        assert 'context' not in payload
+        assert payload['prompt'].startswith("System:")
+        assert "Conversation so far: Earlier summary" in payload['prompt']
@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import Mock, patch, MagicMock
 import requests
 import numpy as np
-from src.core.ollama_embedding import OllamaEmbedding
+from src.core.ollama_embedding import OllamaEmbedding, normalize
 
 
 class TestOllamaEmbedding:
@@ -15,9 +15,8 @@ class TestOllamaEmbedding:
         )
     
     @patch('src.core.ollama_embedding.normalize')
-    @patch('src.core.ollama_embedding.np.array')
     @patch('src.core.ollama_embedding.requests.post')
-    def test_embed_documents_success(self, mock_post, mock_array, mock_normalize):
+    def test_embed_documents_success(self, mock_post, mock_normalize):
         """Test successful embedding of multiple documents"""
         # Setup mock responses
         mock_response1 = Mock()
@@ -30,12 +29,6 @@ class TestOllamaEmbedding:
         
         mock_post.side_effect = [mock_response1, mock_response2]
         
-        # Mock numpy array creation
-        mock_array.side_effect = [
-            np.array([0.1, 0.2, 0.3]),
-            np.array([0.4, 0.5, 0.6])
-        ]
-        
         # Mock normalization results
         mock_normalized1 = Mock()
         mock_normalized1.tolist.return_value = [0.2672612419124244, 0.5345224838248488, 0.8017837257372731]
@@ -107,9 +100,8 @@ class TestOllamaEmbedding:
         mock_post.assert_called_once()
     
     @patch('src.core.ollama_embedding.normalize')
-    @patch('src.core.ollama_embedding.np.array')
     @patch('src.core.ollama_embedding.requests.post')
-    def test_embed_query_success(self, mock_post, mock_array, mock_normalize):
+    def test_embed_query_success(self, mock_post, mock_normalize):
         """Test successful embedding of a single query"""
         # Setup mock response
         mock_response = Mock()
@@ -117,9 +109,6 @@ class TestOllamaEmbedding:
         mock_response.json.return_value = {"embedding": [0.1, 0.2, 0.3, 0.4]}
         mock_post.return_value = mock_response
         
-        # Mock numpy array creation
-        mock_array.return_value = np.array([0.1, 0.2, 0.3, 0.4])
-        
         # Mock normalization result
         mock_normalized = Mock()
         mock_normalized.tolist.return_value = [0.1825741858350554, 0.3651483716701107, 0.5477225575051661, 0.7302967433402214]
@@ -145,12 +134,11 @@ class TestOllamaEmbedding:
         )
         
         # Verify normalization was called correctly
-        mock_normalize.assert_called_once_with([np.array([0.1, 0.2, 0.3, 0.4])], norm='l2')
+        mock_normalize.assert_called_once_with([[0.1, 0.2, 0.3, 0.4]], norm='l2')
     
     @patch('src.core.ollama_embedding.normalize')
-    @patch('src.core.ollama_embedding.np.array')
     @patch('src.core.ollama_embedding.requests.post')
-    def test_embed_query_empty_string(self, mock_post, mock_array, mock_normalize):
+    def test_embed_query_empty_string(self, mock_post, mock_normalize):
         """Test embedding of empty string query"""
         # Setup mock response
         mock_response = Mock()
@@ -158,9 +146,6 @@ class TestOllamaEmbedding:
         mock_response.json.return_value = {"embedding": [0.0, 0.0, 0.0]}
         mock_post.return_value = mock_response
         
-        # Mock numpy array creation
-        mock_array.return_value = np.array([0.0, 0.0, 0.0])
-        
         # Mock normalization result (normalized zero vector should remain zero)
         mock_normalized = Mock()
         mock_normalized.tolist.return_value = [0.0, 0.0, 0.0]
@@ -186,4 +171,45 @@ class TestOllamaEmbedding:
         )
         
         # Verify normalization was called correctly
-        mock_normalize.assert_called_once_with([np.array([0.0, 0.0, 0.0])], norm='l2')
+        mock_normalize.assert_called_once_with([[0.0, 0.0, 0.0]], norm='l2')
+    
+    @patch('src.core.ollama_embedding.requests.post')
+    def test_embed_batch(self, mock_post):
+        """Test embedding several texts in one request"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"embeddings": [[3.0, 4.0], [0.0, 2.0]]}
+        mock_post.return_value = mock_response
+        
+        # Execute
+        result = self.embedding_client.embed_batch(["first", "second"])
+        
+        # Assertions
+        assert result == [[0.6, 0.8], [0.0, 1.0]]
+        mock_post.assert_called_once_with(
+            "http://ollama:11434/api/embed",
+            json={"model": "mistral", "input": ["first", "second"]}
+        )
+    
+    @patch('src.core.ollama_embedding.requests.post')
+    def test_embed_batch_falls_back_without_endpoint(self, mock_post):
+        """Test that older Ollama versions are embedded one text at a time"""
+        not_found = Mock()
+        not_found.status_code = 404
+        single = Mock()
+        single.status_code = 200
+        single.json.return_value = {"embedding": [1.0, 0.0]}
+        mock_post.side_effect = [not_found, single]
+        
+        # Execute
+        result = self.embedding_client.embed_batch(["only"])
+        
+        # Assertions
+        assert result == [[1.0, 0.0]]
+        assert mock_post.call_count == 2
+    
+    def test_normalize(self):
+        """Test row-wise L2 normalization, leaving zero vectors unchanged"""
+        result = normalize([[3.0, 4.0], [0.0, 0.0]], norm='l2')
+        
+        np.testing.assert_allclose(result, [[0.6, 0.8], [0.0, 0.0]])
@@ -1,12 +1,32 @@
+import tempfile
+
 import pytest
 from unittest.mock import Mock, patch, MagicMock
+from src.config import settings
+from src.core.ingest_checkpoint import get_ingest_checkpoints, ingestion_pending
+from src.core.model_tiers import TIER_FAST, TIER_LARGE
 from src.core.ollama_rag import OllamaRAG
+from src.core.ollama_scheduler import INGESTION, INTERACTIVE, _priority
+from src.core.session_store import ConversationSession
+from src.utils.profiling import recent_memory_profiles
+from src.utils.text_chunker import Chunk
+
+
+CONTENT_HASH = "ab" * 32
 
 
 class TestOllamaRAG:
     
     def setup_method(self):
         """Setup test fixtures"""
+        self.checkpoint_dir = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch.object(settings, "INGEST_CHECKPOINT_DIRECTORY", self.checkpoint_dir.name),
+            patch.object(settings, "INGEST_RETRY_BACKOFF_SECONDS", 0),
+            patch('src.core.ollama_rag.file_sha256', return_value=CONTENT_HASH),
+        ]
+        for p in self.patches:
+            p.start()
         with patch('src.core.ollama_rag.ChromaDBManager'), \
              patch('src.core.ollama_rag.OllamaEmbedding'), \
              patch('src.core.ollama_rag.OllamaChat'):
@@ -18,6 +38,11 @@ class TestOllamaRAG:
                 collection_name="test_collection"
             )
     
+    def teardown_method(self):
+        for p in self.patches:
+            p.stop()
+        self.checkpoint_dir.cleanup()
+    
     def test_init_with_default_parameters(self):
         """Test initialization with default parameters"""
         with patch('src.core.ollama_rag.ChromaDBManager'), \
@@ -46,21 +71,15 @@ class TestOllamaRAG:
             assert rag.top_k == 10
     
     @patch('src.core.ollama_rag.PDFChunker')
-    @patch('src.core.ollama_rag.uuid.uuid4')
-    @patch('src.core.ollama_rag.datetime')
-    def test_add_documents_success(self, mock_datetime, mock_uuid, mock_pdf_chunker):
+    def test_add_documents_success(self, mock_pdf_chunker):
         """Test successful document addition"""
         # Setup mocks
         mock_chunker_instance = Mock()
-        mock_chunker_instance.process_pdf.return_value = ["chunk1", "chunk2", "chunk3"]
+        mock_chunker_instance.iter_chunks.return_value = iter([
+            Chunk("chunk1", 1, 0, 6), Chunk("chunk2", 1, 7, 13), Chunk("chunk3", 2, 14, 20)
+        ])
         mock_pdf_chunker.return_value = mock_chunker_instance
         
-        # Mock datetime for timestamp generation
-        mock_datetime.now.return_value.strftime.return_value = "20240706_120000"
-        
-        # Mock UUID generation
-        mock_uuid.side_effect = ['uuid1', 'uuid2', 'uuid3']
-        
         self.rag_system.embedding_client.embed_documents.return_value = [
             [0.1, 0.2, 0.3],
             [0.4, 0.5, 0.6],
@@ -73,8 +92,10 @@ class TestOllamaRAG:
         self.rag_system.add_documents("test_file.pdf")
         
         # Assertions
-        mock_pdf_chunker.assert_called_once_with(chunk_size=500)
-        mock_chunker_instance.process_pdf.assert_called_once_with("test_file.pdf")
+        assert mock_pdf_chunker.call_args[1]['chunk_size'] == settings.CHUNK_SIZE
+        assert mock_pdf_chunker.call_args[1]['chunk_overlap'] == settings.CHUNK_OVERLAP
+        assert mock_pdf_chunker.call_args[1]['remove_boilerplate'] == settings.BOILERPLATE_REMOVAL
+        mock_chunker_instance.iter_chunks.assert_called_once_with("test_file.pdf")
         self.rag_system.embedding_client.embed_documents.assert_called_once_with(["chunk1", "chunk2", "chunk3"])
         self.rag_system.chroma_client.add_documents.assert_called_once()
         
@@ -82,16 +103,20 @@ class TestOllamaRAG:
         call_args = self.rag_system.chroma_client.add_documents.call_args
         assert call_args[1]['documents'] == ["chunk1", "chunk2", "chunk3"]
         assert call_args[1]['embeddings'] == [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6], [0.7, 0.8, 0.9]]
-        assert call_args[1]['ids'] == ["doc_0_uuid1", "doc_1_uuid2", "doc_2_uuid3"]
+        assert call_args[1]['ids'] == ["doc_0_abababababababab", "doc_1_abababababababab", "doc_2_abababababababab"]
         assert len(call_args[1]['metadatas']) == 3
-        assert call_args[1]['metadatas'] == [{"source": "doc_0"}, {"source": "doc_1"}, {"source": "doc_2"}]
+        assert call_args[1]['metadatas'] == [
+            {"source": "doc_0", "page": 1, "start": 0, "end": 6},
+            {"source": "doc_1", "page": 1, "start": 7, "end": 13},
+            {"source": "doc_2", "page": 2, "start": 14, "end": 20}
+        ]
     
     @patch('src.core.ollama_rag.PDFChunker')
     def test_add_documents_with_custom_metadata(self, mock_pdf_chunker):
         """Test document addition with custom metadata"""
         # Setup mocks
         mock_chunker_instance = Mock()
-        mock_chunker_instance.process_pdf.return_value = ["chunk1", "chunk2"]
+        mock_chunker_instance.iter_chunks.return_value = iter([Chunk("chunk1", 1, 0, 6), Chunk("chunk2", 1, 7, 13)])
         mock_pdf_chunker.return_value = mock_chunker_instance
         
         self.rag_system.embedding_client.embed_documents.return_value = [
@@ -114,6 +139,152 @@ class TestOllamaRAG:
         call_args = self.rag_system.chroma_client.add_documents.call_args
         assert call_args[1]['metadatas'] == custom_metadata
     
+    @patch('src.core.ollama_rag.PDFChunker')
+    def test_add_documents_embeds_as_ingestion(self, mock_pdf_chunker):
+        """Test that chunks are embedded in the ingestion priority class"""
+        mock_pdf_chunker.return_value.iter_chunks.return_value = iter([Chunk("chunk1", 1, 0, 6)])
+        classes = []
+        
+        def embed_documents(chunks):
+            classes.append(_priority.get())
+            return [[0.1, 0.2, 0.3]]
+        
+        self.rag_system.embedding_client.embed_documents.side_effect = embed_documents
+        self.rag_system.chroma_client.add_documents = Mock()
+        
+        self.rag_system.add_documents("test_file.pdf")
+        
+        assert classes == [INGESTION]
+        assert _priority.get() == INTERACTIVE
+    
+    def _chunks(self, count):
+        return [Chunk(f"chunk{i}", 1, 10 * i, 10 * i + 6) for i in range(count)]
+    
+    @patch('src.core.ollama_rag.PDFChunker')
+    def test_add_documents_commits_in_batches(self, mock_pdf_chunker):
+        """Test that chunks are stored in batches and the checkpoint is removed when done"""
+        mock_pdf_chunker.return_value.iter_chunks.side_effect = lambda path: iter(self._chunks(5))
+        self.rag_system.embedding_client.embed_documents.side_effect = lambda chunks: [[0.1]] * len(chunks)
+        self.rag_system.chroma_client.add_documents = Mock()
+        
+        with patch.object(settings, "INGEST_BATCH_CHUNKS", 2):
+            self.rag_system.add_documents("test_file.pdf", document_metadata={"filename": "a.pdf"})
+        
+        calls = self.rag_system.chroma_client.add_documents.call_args_list
+        assert [len(call[1]['ids']) for call in calls] == [2, 2, 1]
+        assert calls[2][1]['ids'] == ["doc_4_abababababababab"]
+        assert calls[2][1]['metadatas'][0]["source"] == "doc_4"
+        assert not ingestion_pending("test_collection", CONTENT_HASH)
+    
+    @patch('src.core.ollama_rag.PDFChunker')
+    def test_add_documents_resumes_after_last_batch(self, mock_pdf_chunker):
+        """Test that a failed ingestion keeps its checkpoint and a retry only embeds the rest"""
+        mock_pdf_chunker.return_value.iter_chunks.side_effect = lambda path: iter(self._chunks(3))
+        embedded = []
+        
+        def embed_documents(chunks):
+            if chunks == ["chunk2"] and "chunk2" not in embedded:
+                embedded.append("chunk2")
+                raise ConnectionError("Ollama went away")
+            embedded.extend(chunks)
+            return [[0.1]] * len(chunks)
+        
+        self.rag_system.embedding_client.embed_documents.side_effect = embed_documents
+        self.rag_system.chroma_client.add_documents = Mock()
+        
+        with patch.object(settings, "INGEST_BATCH_CHUNKS", 2), patch.object(settings, "INGEST_BATCH_ATTEMPTS", 1):
+            with pytest.raises(ConnectionError):
+                self.rag_system.add_documents("test_file.pdf")
+            
+            checkpoint = get_ingest_checkpoints().load("test_collection", CONTENT_HASH)
+            assert checkpoint["committed"] == 2
+            
+            self.rag_system.add_documents("test_file.pdf")
+        
+        assert embedded == ["chunk0", "chunk1", "chunk2", "chunk2"]
+        stored = [doc_id for call in self.rag_system.chroma_client.add_documents.call_args_list
+                  for doc_id in call[1]['ids']]
+        assert stored == [f"doc_{i}_abababababababab" for i in range(3)]
+        assert not ingestion_pending("test_collection", CONTENT_HASH)
+    
+    @patch('src.core.ollama_rag.PDFChunker')
+    def test_add_documents_replaces_batch_in_flight(self, mock_pdf_chunker):
+        """Test that chunks of a batch interrupted while being stored are deleted before resuming"""
+        mock_pdf_chunker.return_value.iter_chunks.side_effect = lambda path: iter(self._chunks(4))
+        self.rag_system.embedding_client.embed_documents.side_effect = lambda chunks: [[0.1]] * len(chunks)
+        self.rag_system.chroma_client.add_documents = Mock()
+        get_ingest_checkpoints().save({
+            "collection": "test_collection", "content_hash": CONTENT_HASH, "file_path": "test_file.pdf",
+            "document_metadata": {}, "custom_metadata": False, "chunk_size": 100, "chunk_overlap": 10,
+            "committed": 2, "in_flight": 4, "attempts": 1, "started_at": 0,
+        })
+        
+        self.rag_system.add_documents("test_file.pdf")
+        
+        self.rag_system.chroma_client.delete_documents.assert_called_once_with(
+            ["doc_2_abababababababab", "doc_3_abababababababab"]
+        )
+        # Chunked like the interrupted attempt, which predates boilerplate removal
+        mock_pdf_chunker.assert_called_once_with(chunk_size=100, chunk_overlap=10, remove_boilerplate=False,
+                                                 boilerplate_filter=None)
+        self.rag_system.embedding_client.embed_documents.assert_called_once_with(["chunk2", "chunk3"])
+    
+    @patch('src.core.ollama_rag.PDFChunker')
+    def test_add_documents_survives_repeated_interruptions(self, mock_pdf_chunker):
+        """Test that retries get through a file even when every attempt fails after one batch"""
+        mock_pdf_chunker.return_value.iter_chunks.side_effect = lambda path: iter(self._chunks(7))
+        calls = []
+        
+        def embed_documents(chunks):
+            calls.append(chunks)
+            if len(calls) % 2 == 0:
+                raise TimeoutError("Ollama timed out")
+            return [[0.1]] * len(chunks)
+        
+        self.rag_system.embedding_client.embed_documents.side_effect = embed_documents
+        self.rag_system.chroma_client.add_documents = Mock()
+        
+        attempts = 0
+        with patch.object(settings, "INGEST_BATCH_CHUNKS", 2), patch.object(settings, "INGEST_BATCH_ATTEMPTS", 1):
+            while True:
+                attempts += 1
+                try:
+                    self.rag_system.add_documents("test_file.pdf")
+                    break
+                except TimeoutError:
+                    assert attempts < 10
+        
+        stored = [doc_id for call in self.rag_system.chroma_client.add_documents.call_args_list
+                  for doc_id in call[1]['ids']]
+        assert stored == [f"doc_{i}_abababababababab" for i in range(7)]
+        assert attempts == 4
+    
+    @patch('src.core.ollama_rag.PDFChunker')
+    def test_add_documents_memory_profile(self, mock_pdf_chunker):
+        """Test that ingestion records memory per stage when MEMORY_PROFILE_INGESTION is on"""
+        mock_pdf_chunker.return_value.iter_chunks.side_effect = lambda path: iter(self._chunks(3))
+        self.rag_system.embedding_client.embed_documents.side_effect = lambda chunks: [[0.1]] * len(chunks)
+        self.rag_system.chroma_client.add_documents = Mock()
+        
+        with patch.object(settings, "MEMORY_PROFILE_INGESTION", True):
+            self.rag_system.add_documents("test_file.pdf")
+        
+        profile = recent_memory_profiles()[-1]
+        assert profile["label"] == "ingestion of test_file.pdf into test_collection"
+        assert profile["stages"]["chunk"]["calls"] == 2
+    
+    @patch('src.core.ollama_rag.PDFChunker')
+    def test_add_documents_retries_batch(self, mock_pdf_chunker):
+        """Test that a failing batch is tried again before the ingestion gives up"""
+        mock_pdf_chunker.return_value.iter_chunks.side_effect = lambda path: iter(self._chunks(1))
+        self.rag_system.embedding_client.embed_documents.side_effect = [ConnectionError("refused"), [[0.1]]]
+        self.rag_system.chroma_client.add_documents = Mock()
+        
+        self.rag_system.add_documents("test_file.pdf")
+        
+        assert self.rag_system.embedding_client.embed_documents.call_count == 2
+        self.rag_system.chroma_client.add_documents.assert_called_once()
+    
     def test_generate_answer_success(self):
         """Test successful answer generation"""
         # Setup mocks
@@ -172,3 +343,93 @@ class TestOllamaRAG:
         assert result['answer'] == "Custom answer."
         assert result['confidence'] == 0.8
         assert 'sources' not in result
+    
+    def test_generate_answer_routes_to_fast_tier(self):
+        """Test that a confident lookup is answered by the fast model within its budget"""
+        fast_client = Mock()
+        fast_client.generate_answer.return_value = "jane@example.com"
+        self.rag_system.chat_clients[TIER_FAST] = fast_client
+        self.rag_system.tier_router.fast_available = True
+        
+        result = self.rag_system.generate_answer("What is her email?", relevant_docs=[("Email: jane@example.com", 0.9)])
+        
+        assert result["answer"] == "jane@example.com"
+        assert result["model_tier"] == TIER_FAST
+        assert fast_client.generate_answer.call_args[1]["max_tokens"] == settings.FAST_MODEL_MAX_TOKENS
+        self.rag_system.chat_client.generate_answer.assert_not_called()
+        
+        result = self.rag_system.generate_answer("Explain her role in the migration project",
+                                                 relevant_docs=[("Led the migration", 0.9)])
+        assert result["model_tier"] == TIER_LARGE
+        assert result["tier_reason"] == "cue:explain"
+    
+    def test_generate_answer_with_session(self):
+        """Test that a session turn passes and stores the Ollama context"""
+        self.rag_system.retrieve_relevant_documents = Mock(return_value=[("Document content", 0.8)])
+        self.rag_system.chat_client.generate_turn.return_value = ("Session answer.", [1, 2, 3])
+        session = ConversationSession("s1", "test_collection")
+        session.context = [1]
+        
+        # Execute
+        result = self.rag_system.generate_answer("Follow-up?", session=session)
+        
+        # Assertions
+        assert result['answer'] == "Session answer."
+        self.rag_system.chat_client.generate_answer.assert_not_called()
+        call_args = self.rag_system.chat_client.generate_turn.call_args
+        assert call_args[1]['conversation_context'] == [1]
+        assert session.context == [1, 2, 3]
+        assert session.turns[-1] == {"role": "assistant", "content": "Session answer."}
+        assert result['model_tier'] == TIER_LARGE
+    
+    def test_compact_session_over_budget(self):
+        """Test that a session over the token budget is summarized"""
+        self.rag_system.chat_client.summarize.return_value = "Short summary."
+        session = ConversationSession("s1", "test_collection")
+        session.add_turn("Q1", "A1", list(range(settings.SESSION_TOKEN_BUDGET + 1)))
+        
+        # Execute
+        self.rag_system.compact_session(session)
+        
+        # Assertions
+        self.rag_system.chat_client.summarize.assert_called_once_with("User: Q1\nAssistant: A1", max_tokens=settings.SESSION_SUMMARY_TOKENS)
+        assert session.summary == "Short summary."
+        assert session.context == []
+        assert session.turns == []
+    
+    def test_generate_answer_below_min_similarity(self):
+        """Test that generation is skipped when the best match is below the threshold"""
+        self.rag_system.retrieve_relevant_documents = Mock(return_value=[("Unrelated", 0.2), ("Also unrelated", 0.1)])
+        
+        # Execute
+        with patch.object(settings, 'MIN_SIMILARITY', 0.3):
+            result = self.rag_system.generate_answer("What is the test question?")
+        
+        # Assertions
+        assert result['answer'] == "I don't have relevant information to answer your question."
+        assert result['sources'] == []
+        assert result['confidence'] == 0.2
+        self.rag_system.chat_client.generate_answer.assert_not_called()
+    
+    def test_min_similarity_per_collection(self):
+        """Test that a collection threshold overrides the global one"""
+        with patch.object(settings, 'MIN_SIMILARITY', 0.3), \
+             patch.object(settings, 'MIN_SIMILARITY_BY_COLLECTION', {self.rag_system.collection_name: 0.5}):
+            assert self.rag_system.min_similarity == 0.5
+        
+        with patch.object(settings, 'MIN_SIMILARITY', 0.3):
+            assert self.rag_system.min_similarity == 0.3
+    
+    def test_generate_answer_with_retrieved_documents(self):
+        """Test that already retrieved documents are used without searching again"""
+        self.rag_system.retrieve_relevant_documents = Mock()
+        self.rag_system.chat_client.generate_answer.return_value = "Merged answer."
+        
+        # Execute
+        result = self.rag_system.generate_answer("Q1 and Q2?", relevant_docs=[("Doc A", 0.9), ("Doc B", 0.6)])
+        
+        # Assertions
+        assert result['answer'] == "Merged answer."
+        assert result['confidence'] == 0.9
+        self.rag_system.retrieve_relevant_documents.assert_not_called()
+        assert self.rag_system.chat_client.generate_answer.call_args[1]['context'] == ["Doc A", "Doc B"]
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from src.core.ollama_scheduler import INGESTION, INTERACTIVE, OllamaScheduler, _Waiter, ollama_priority
+
+
+def _grant_order(scheduler: OllamaScheduler, interactive: int, ingestion: int):
+    """Classes in the order queued waiters get the scheduler's single slot"""
+    with scheduler._lock:
+        for priority_class, count in ((INTERACTIVE, interactive), (INGESTION, ingestion)):
+            for _ in range(count):
+                scheduler._queues[priority_class].append(_Waiter(priority_class))
+                scheduler._stats[priority_class].waiting += 1
+    order = []
+    with scheduler._lock:
+        scheduler._dispatch()
+    while len(order) < interactive + ingestion:
+        # Each release hands the slot to the next waiter
+        granted = INTERACTIVE if scheduler._stats[INTERACTIVE].in_flight else INGESTION
+        order.append(granted)
+        scheduler._release(granted)
+    return order
+
+
+class TestOllamaScheduler:
+
+    def test_interactive_before_ingestion(self):
+        """Test that a waiting query gets the next slot ahead of earlier ingestion calls"""
+        scheduler = OllamaScheduler(max_concurrency=1, ingestion_min_share=0, reserved_interactive_slots=0)
+
+        assert _grant_order(scheduler, interactive=2, ingestion=2) == [INTERACTIVE, INTERACTIVE, INGESTION, INGESTION]
+
+    def test_ingestion_minimum_share(self):
+        """Test that ingestion gets its share of slots while queries keep waiting"""
+        scheduler = OllamaScheduler(max_concurrency=1, ingestion_min_share=0.25, reserved_interactive_slots=0)
+
+        order = _grant_order(scheduler, interactive=6, ingestion=2)
+
+        assert order == [INTERACTIVE] * 3 + [INGESTION] + [INTERACTIVE] * 3 + [INGESTION]
+
+    def test_reserved_interactive_slots(self):
+        """Test that ingestion never takes the reserved slots"""
+        scheduler = OllamaScheduler(max_concurrency=2, reserved_interactive_slots=1)
+        with scheduler._lock:
+            for _ in range(2):
+                scheduler._queues[INGESTION].append(_Waiter(INGESTION))
+                scheduler._stats[INGESTION].waiting += 1
+            scheduler._dispatch()
+
+        stats = scheduler.stats()["classes"][INGESTION]
+        assert stats["in_flight"] == 1
+        assert stats["waiting"] == 1
+
+    def test_reserved_slots_leave_one_for_ingestion(self):
+        """Test that a single slot is never reserved away from ingestion"""
+        assert OllamaScheduler(max_concurrency=1, reserved_interactive_slots=1).reserved_interactive_slots == 0
+
+    def test_concurrency_limit_and_priority_context(self):
+        """Test that calls beyond the limit wait and are counted in their context's class"""
+        scheduler = OllamaScheduler(max_concurrency=1, reserved_interactive_slots=0)
+        release = threading.Event()
+        running = []
+
+        def call(name):
+            with scheduler.slot():
+                running.append(name)
+                release.wait(timeout=5)
+
+        def ingest():
+            with ollama_priority(INGESTION):
+                call("ingestion")
+
+        first = threading.Thread(target=call, args=("query",))
+        first.start()
+        while not running:
+            time.sleep(0.01)
+        second = threading.Thread(target=ingest)
+        second.start()
+        while scheduler.stats()["classes"][INGESTION]["waiting"] == 0:
+            time.sleep(0.01)
+
+        assert running == ["query"]
+        release.set()
+        first.join()
+        second.join()
+
+        stats = scheduler.stats()
+        assert running == ["query", "ingestion"]
+        assert stats["in_flight"] == 0
+        assert stats["classes"][INTERACTIVE]["requests"] == 1
+        assert stats["classes"][INGESTION]["requests"] == 1
+        assert stats["classes"][INGESTION]["max_wait_ms"] > 0
+
+    def test_disabled(self):
+        """Test that a zero limit lets every call through uncounted"""
+        scheduler = OllamaScheduler(max_concurrency=0)
+        with scheduler.slot(), scheduler.slot():
+            pass
+
+        assert scheduler.stats()["classes"][INTERACTIVE]["requests"] == 0
+
+    def test_unknown_priority_class(self):
+        """Test that an unknown class is rejected"""
+        with pytest.raises(ValueError):
+            with ollama_priority("batch"):
+                pass
@@ -0,0 +1,184 @@
+import asyncio
+import inspect
+import time
+import tracemalloc
+from unittest.mock import Mock, patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.agent.langgraph_agent import RAGAgent
+from src.utils import profiling
+from src.utils.profiling import RequestProfilingMiddleware, RequestTimings, timed, timed_stage
+
+
+@timed_stage("embed")
+def embed(text: str) -> str:
+    time.sleep(0.01)
+    return text
+
+
+@timed_stage("load")
+def load_file(size: int) -> int:
+    blob = bytearray(size)
+    return len(blob)
+
+
+class TestTimedStages:
+
+    def test_disabled_records_nothing(self):
+        """Test that stages outside a profiled request are plain calls"""
+        with timed("search"):
+            pass
+
+        assert embed("hi") == "hi"
+        assert profiling._current.get() is None
+
+    def test_stages_are_summed_with_call_counts(self):
+        """Test that repeated stages are summed and labelled with their call count"""
+        timings = RequestTimings()
+        token = profiling._current.set(timings)
+        try:
+            embed("a")
+            embed("b")
+            with timed("search"):
+                pass
+        finally:
+            profiling._current.reset(token)
+
+        header = timings.server_timing()
+        assert 'embed;dur=' in header and 'desc="2 calls"' in header
+        assert "search;dur=" in header
+        assert header.split(", ")[-1].startswith("total;dur=")
+        assert timings.stages["embed"][0] >= 0.02
+
+    def test_nested_stage_counts_once(self):
+        """Test that a stage calling itself is not counted twice"""
+        timings = RequestTimings()
+        token = profiling._current.set(timings)
+        try:
+            with timed("embed"):
+                embed("a")
+        finally:
+            profiling._current.reset(token)
+
+        assert timings.stages["embed"][1] == 1
+
+    def test_decorator_keeps_signature(self):
+        """Test that decorated graph nodes keep the signature LangGraph inspects"""
+        assert list(inspect.signature(embed).parameters) == ["text"]
+
+
+class TestProfilingMiddleware:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        app = FastAPI()
+        app.add_middleware(RequestProfilingMiddleware)
+
+        @app.get("/work")
+        async def work():
+            # Stages running in worker threads belong to the request
+            await asyncio.to_thread(embed, "question")
+            return {"answer": "ok"}
+
+        @app.get("/load")
+        async def load():
+            return {"size": await asyncio.to_thread(load_file, 4 * 1024 * 1024)}
+
+        self.client = TestClient(app)
+
+    def test_not_requested(self):
+        """Test that unprofiled requests get no Server-Timing header"""
+        with patch.object(profiling.settings, "DEBUG", True):
+            response = self.client.get("/work")
+
+        assert "server-timing" not in response.headers
+        assert response.json() == {"answer": "ok"}
+
+    def test_requires_debug_or_admin_token(self):
+        """Test that profiling is ignored without DEBUG or the admin token"""
+        with patch.object(profiling.settings, "DEBUG", False), \
+             patch.object(profiling.settings, "ADMIN_TOKEN", "secret"):
+            refused = self.client.get("/work?profile=1", headers={"X-Admin-Token": "wrong"})
+            allowed = self.client.get("/work", headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+
+        assert "server-timing" not in refused.headers
+        assert "embed;dur=" in allowed.headers["server-timing"]
+
+    def test_empty_admin_token_disables_admin_access(self):
+        """Test that an unset ADMIN_TOKEN does not match an empty header"""
+        with patch.object(profiling.settings, "DEBUG", False), \
+             patch.object(profiling.settings, "ADMIN_TOKEN", ""):
+            response = self.client.get("/work?profile=1", headers={"X-Admin-Token": ""})
+
+        assert "server-timing" not in response.headers
+
+    def test_cpu_profile_added_to_json(self):
+        """Test that profile=cpu adds sampled folded stacks to the response body"""
+        with patch.object(profiling.settings, "DEBUG", True), \
+             patch.object(profiling.settings, "PROFILE_SAMPLE_INTERVAL_MS", 1.0):
+            response = self.client.get("/work?profile=cpu")
+
+        body = response.json()
+        assert body["answer"] == "ok"
+        assert "embed;dur=" in response.headers["server-timing"]
+        assert body["profile"]["samples"] > 0
+        assert any("embed (test_profiling.py" in entry["stack"] for entry in body["profile"]["stacks"])
+        assert int(response.headers["content-length"]) == len(response.content)
+
+
+    def test_memory_profile_added_to_json(self):
+        """Test that profile=memory adds traced memory per stage and stops tracing afterwards"""
+        with patch.object(profiling.settings, "DEBUG", True):
+            response = self.client.get("/load?profile=memory")
+
+        body = response.json()
+        assert body["size"] == 4 * 1024 * 1024
+        assert body["profile"]["stages"]["load"]["peak_bytes"] >= 4 * 1024 * 1024
+        assert body["profile"]["peak_rss_bytes"] > 0
+        assert isinstance(body["profile"]["top_allocations"], list)
+        assert not tracemalloc.is_tracing()
+
+
+class TestMemoryProfile:
+
+    def test_ingestion_profile_is_kept(self):
+        """Test that a memory-profiled block records its stages, even when it fails"""
+        try:
+            with profiling.memory_profile("ingestion of a.pdf"):
+                load_file(2 * 1024 * 1024)
+                raise ValueError("embedding failed")
+        except ValueError:
+            pass
+
+        profile = profiling.recent_memory_profiles()[-1]
+        assert profile["label"] == "ingestion of a.pdf"
+        assert profile["stages"]["load"]["peak_bytes"] >= 2 * 1024 * 1024
+        assert profiling._current.get() is None
+        assert not tracemalloc.is_tracing()
+
+
+class TestAgentStages:
+
+    def test_graph_nodes_and_stages_are_recorded(self):
+        """Test that node stages are recorded from LangGraph's worker threads"""
+        with patch('src.agent.langgraph_agent.OllamaRAG') as mock_rag_class:
+            mock_rag = Mock()
+            mock_rag_class.return_value = mock_rag
+            agent = RAGAgent()
+        mock_rag.retrieve_relevant_documents.return_value = [("Studied CS", 0.8)]
+        mock_rag.generate_answer.return_value = {"answer": "Answer.", "confidence": 0.9}
+
+        async def run():
+            token = profiling._current.set(timings)
+            try:
+                return await agent.process_query("What did he study?")
+            finally:
+                profiling._current.reset(token)
+
+        timings = RequestTimings()
+        result = asyncio.run(run())
+
+        assert result["answer"] == "Answer."
+        assert {"node.query_analysis", "node.retrieve", "node.generate_answer"} <= set(timings.stages)
@@ -0,0 +1,52 @@
+import pytest
+import numpy as np
+
+from src.core.projection import Projection
+
+
+def _low_rank_vectors(rows=200, dim=32, rank=4, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((rows, rank)) @ rng.standard_normal((rank, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+class TestProjection:
+
+    def test_pca_preserves_neighbors(self):
+        """Test that PCA onto the data's rank keeps nearest neighbors"""
+        vectors = _low_rank_vectors()
+        projection = Projection.fit_pca(vectors, 4)
+
+        reduced = projection.apply(vectors)
+
+        assert reduced.shape == (200, 4)
+        assert np.allclose(np.linalg.norm(reduced, axis=1), 1.0, atol=1e-5)
+        full_neighbors = np.argsort(-(vectors[:10] @ vectors.T), axis=1)[:, 1]
+        reduced_neighbors = np.argsort(-(reduced[:10] @ reduced.T), axis=1)[:, 1]
+        assert (full_neighbors == reduced_neighbors).mean() >= 0.9
+
+    def test_pca_needs_enough_samples(self):
+        """Test that PCA refuses a sample smaller than the target dimension"""
+        with pytest.raises(ValueError):
+            Projection.fit_pca(_low_rank_vectors(rows=3), 4)
+
+    def test_random_projection_is_seeded(self):
+        """Test that the same seed gives the same projection"""
+        assert Projection.random(32, 8, seed=1).id == Projection.random(32, 8, seed=1).id
+        assert Projection.random(32, 8, seed=1).id != Projection.random(32, 8, seed=2).id
+
+    def test_serialization_round_trip(self):
+        """Test that stored parameters project identically"""
+        vectors = _low_rank_vectors()
+        projection = Projection.fit_pca(vectors, 4)
+
+        restored = Projection.from_bytes(projection.to_bytes())
+
+        assert restored.method == "pca"
+        assert restored.id == projection.id
+        assert np.allclose(restored.apply(vectors), projection.apply(vectors))
+
+    def test_rejects_other_dimension(self):
+        """Test that embeddings of another size are refused"""
+        with pytest.raises(ValueError):
+            Projection.random(32, 8).apply(np.ones((1, 16)))
@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.core.projection import Projection
+from src.tools.projection_report import evaluate, exact_top_k, recall_at_k
+
+
+class TestProjectionReport:
+
+    def test_recall_at_k(self):
+        """Test the fraction of true neighbors found"""
+        assert recall_at_k(np.array([[1, 2], [3, 4]]), np.array([[2, 1], [3, 5]])) == 0.75
+
+    def test_exact_top_k_excludes_query_row(self):
+        """Test that a stored row used as a query does not find itself"""
+        vectors = np.eye(3, dtype=np.float32)
+        vectors[1] = [0.9, 0.1, 0]
+
+        top = exact_top_k(vectors[:1], vectors, 1, exclude=np.array([0]))
+
+        assert top.tolist() == [[1]]
+
+    def test_evaluate_full_and_reduced(self):
+        """Test that full-size search is its own ground truth and reduction shrinks rows"""
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((100, 16)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        exclude = np.arange(10)
+
+        full = evaluate(vectors, vectors[exclude], None, 5, exclude)
+        reduced = evaluate(vectors, vectors[exclude], Projection.fit_pca(vectors, 8), 5, exclude)
+
+        assert full["recall"] == 1.0
+        assert reduced["dim"] == 8
+        assert reduced["bytes_per_row"] == full["bytes_per_row"] // 2
+        assert 0.0 <= reduced["recall"] <= 1.0
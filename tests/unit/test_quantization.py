@@ -0,0 +1,58 @@
+import pytest
+import numpy as np
+from src.core.quantization import ScalarQuantizer
+
+
+class TestScalarQuantizer:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        rng = np.random.default_rng(42)
+        vectors = rng.normal(size=(200, 16)).astype(np.float32)
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.queries = self.vectors[:5] + 0.05
+
+    def test_int8_round_trip(self):
+        """Test that int8 decoding stays within half a quantization step"""
+        quantizer = ScalarQuantizer("int8").fit(self.vectors)
+
+        codes = quantizer.encode(self.vectors)
+
+        assert codes.dtype == np.int8
+        assert np.all(np.abs(quantizer.decode(codes) - self.vectors) <= quantizer.scale / 2 + 1e-6)
+
+    def test_int8_scores_match_decoded_dot_product(self):
+        """Test that scoring on codes equals the dot product with decoded vectors"""
+        quantizer = ScalarQuantizer("int8").fit(self.vectors)
+        codes = quantizer.encode(self.vectors)
+
+        scores = quantizer.scores(self.queries, codes)
+
+        np.testing.assert_allclose(scores, self.queries @ quantizer.decode(codes).T, rtol=1e-4, atol=1e-4)
+        np.testing.assert_allclose(scores, self.queries @ self.vectors.T, atol=0.05)
+
+    def test_float16(self):
+        """Test that float16 needs no parameters"""
+        quantizer = ScalarQuantizer("float16")
+
+        codes = quantizer.encode(self.vectors)
+
+        assert quantizer.is_fitted
+        assert codes.dtype == np.float16
+        np.testing.assert_allclose(quantizer.scores(self.queries, codes), self.queries @ self.vectors.T, atol=1e-2)
+
+    def test_save_and_load(self, tmp_path):
+        """Test that the parameters are persisted alongside the codes"""
+        quantizer = ScalarQuantizer("int8").fit(self.vectors)
+
+        quantizer.save(tmp_path / "quantizer.npz")
+        loaded = ScalarQuantizer.load(tmp_path / "quantizer.npz")
+
+        assert loaded.dtype == "int8"
+        np.testing.assert_array_equal(loaded.offset, quantizer.offset)
+        np.testing.assert_array_equal(loaded.scale, quantizer.scale)
+
+    def test_unsupported_dtype(self):
+        """Test that unknown dtypes are rejected"""
+        with pytest.raises(ValueError):
+            ScalarQuantizer("int4")
@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from unittest.mock import Mock, patch
+from src.agent.query_router import QueryRouter, ROUTE_CANNED, ROUTE_DIRECT, ROUTE_RAG, normalize_query
+from src.core.model_tiers import TIER_FAST, TIER_LARGE
+
+
+class TestQueryRouter:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        QueryRouter._centroids.clear()
+        self.router = QueryRouter()
+
+    @pytest.mark.parametrize("query,route", [
+        ("Hello!", ROUTE_CANNED),
+        ("thank you so much", ROUTE_CANNED),
+        ("What can you do?", ROUTE_CANNED),
+        ("   ", ROUTE_CANNED),
+        ("how are you?", ROUTE_DIRECT),
+        ("ok", ROUTE_DIRECT),
+        ("Hi, what did Vivek study?", ROUTE_RAG),
+        ("What is his experience with Python?", ROUTE_RAG),
+    ])
+    def test_rule_routes(self, query, route):
+        """Test rule-based routing"""
+        decision = self.router.route(query)
+
+        assert decision.route == route
+        if route == ROUTE_CANNED:
+            assert decision.response
+
+    def test_normalize_query(self):
+        """Test that punctuation and case are ignored"""
+        assert normalize_query("  Hello,   THERE!! ") == "hello there"
+
+    def test_centroid_routing(self):
+        """Test that queries close to the small-talk examples skip retrieval"""
+        embedding_client = Mock()
+        embedding_client.model_name = "mistral"
+        embedding_client.base_url = "http://localhost:11434"
+
+        def embed_documents(texts):
+            # Small-talk examples point along x, document questions along y
+            return [[1.0, 0.0] if "hello" in texts[0] else [0.0, 1.0] for _ in texts]
+
+        embedding_client.embed_documents.side_effect = embed_documents
+        router = QueryRouter(embedding_client=embedding_client, threshold=0.8)
+
+        embedding_client.embed_query.return_value = [0.95, 0.1]
+        decision = router.route("lovely weather today")
+        assert decision.route == ROUTE_DIRECT
+        assert decision.reason.startswith("centroid:")
+
+        embedding_client.embed_query.return_value = [0.1, 0.95]
+        decision = router.route("what certifications does he hold")
+        assert decision.route == ROUTE_RAG
+        assert decision.query_embedding == [0.1, 0.95]
+
+        # Centroids are computed once per model
+        assert embedding_client.embed_documents.call_count == 2
+
+
+class TestRoutedAgent:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        with patch('src.agent.langgraph_agent.OllamaRAG') as mock_rag_class:
+            self.mock_rag = Mock()
+            self.mock_rag.chat_clients = {TIER_LARGE: self.mock_rag.chat_client}
+            mock_rag_class.return_value = self.mock_rag
+            from src.agent.langgraph_agent import RAGAgent
+            self.agent = RAGAgent()
+
+    def test_canned_route_skips_retrieval(self):
+        """Test that a greeting gets a fixed response without model calls"""
+        result = asyncio.run(self.agent.process_query("hello"))
+
+        assert result["route"] == ROUTE_CANNED
+        assert result["answer"]
+        self.mock_rag.generate_answer.assert_not_called()
+        self.mock_rag.chat_client.generate_reply.assert_not_called()
+
+    def test_direct_route_skips_retrieval(self):
+        """Test that small talk gets a short generation without retrieval"""
+        self.mock_rag.chat_client.generate_reply.return_value = "I'm doing well!"
+
+        result = asyncio.run(self.agent.process_query("how are you?"))
+
+        assert result["route"] == ROUTE_DIRECT
+        assert result["answer"] == "I'm doing well!"
+        assert result["model_tier"] == TIER_LARGE
+        self.mock_rag.generate_answer.assert_not_called()
+
+    def test_direct_route_uses_fast_model(self):
+        """Test that small talk is answered by the fast model when one is configured"""
+        fast_client = Mock()
+        fast_client.generate_reply.return_value = "Fine, thanks!"
+        self.mock_rag.chat_clients[TIER_FAST] = fast_client
+
+        result = asyncio.run(self.agent.process_query("how are you?"))
+
+        assert result["answer"] == "Fine, thanks!"
+        assert result["model_tier"] == TIER_FAST
+        self.mock_rag.chat_client.generate_reply.assert_not_called()
+
+    def test_rag_route(self):
+        """Test that document questions go through retrieval"""
+        self.mock_rag.retrieve_relevant_documents.return_value = [("He studied CS.", 0.9)]
+        self.mock_rag.generate_answer.return_value = {"answer": "He studied CS.", "confidence": 0.9}
+
+        result = asyncio.run(self.agent.process_query("What did he study?"))
+
+        assert result["route"] == ROUTE_RAG
+        assert result["answer"] == "He studied CS."
+        self.mock_rag.retrieve_relevant_documents.assert_called_once_with("What did he study?")
+        self.mock_rag.generate_answer.assert_called_once_with(
+            user_question="What did he study?",
+            relevant_docs=[("He studied CS.", 0.9)]
+        )
@@ -0,0 +1,22 @@
+import pytest
+from src.agent.query_splitter import split_query
+
+
+class TestQuerySplitter:
+
+    @pytest.mark.parametrize("query,parts", [
+        ("What did he study and where did he work?", ["What did he study", "where did he work?"]),
+        ("What did he study? Which languages does he know?", ["What did he study?", "Which languages does he know?"]),
+        ("What did he study and why?", ["What did he study and why?"]),
+        ("Tell me about Python and Java", ["Tell me about Python and Java"]),
+        ("What is his role? What is his role?", ["What is his role?"]),
+    ])
+    def test_split_query(self, query, parts):
+        """Test splitting compound questions into sub-queries"""
+        assert split_query(query) == parts
+
+    def test_split_query_max_parts(self):
+        """Test that parts beyond the limit are retrieved together"""
+        parts = split_query("What is X? What is Y? Who is Z? Where is W?", max_parts=3)
+
+        assert parts == ["What is X?", "What is Y?", "Who is Z? Where is W?"]
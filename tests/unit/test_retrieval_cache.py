@@ -0,0 +1,124 @@
+from unittest.mock import patch
+
+from src.config import settings
+from src.core.chromadb_manager import ChromaDBManager
+from src.core.chroma_client import clear_chroma_clients
+from src.core.collection_registry import collection_registry
+from src.core.retrieval_cache import RetrievalCache, cache_key, merge_rows, retrieval_cache, split_rows
+
+
+def _row(doc_id: str, text: str = "text"):
+    return {"ids": [doc_id], "documents": [text], "metadatas": [{"source": "a"}], "distances": [0.1]}
+
+
+class TestRetrievalCache:
+
+    def test_key_depends_on_every_parameter(self):
+        """Test that version, vector, top_k and filter all separate cache entries"""
+        base = cache_key("c", 1, [0.1, 0.2], 5, None)
+
+        assert base == cache_key("c", 1, [0.1, 0.2], 5, None)
+        assert base != cache_key("c", 2, [0.1, 0.2], 5, None)
+        assert base != cache_key("c", 1, [0.1, 0.3], 5, None)
+        assert base != cache_key("c", 1, [0.1, 0.2], 3, None)
+        assert base != cache_key("c", 1, [0.1, 0.2], 5, {"source": "a"})
+        assert cache_key("c", 1, [0.1], 5, {"a": 1, "b": 2}) == cache_key("c", 1, [0.1], 5, {"b": 2, "a": 1})
+
+    def test_split_and_merge_rows(self):
+        """Test that per-query rows round-trip to Chroma's result layout"""
+        results = {"ids": [["a"], ["b"]], "distances": [[0.1], [0.2]], "embeddings": None,
+                   "included": ["distances", "uris"]}
+
+        rows = split_rows(results, 2)
+
+        assert rows[1] == {"ids": ["b"], "distances": [0.2]}
+        assert merge_rows(rows) == {"ids": [["a"], ["b"]], "distances": [[0.1], [0.2]]}
+        assert merge_rows(rows, results)["included"] == ["distances", "uris"]
+
+    def test_newer_version_drops_older_entries(self):
+        """Test that entries of a replaced version are freed and never stored again"""
+        cache = RetrievalCache(max_bytes=10000)
+        cache.put(cache_key("c", 1, [0.1], 5, None), _row("a"))
+        cache.put(cache_key("other", 1, [0.1], 5, None), _row("a"))
+
+        assert cache.get(cache_key("c", 2, [0.1], 5, None)) is None
+        assert cache.stats()["entries"] == 1
+
+        cache.put(cache_key("c", 1, [0.2], 5, None), _row("late"))
+        assert cache.stats()["entries"] == 1
+
+    def test_evicts_least_recently_used(self):
+        """Test that memory stays under max_bytes by evicting the oldest entries"""
+        cache = RetrievalCache(max_bytes=1200)
+        keys = [cache_key("c", 1, [float(i)], 5, None) for i in range(3)]
+        cache.put(keys[0], _row("a", "x" * 300))
+        cache.put(keys[1], _row("b", "x" * 300))
+        cache.get(keys[0])
+        cache.put(keys[2], _row("c", "x" * 300))
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None
+        assert cache.stats()["bytes"] <= 1200
+
+
+class TestCachedQueries:
+
+    def teardown_method(self):
+        collection_registry.clear()
+        clear_chroma_clients()
+        retrieval_cache.clear()
+
+    @patch('src.core.chromadb_manager.OllamaEmbedding')
+    def test_writes_invalidate_cached_results(self, mock_embedding, tmp_path):
+        """Test that repeated searches are served from the cache until the collection changes"""
+        with patch.object(settings, "VECTOR_STORE_BACKEND", "numpy"), \
+             patch.object(settings, "VECTOR_STORE_DIRECTORY", str(tmp_path)):
+            manager = ChromaDBManager(collection_name="test_collection")
+            manager.add_documents(documents=["first"], embeddings=[[1.0, 0.0]], ids=["a"])
+
+            first = manager.query_by_embedding([1.0, 0.0], n_results=2)
+            second = manager.query_by_embedding([1.0, 0.0], n_results=2)
+            assert first == second
+            assert manager.get_stats()["queries"] == 1
+            assert manager.get_stats()["cache_hits"] == 1
+
+            manager.add_documents(documents=["second"], embeddings=[[0.9, 0.1]], ids=["b"])
+            assert manager.query_by_embedding([1.0, 0.0], n_results=2)["ids"] == [["a", "b"]]
+
+            manager.delete_documents(["b"])
+            assert manager.query_by_embedding([1.0, 0.0], n_results=2)["ids"] == [["a"]]
+
+            manager.reset_collection()
+            assert manager.query_by_embedding([1.0, 0.0], n_results=2)["ids"] == [[]]
+            assert manager.get_stats()["queries"] == 4
+
+    @patch('src.core.chromadb_manager.OllamaEmbedding')
+    def test_batch_searches_only_missing_rows(self, mock_embedding, tmp_path):
+        """Test that a batch search reuses cached rows and keeps the query order"""
+        with patch.object(settings, "VECTOR_STORE_BACKEND", "numpy"), \
+             patch.object(settings, "VECTOR_STORE_DIRECTORY", str(tmp_path)):
+            manager = ChromaDBManager(collection_name="test_collection")
+            manager.add_documents(documents=["first", "second"], embeddings=[[1.0, 0.0], [0.0, 1.0]], ids=["a", "b"])
+            manager.query_by_embedding([0.0, 1.0], n_results=1)
+
+            with patch.object(manager.store, "query", wraps=manager.store.query) as query:
+                results = manager.query_by_embeddings([[1.0, 0.0], [0.0, 1.0]], n_results=1)
+
+            assert results["ids"] == [["a"], ["b"]]
+            assert len(query.call_args[1]["query_embeddings"]) == 1
+
+    @patch('src.core.chromadb_manager.OllamaEmbedding')
+    def test_chroma_batch_mixing_misses_and_a_hit(self, mock_embedding, tmp_path):
+        """Test that Chroma's "included" list is not split when as many queries miss as fields are included"""
+        with patch.object(settings, "VECTOR_STORE_BACKEND", "chroma"), \
+             patch.object(settings, "CHROMA_MODE", "embedded"):
+            manager = ChromaDBManager(collection_name="test_collection", persist_directory=str(tmp_path))
+            embeddings = [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]]
+            manager.add_documents(documents=["a", "b", "c", "d"], embeddings=embeddings, ids=["a", "b", "c", "d"])
+            manager.query_by_embedding(embeddings[3], n_results=2)
+
+            results = manager.query_by_embeddings(embeddings, n_results=2)
+
+            assert [ids[0] for ids in results["ids"]] == ["a", "b", "c", "d"]
+            assert len(results["distances"]) == 4
+            assert manager.get_stats()["cache_hits"] == 1
@@ -0,0 +1,62 @@
+import pytest
+from unittest.mock import patch
+from src.core.session_store import ConversationSession, SessionStore
+
+
+class TestSessionStore:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.store = SessionStore(max_sessions=2, ttl_seconds=60)
+
+    def test_create_and_get(self):
+        """Test that a created session can be fetched by ID"""
+        session = self.store.create("resume_collection")
+
+        assert self.store.get(session.session_id) is session
+        assert self.store.get("unknown") is None
+
+    def test_lru_eviction(self):
+        """Test that the least recently used session is dropped when full"""
+        first = self.store.create("c1")
+        second = self.store.create("c1")
+        self.store.get(first.session_id)
+        self.store.create("c1")
+
+        assert self.store.get(first.session_id) is first
+        assert self.store.get(second.session_id) is None
+        assert len(self.store) == 2
+
+    @patch('src.core.session_store.time.time')
+    def test_ttl_expiry(self, mock_time):
+        """Test that idle sessions expire"""
+        mock_time.return_value = 1000.0
+        session = self.store.create("c1")
+
+        mock_time.return_value = 1061.0
+
+        assert self.store.get(session.session_id) is None
+
+    def test_delete(self):
+        """Test deleting a session"""
+        session = self.store.create("c1")
+
+        assert self.store.delete(session.session_id) is True
+        assert self.store.delete(session.session_id) is False
+
+
+class TestConversationSession:
+
+    def test_turns_and_compaction(self):
+        """Test that compaction replaces history and context with the summary"""
+        session = ConversationSession("s1", "c1")
+        session.add_turn("Who is Vivek?", "A backend engineer.", [1, 2, 3])
+
+        assert session.context_tokens == 3
+        assert session.transcript() == "User: Who is Vivek?\nAssistant: A backend engineer."
+
+        session.compact("Asked about Vivek, a backend engineer.")
+
+        assert session.context == []
+        assert session.turns == []
+        assert session.transcript() == "Earlier: Asked about Vivek, a backend engineer."
@@ -0,0 +1,109 @@
+import pytest
+import numpy as np
+from unittest.mock import patch
+
+from src.config import settings
+from src.core.chroma_client import clear_chroma_clients
+from src.core.collection_registry import collection_registry
+from src.core.chromadb_manager import ChromaDBManager
+from src.core.snapshot import export_snapshot, import_snapshot
+
+
+@patch('src.core.chromadb_manager.OllamaEmbedding')
+class TestSnapshot:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.embeddings = np.eye(4, dtype=np.float32)[:3].tolist()
+        self.documents = ["chunk one", "chunk two", "chunk three"]
+        self.metadatas = [{"source": "doc_0", "content_hash": "aaa", "page": 1},
+                          {"source": "doc_1", "content_hash": "aaa", "page": 2},
+                          {"source": "doc_0", "content_hash": "bbb"}]
+        self.ids = ["a_0", "a_1", "b_0"]
+
+    def teardown_method(self):
+        collection_registry.clear()
+        clear_chroma_clients()
+
+    def _manager(self, name):
+        manager = ChromaDBManager(collection_name=name)
+        manager.model_name = "mistral"
+        return manager
+
+    def _source(self):
+        source = self._manager("source_collection")
+        source.add_documents(documents=self.documents, embeddings=self.embeddings,
+                             metadatas=self.metadatas, ids=self.ids)
+        return source
+
+    def test_round_trip(self, mock_embedding, tmp_path):
+        """Test that an import restores ids, documents, metadata and embeddings"""
+        path = str(tmp_path / "source.snapshot")
+        with patch.object(settings, "VECTOR_STORE_BACKEND", "numpy"), \
+             patch.object(settings, "VECTOR_STORE_DIRECTORY", str(tmp_path / "store")):
+            exported = export_snapshot(self._source(), path, block_rows=2)
+            target = self._manager("target_collection")
+            result = import_snapshot(target, path)
+
+            assert exported["rows"] == 3
+            assert result == {"rows": 3, "imported": 3, "skipped": 0, "source_collection": "source_collection"}
+            rows = next(target.store.iter_rows())
+            assert rows["ids"] == self.ids
+            assert rows["documents"] == self.documents
+            assert rows["metadatas"] == self.metadatas
+            assert rows["embeddings"].tolist() == self.embeddings
+
+    def test_chroma_to_numpy(self, mock_embedding, tmp_path):
+        """Test that a snapshot moves a collection between backends"""
+        path = str(tmp_path / "source.snapshot")
+        with patch.object(settings, "CHROMA_MODE", "embedded"), \
+             patch.object(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path / "chroma")):
+            export_snapshot(self._source(), path)
+        with patch.object(settings, "VECTOR_STORE_BACKEND", "numpy"), \
+             patch.object(settings, "VECTOR_STORE_DIRECTORY", str(tmp_path / "store")):
+            target = self._manager("target_collection")
+            import_snapshot(target, path)
+
+            results = target.query_by_embedding(self.embeddings[2], n_results=1)
+            assert results["ids"][0] == ["b_0"]
+
+    def test_skips_documents_already_present(self, mock_embedding, tmp_path):
+        """Test that rows of a document whose content hash is stored are not imported again"""
+        path = str(tmp_path / "source.snapshot")
+        with patch.object(settings, "VECTOR_STORE_BACKEND", "numpy"), \
+             patch.object(settings, "VECTOR_STORE_DIRECTORY", str(tmp_path / "store")):
+            export_snapshot(self._source(), path, block_rows=1)
+            target = self._manager("target_collection")
+            target.add_documents(documents=["chunk one"], embeddings=[self.embeddings[0]],
+                                 metadatas=[{"content_hash": "aaa"}], ids=["other_id"])
+
+            result = import_snapshot(target, path)
+
+            assert result["imported"] == 1
+            assert result["skipped"] == 2
+            assert sorted(target.store.get_ids()) == ["b_0", "other_id"]
+            assert import_snapshot(target, path)["imported"] == 0
+
+    def test_rejects_other_embedding_model(self, mock_embedding, tmp_path):
+        """Test that embeddings from a different model are not mixed into a collection"""
+        path = str(tmp_path / "source.snapshot")
+        with patch.object(settings, "VECTOR_STORE_BACKEND", "numpy"), \
+             patch.object(settings, "VECTOR_STORE_DIRECTORY", str(tmp_path / "store")):
+            export_snapshot(self._source(), path)
+            target = self._manager("target_collection")
+            target.model_name = "nomic-embed-text"
+
+            with pytest.raises(ValueError):
+                import_snapshot(target, path)
+
+    def test_rejects_truncated_file(self, mock_embedding, tmp_path):
+        """Test that a partially copied snapshot is detected"""
+        path = tmp_path / "source.snapshot"
+        with patch.object(settings, "VECTOR_STORE_BACKEND", "numpy"), \
+             patch.object(settings, "VECTOR_STORE_DIRECTORY", str(tmp_path / "store")):
+            export_snapshot(self._source(), str(path))
+            path.write_bytes(path.read_bytes()[:-20])
+            target = self._manager("target_collection")
+
+            with pytest.raises(ValueError):
+                import_snapshot(target, str(path))
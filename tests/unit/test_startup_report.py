@@ -0,0 +1,31 @@
+import subprocess
+import sys
+from src.tools.startup_report import parse_import_times, time_by_package
+
+
+class TestStartupReport:
+
+    def test_parse_import_times(self):
+        """Test parsing -X importtime output"""
+        output = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |     numpy.core",
+            "import time:       300 |        420 |   numpy",
+            "import time:        50 |        470 | src.main",
+        ])
+
+        modules = parse_import_times(output)
+
+        assert modules == [("numpy.core", 120, 120, 2), ("numpy", 300, 420, 1), ("src.main", 50, 470, 0)]
+        assert time_by_package(modules) == {"numpy": 420, "src": 50}
+
+    def test_main_does_not_import_heavy_dependencies(self):
+        """Test that chromadb, langgraph, pypdf, scikit-learn and NumPy are not loaded until they are used"""
+        code = ("import sys, src.main; "
+                "print(','.join(m for m in ('chromadb', 'langgraph', 'langchain_core', 'pypdf', 'sklearn', 'numpy') "
+                "if m in sys.modules))")
+
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == ""
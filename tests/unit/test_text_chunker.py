@@ -0,0 +1,67 @@
+import pytest
+from src.utils.text_chunker import Chunk, TextChunker, count_tokens
+
+
+class TestTextChunker:
+
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.sentences = [f"Sentence number {i} has six tokens." for i in range(10)]
+        self.text = " ".join(self.sentences)
+
+    def test_count_tokens(self):
+        """Test that words and punctuation are counted"""
+        assert count_tokens("Hello, world!") == 4
+
+    def test_chunks_respect_size_and_sentences(self):
+        """Test that chunks hold whole sentences up to the size limit"""
+        chunker = TextChunker(chunk_size=14, chunk_overlap=0)
+
+        chunks = chunker.chunk_text(self.text)
+
+        assert [chunk.text for chunk in chunks] == [" ".join(self.sentences[i:i + 2]) for i in range(0, 10, 2)]
+        assert all(count_tokens(chunk.text) <= 14 for chunk in chunks)
+
+    def test_overlap_repeats_trailing_sentences(self):
+        """Test that each chunk starts with the end of the previous one"""
+        chunker = TextChunker(chunk_size=21, chunk_overlap=7)
+
+        chunks = chunker.chunk_text(self.text)
+
+        for previous, current in zip(chunks, chunks[1:]):
+            assert current.text.startswith(previous.text.split(". ")[-1])
+        # The overlap never produces a chunk that only repeats the previous one
+        assert chunks[-1].text.endswith(self.sentences[-1])
+        assert len(chunks) == 5
+
+    def test_offsets_point_into_document(self):
+        """Test that character spans and pages locate the chunk in the joined pages"""
+        pages = ["First page. It has two sentences.", "Second page starts here. And ends here."]
+        chunker = TextChunker(chunk_size=8, chunk_overlap=0)
+
+        chunks = list(chunker.chunk_pages(iter(pages)))
+        document = "\n".join(pages)
+
+        assert [chunk.page for chunk in chunks] == [1, 2, 2]
+        for chunk in chunks:
+            assert " ".join(document[chunk.start:chunk.end].split()) == chunk.text
+
+    def test_oversized_sentence_is_split_at_words(self):
+        """Test that a sentence longer than a chunk is split into word pieces"""
+        chunker = TextChunker(chunk_size=5, chunk_overlap=0)
+
+        chunks = chunker.chunk_text("one two three four five six seven eight nine ten eleven")
+
+        assert [chunk.text for chunk in chunks] == ["one two three four five", "six seven eight nine ten", "eleven"]
+        assert chunks[1] == Chunk("six seven eight nine ten", 1, 24, 48)
+
+    def test_reusable(self):
+        """Test that the same chunker gives the same result on every call"""
+        chunker = TextChunker(chunk_size=14, chunk_overlap=0)
+
+        assert chunker.chunk_text(self.text) == chunker.chunk_text(self.text)
+
+    def test_invalid_overlap(self):
+        """Test that the overlap must be smaller than the chunk"""
+        with pytest.raises(ValueError):
+            TextChunker(chunk_size=10, chunk_overlap=10)
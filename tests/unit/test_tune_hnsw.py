@@ -0,0 +1,44 @@
+import numpy as np
+
+from src.tools.projection_report import exact_top_k
+from src.tools.tune_hnsw import ranking_space, recommend, tune
+
+
+class TestTuneHnsw:
+
+    def test_ranking_space_l2(self):
+        """Test that the rewritten dot product ranks rows by Euclidean distance"""
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((50, 4)).astype(np.float32)
+        queries = rng.standard_normal((5, 4)).astype(np.float32)
+        distances = np.linalg.norm(queries[:, None, :] - vectors[None, :, :], axis=2)
+
+        top = exact_top_k(*ranking_space(queries, vectors, "l2"), 3)
+
+        assert top.tolist() == np.argsort(distances, axis=1)[:, :3].tolist()
+
+    def test_recommend_fastest_reaching_target(self):
+        """Test that the fastest setting above the target wins, else the most accurate"""
+        results = [
+            {"M": 16, "construction_ef": 100, "search_ef": 10, "recall": 0.90, "ms_per_query": 0.2},
+            {"M": 16, "construction_ef": 100, "search_ef": 50, "recall": 0.97, "ms_per_query": 0.4},
+            {"M": 32, "construction_ef": 200, "search_ef": 50, "recall": 0.99, "ms_per_query": 0.6},
+        ]
+
+        assert recommend(results, 0.95)["search_ef"] == 50
+        assert recommend(results, 0.95)["M"] == 16
+        assert recommend(results, 0.999)["M"] == 32
+
+    def test_tune_grid(self):
+        """Test that every combination is measured and that search_ef changes the searched index"""
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((1000, 32)).astype(np.float32)
+        rows = np.arange(20)
+
+        results = tune(vectors, rows, "cosine", 5, [4], [16], [5, 1000])
+
+        assert [(r["M"], r["search_ef"]) for r in results] == [(4, 5), (4, 1000)]
+        # Chroma's graph construction is randomized, so allow for an occasional miss
+        assert results[0]["recall"] < results[1]["recall"]
+        assert results[1]["recall"] >= 0.95
+        assert all(r["ms_per_query"] > 0 for r in results)
@@ -0,0 +1,41 @@
+import asyncio
+import hashlib
+import io
+import pytest
+from fastapi import UploadFile
+from src.utils.uploads import UploadTooLarge, save_upload
+
+
+def _upload(content: bytes, filename: str = "Resume.PDF") -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=filename)
+
+
+class TestSaveUpload:
+
+    def test_stores_under_content_hash(self, tmp_path):
+        """Test that the upload is written to <sha256><suffix>"""
+        content = b"x" * 2500
+
+        stored = asyncio.run(save_upload(_upload(content), str(tmp_path), max_bytes=10000, chunk_size=1000))
+
+        assert stored.sha256 == hashlib.sha256(content).hexdigest()
+        assert stored.size == 2500
+        assert stored.duplicate is False
+        assert stored.path == tmp_path / f"{stored.sha256}.pdf"
+        assert stored.path.read_bytes() == content
+
+    def test_detects_duplicate_content(self, tmp_path):
+        """Test that identical content under another name is detected"""
+        asyncio.run(save_upload(_upload(b"same", "a.pdf"), str(tmp_path), max_bytes=100))
+
+        stored = asyncio.run(save_upload(_upload(b"same", "b.pdf"), str(tmp_path), max_bytes=100))
+
+        assert stored.duplicate is True
+        assert len(list(tmp_path.iterdir())) == 1
+
+    def test_rejects_oversized_upload(self, tmp_path):
+        """Test that the size limit is enforced while streaming and nothing is left behind"""
+        with pytest.raises(UploadTooLarge):
+            asyncio.run(save_upload(_upload(b"x" * 101), str(tmp_path), max_bytes=100, chunk_size=10))
+
+        assert list(tmp_path.iterdir()) == []